@@ -0,0 +1,393 @@
+"""
+SQLite catalog of the backtest results of every bot, so picking, comparing and exporting runs is an indexed
+query instead of parsing multi-MB result json each time.
+
+    python backtest_catalog.py ingest                               add new and changed results of every bot
+    python backtest_catalog.py list --strategy X --pair BTC/USDT --since 2025-07-22
+    python backtest_catalog.py compare 3 7                          summary metrics of runs side by side
+    python backtest_catalog.py export 7 --pair BTC/USDT -o m.lwcb   trade markers of a run (export_markers.py columns)
+
+Tables of output/backtest_catalog.sqlite:
+
+    files   (bot, name) -> sha1, size, mtime_ns of the .zip/.json results in backtest_results (not the extract
+            folders, .meta.json or .last_result.json)
+    runs    one row per strategy of a result (sha1, strategy): the usual summary metrics as columns
+            (profit_total, sharpe, calmar, backtest_start_ts, ...), every other scalar one as JSON in metrics
+    trades  one row per trade, indexed by (run, pair, open_timestamp)
+
+Ingest is incremental: files whose size and mtime did not change are skipped without being read, others are
+hashed and only parsed when no file with the same content was ingested before (a renamed or copied result costs
+a hash). Runs of deleted files are dropped. Trades are streamed out of the result (export_markers.JsonStream),
+the result json is never loaded whole. Standard library only (numpy for export).
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import zipfile
+import argparse
+from contextlib import contextmanager, closing
+from datetime import datetime, timezone
+import numpy as np
+
+import chart_binary
+import export_markers
+import unzip_backtest_results
+
+CATALOG_NAME = 'backtest_catalog.sqlite'
+# Bump when the tables change, a catalog of another version is rebuilt from the result files
+SCHEMA_VERSION = 1
+# Trades inserted per executemany while streaming a result
+TRADE_BATCH = 5000
+# Summary metrics stored as columns (the rest of the scalar metrics go into runs.metrics)
+RUN_METRICS = [
+    ('timeframe', 'TEXT'), ('timerange', 'TEXT'), ('stake_currency', 'TEXT'),
+    ('backtest_start_ts', 'INTEGER'), ('backtest_end_ts', 'INTEGER'), ('backtest_run_start_ts', 'INTEGER'),
+    ('total_trades', 'INTEGER'), ('wins', 'INTEGER'), ('losses', 'INTEGER'), ('draws', 'INTEGER'),
+    ('winrate', 'REAL'), ('profit_total', 'REAL'), ('profit_total_abs', 'REAL'), ('profit_mean', 'REAL'),
+    ('profit_factor', 'REAL'), ('cagr', 'REAL'), ('expectancy', 'REAL'), ('sharpe', 'REAL'), ('sortino', 'REAL'),
+    ('calmar', 'REAL'), ('sqn', 'REAL'), ('max_drawdown_account', 'REAL'), ('max_drawdown_abs', 'REAL'),
+    ('starting_balance', 'REAL'), ('final_balance', 'REAL'), ('market_change', 'REAL'),
+]
+TRADE_COLUMNS = [
+    ('pair', 'TEXT NOT NULL'), ('open_timestamp', 'INTEGER NOT NULL'), ('close_timestamp', 'INTEGER'),
+    ('open_rate', 'REAL'), ('close_rate', 'REAL'), ('amount', 'REAL'), ('stake_amount', 'REAL'),
+    ('profit_ratio', 'REAL'), ('profit_abs', 'REAL'), ('is_short', 'INTEGER'), ('is_open', 'INTEGER'),
+    ('leverage', 'REAL'), ('enter_tag', 'TEXT'), ('exit_reason', 'TEXT'), ('trade_duration', 'INTEGER'),
+]
+# Shown by list and compare
+COMPARE_METRICS = ['strategy', 'timeframe', 'backtest_start_ts', 'backtest_end_ts', 'total_trades', 'winrate',
+                   'profit_total', 'profit_total_abs', 'profit_factor', 'sharpe', 'sortino', 'calmar',
+                   'max_drawdown_account', 'market_change']
+
+def find_root_dir():
+    """Go up to root"""
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def default_path():
+    return os.path.join(find_root_dir(), 'output', CATALOG_NAME)
+
+def create_schema(conn):
+    metrics = ''.join(f", {name} {sql_type}" for name, sql_type in RUN_METRICS)
+    trades = ', '.join(f"{name} {sql_type}" for name, sql_type in TRADE_COLUMNS)
+    # One by one, executescript would commit the caller's transaction
+    script = f"""
+        DROP TABLE IF EXISTS trades;
+        DROP TABLE IF EXISTS runs;
+        DROP TABLE IF EXISTS files;
+        CREATE TABLE files (bot TEXT NOT NULL, name TEXT NOT NULL, sha1 TEXT NOT NULL, size INTEGER,
+                            mtime_ns INTEGER, ingested_at REAL, PRIMARY KEY (bot, name));
+        CREATE INDEX files_sha1 ON files (sha1);
+        CREATE TABLE runs (id INTEGER PRIMARY KEY, sha1 TEXT NOT NULL, strategy TEXT NOT NULL{metrics},
+                           metrics TEXT, UNIQUE (sha1, strategy));
+        CREATE INDEX runs_strategy ON runs (strategy, backtest_run_start_ts);
+        CREATE TABLE trades (run INTEGER NOT NULL, {trades});
+        CREATE INDEX trades_run_pair_open ON trades (run, pair, open_timestamp);
+        PRAGMA user_version = {SCHEMA_VERSION}
+    """
+    for statement in script.split(';'):
+        conn.execute(statement)
+
+def connect(path=None):
+    """Open (and create or upgrade) the catalog; concurrent batch jobs wait for each other's ingest"""
+    path = path or default_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        with transaction(conn):
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                create_schema(conn)
+    return conn
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on any error"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def result_files(bt_dir):
+    """Names of the backtest results in a backtest_results folder"""
+    return sorted(name for name in os.listdir(bt_dir)
+                  if not name.startswith('.') and not name.endswith('.meta.json')
+                  and name.endswith(('.zip', '.json')) and os.path.isfile(os.path.join(bt_dir, name)))
+
+def trade_row(run_id, trade):
+    return (run_id,) + tuple(trade.get(name) for name, _ in TRADE_COLUMNS)
+
+def ingest_result(conn, path, sha1):
+    """Stream the runs and trades of one result into the catalog (inside the caller's transaction)"""
+    placeholders = ', '.join('?' * (len(TRADE_COLUMNS) + 1))
+    insert_trades = f"INSERT INTO trades VALUES ({placeholders})"
+    runs = trades = 0
+    with export_markers.open_text(path) as text:
+        parser = export_markers.JsonStream(text)
+        for key in parser.iter_object():
+            if key != 'strategy':
+                parser.skip_value()
+                continue
+            for strategy in parser.iter_object():
+                # A run of this result left from before (ingest interrupted, file renamed) goes with its trades
+                stale = 'SELECT id FROM runs WHERE sha1 = ? AND strategy = ?'
+                conn.execute(f"DELETE FROM trades WHERE run IN ({stale})", (sha1, strategy))
+                conn.execute(f"DELETE FROM runs WHERE id IN ({stale})", (sha1, strategy))
+                run_id = conn.execute("INSERT INTO runs (sha1, strategy) VALUES (?, ?)", (sha1, strategy)).lastrowid
+                runs += 1
+                summary = {}
+                for field in parser.iter_object():
+                    if field != 'trades':
+                        # Only scalar metrics are kept, lists and objects (results_per_pair, ...) are skipped
+                        if parser.peek() in ('{', '['):
+                            parser.skip_value()
+                        else:
+                            summary[field] = parser.read_value()
+                        continue
+                    batch = []
+                    for _ in parser.iter_array():
+                        batch.append(trade_row(run_id, parser.read_value()))
+                        if len(batch) >= TRADE_BATCH:
+                            conn.executemany(insert_trades, batch)
+                            trades += len(batch)
+                            batch = []
+                    conn.executemany(insert_trades, batch)
+                    trades += len(batch)
+                columns = [name for name, _ in RUN_METRICS]
+                conn.execute(f"UPDATE runs SET {', '.join(f'{c} = ?' for c in columns)}, metrics = ? WHERE id = ?",
+                             [summary.pop(c, None) for c in columns] + [json.dumps(summary), run_id])
+    return runs, trades
+
+def drop_orphans(conn):
+    """Delete the runs (and trades) no catalogued file holds any more"""
+    orphans = 'SELECT id FROM runs WHERE sha1 NOT IN (SELECT sha1 FROM files)'
+    conn.execute(f"DELETE FROM trades WHERE run IN ({orphans})")
+    return conn.execute(f"DELETE FROM runs WHERE id IN ({orphans})").rowcount
+
+def ingest_bot(conn, bot, bt_dir):
+    """Bring the catalog up to date with a backtest_results folder, returns a counts dict"""
+    counts = {'parsed': 0, 'known': 0, 'unchanged': 0, 'removed': 0, 'runs': 0, 'trades': 0}
+    names = result_files(bt_dir) if os.path.isdir(bt_dir) else []
+    stored = {row['name']: row for row in conn.execute("SELECT * FROM files WHERE bot = ?", (bot,))}
+    for name in names:
+        path = os.path.join(bt_dir, name)
+        st = os.stat(path)
+        row = stored.get(name)
+        if row and row['size'] == st.st_size and row['mtime_ns'] == st.st_mtime_ns:
+            counts['unchanged'] += 1
+            continue
+        sha1 = file_sha1(path)
+        start = time.perf_counter()
+        try:
+            with transaction(conn):
+                # Another process may have ingested the same content meanwhile
+                if conn.execute("SELECT 1 FROM files WHERE sha1 = ?", (sha1,)).fetchone():
+                    counts['known'] += 1
+                else:
+                    runs, trades = ingest_result(conn, path, sha1)
+                    counts['parsed'] += 1
+                    counts['runs'] += runs
+                    counts['trades'] += trades
+                    print(f"[INFO] Catalogued {bot}/{name}: {runs} runs, {trades} trades "
+                          f"in {time.perf_counter() - start:.2f}s")
+                conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             (bot, name, sha1, st.st_size, st.st_mtime_ns, time.time()))
+                if row and row['sha1'] != sha1:
+                    drop_orphans(conn)
+        except (ValueError, OSError, zipfile.BadZipFile) as e:
+            # Half written (a running backtest) or not a result at all, tried again next time
+            print(f"[WARN] Could not catalogue {bot}/{name}: {e}")
+    gone = [name for name in stored if name not in names]
+    if gone:
+        with transaction(conn):
+            conn.executemany("DELETE FROM files WHERE bot = ? AND name = ?", [(bot, name) for name in gone])
+            drop_orphans(conn)
+        counts['removed'] = len(gone)
+    return counts
+
+def ingest_all(conn, root=None, bots=None):
+    """Ingest the backtest_results folder of every bot (or only bots), returns the summed counts"""
+    total = {}
+    for bt_dir in unzip_backtest_results.all_backtest_dirs(root or find_root_dir()):
+        bot = os.path.basename(os.path.dirname(os.path.dirname(bt_dir)))
+        if bots and bot not in bots:
+            continue
+        for key, value in ingest_bot(conn, bot, bt_dir).items():
+            total[key] = total.get(key, 0) + value
+    return total
+
+def select_runs(conn, bot=None, strategy=None, pair=None, since=None, until=None, limit=None):
+    """
+    Runs, newest backtest first, each with the bot and file name of a result holding it. since/until are
+    epoch seconds of when the backtest was run.
+    """
+    where, params = [], []
+    if bot:
+        where.append("EXISTS (SELECT 1 FROM files f WHERE f.sha1 = runs.sha1 AND f.bot = ?)")
+        params.append(bot)
+    if strategy:
+        where.append("strategy = ?")
+        params.append(strategy)
+    if pair:
+        where.append("EXISTS (SELECT 1 FROM trades t WHERE t.run = runs.id AND t.pair = ?)")
+        params.append(pair)
+    if since is not None:
+        where.append("backtest_run_start_ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("backtest_run_start_ts < ?")
+        params.append(until)
+    bot_clause = "AND f.bot = ?" if bot else ""
+    query = f"""
+        SELECT runs.*,
+               (SELECT f.bot FROM files f WHERE f.sha1 = runs.sha1 {bot_clause} ORDER BY f.name LIMIT 1) AS bot,
+               (SELECT f.name FROM files f WHERE f.sha1 = runs.sha1 {bot_clause} ORDER BY f.name LIMIT 1) AS file
+        FROM runs {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY backtest_run_start_ts DESC, id DESC
+    """
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    return conn.execute(query, ([bot, bot] if bot else []) + params).fetchall()
+
+def latest_run(conn, bot, strategy, pair=None, bt_dir=None):
+    """
+    The run to chart for strategy: the one in freqtrade's .last_result.json when that result has the strategy
+    (and pair), else the newest backtest of the strategy (with trades of pair) in the bot's results
+    """
+    if bt_dir:
+        last_result = unzip_backtest_results.latest_result(bt_dir)
+        if last_result:
+            rows = conn.execute("""SELECT runs.*, f.bot AS bot, f.name AS file FROM files f
+                                   JOIN runs ON runs.sha1 = f.sha1 WHERE f.bot = ? AND f.name = ? AND strategy = ?""",
+                                (bot, os.path.basename(last_result), strategy)).fetchall()
+            if rows and (not pair or select_runs_with_pair(conn, rows[0]['id'], pair)):
+                return rows[0]
+    rows = select_runs(conn, bot, strategy, pair, limit=1)
+    return rows[0] if rows else None
+
+def select_runs_with_pair(conn, run_id, pair):
+    return conn.execute("SELECT 1 FROM trades WHERE run = ? AND pair = ? LIMIT 1", (run_id, pair)).fetchone()
+
+def run_trades(conn, run_id, pair=None):
+    """Trades of a run (of pair), by open time"""
+    if pair:
+        return conn.execute("SELECT * FROM trades WHERE run = ? AND pair = ? ORDER BY open_timestamp",
+                            (run_id, pair)).fetchall()
+    return conn.execute("SELECT * FROM trades WHERE run = ? ORDER BY open_timestamp", (run_id,)).fetchall()
+
+def export_run_markers(conn, run_id, dest, pair=None):
+    """Write the markers of a run (export_markers.py columns) to dest, returns the number of trades"""
+    trades = run_trades(conn, run_id, pair)
+    closed = [bool(t['close_timestamp']) and t['close_rate'] is not None and not t['is_open'] for t in trades]
+    values = {
+        'open_time': [t['open_timestamp'] // 1000 for t in trades],
+        'open_rate': [t['open_rate'] for t in trades],
+        'close_time': [t['close_timestamp'] // 1000 if c else 0 for t, c in zip(trades, closed)],
+        'close_rate': [t['close_rate'] if c else np.nan for t, c in zip(trades, closed)],
+        'is_short': [1 if t['is_short'] else 0 for t in trades],
+        'profit_ratio': [np.nan if t['profit_ratio'] is None else t['profit_ratio'] for t in trades],
+    }
+    chart_binary.write_columns(dest, [(name, np.asarray(values[name], dtype=chart_binary.DTYPES[dtype]), dtype)
+                                      for name, dtype in export_markers.MARKER_COLUMNS])
+    return len(trades)
+
+def run_path(run, root=None):
+    """Path of the result file a select_runs/latest_run row came from"""
+    return os.path.join(root or find_root_dir(), 'bots', run['bot'], 'user_data', 'backtest_results', run['file'])
+
+def parse_date(text):
+    """YYYY-MM-DD (UTC) as epoch seconds"""
+    return int(datetime.strptime(text, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+def format_value(name, value):
+    if value is None:
+        return '-'
+    if name.endswith('_ts'):
+        return datetime.fromtimestamp(value / 1000, timezone.utc).strftime('%Y-%m-%d')
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite catalog of backtest results and their trades')
+    parser.add_argument('--catalog', help=f'Catalog file (default: output/{CATALOG_NAME})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = sub.add_parser('ingest', help='Add new and changed results, drop deleted ones')
+    ingest_parser.add_argument('--bot', nargs='+', help='Only these bots (default: all)')
+    list_parser = sub.add_parser('list', help='Runs, newest backtest first')
+    list_parser.add_argument('--bot', help='Runs in this bot\'s results')
+    list_parser.add_argument('--strategy', '-s', help='Runs of this strategy')
+    list_parser.add_argument('--pair', '-p', help='Runs with trades of this pair')
+    list_parser.add_argument('--since', help='Backtests run on or after this day (YYYY-MM-DD, UTC)')
+    list_parser.add_argument('--until', help='Backtests run before this day (YYYY-MM-DD, UTC)')
+    list_parser.add_argument('--limit', type=int, default=20, help='At most this many runs (default: 20)')
+    compare_parser = sub.add_parser('compare', help='Summary metrics of runs side by side')
+    compare_parser.add_argument('runs', nargs='+', type=int, help='Run ids (from list)')
+    export_parser = sub.add_parser('export', help='Trade markers of a run as .lwcb')
+    export_parser.add_argument('run', type=int, help='Run id (from list)')
+    export_parser.add_argument('--pair', '-p', help='Only trades of this pair')
+    export_parser.add_argument('--output', '-o', required=True, help='Output .lwcb path')
+    args = parser.parse_args()
+
+    with closing(connect(args.catalog)) as conn:
+        run_command(conn, args)
+
+def run_command(conn, args):
+    if args.command == 'ingest':
+        start = time.perf_counter()
+        counts = ingest_all(conn, bots=args.bot)
+        print(f"[SUMMARY] {counts.get('parsed', 0)} results parsed ({counts.get('runs', 0)} runs, "
+              f"{counts.get('trades', 0)} trades), {counts.get('known', 0)} already known, "
+              f"{counts.get('unchanged', 0)} unchanged, {counts.get('removed', 0)} removed "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+    if args.command == 'list':
+        rows = select_runs(conn, args.bot, args.strategy, args.pair,
+                           parse_date(args.since) if args.since else None,
+                           parse_date(args.until) if args.until else None, args.limit)
+        print(f"[SUMMARY] {'run':>5} {'run at (UTC)':<17} {'strategy':<24} {'tf':<4} {'range':<23} "
+              f"{'trades':>7} {'profit %':>9} {'sharpe':>8} {'calmar':>8}  file")
+        for row in rows:
+            run_at = datetime.fromtimestamp(row['backtest_run_start_ts'] or 0, timezone.utc).strftime('%Y-%m-%d %H:%M')
+            span = f"{format_value('backtest_start_ts', row['backtest_start_ts'])}.." \
+                   f"{format_value('backtest_end_ts', row['backtest_end_ts'])}"
+            profit = (row['profit_total'] or 0) * 100
+            print(f"[SUMMARY] {row['id']:>5} {run_at:<17} {row['strategy']:<24} {row['timeframe'] or '-':<4} "
+                  f"{span:<23} {row['total_trades'] or 0:>7} {profit:>9.2f} {format_value('sharpe', row['sharpe']):>8} "
+                  f"{format_value('calmar', row['calmar']):>8}  {row['bot']}/{row['file']}")
+        if not rows:
+            print("[WARN] No runs matched (run 'ingest' first?)")
+        return
+    if args.command == 'compare':
+        rows = {row['id']: row for row in
+                conn.execute(f"SELECT * FROM runs WHERE id IN ({', '.join('?' * len(args.runs))})", args.runs)}
+        missing = [r for r in args.runs if r not in rows]
+        if missing:
+            print(f"[ERROR] Unknown run id(s): {missing}")
+            sys.exit(1)
+        print(f"[SUMMARY] {'':<22}" + ''.join(f" {'run ' + str(r):>24}" for r in args.runs))
+        for name in COMPARE_METRICS:
+            print(f"[SUMMARY] {name:<22}" + ''.join(f" {format_value(name, rows[r][name])[:24]:>24}"
+                                                   for r in args.runs))
+        return
+    if not conn.execute("SELECT 1 FROM runs WHERE id = ?", (args.run,)).fetchone():
+        print(f"[ERROR] Unknown run id: {args.run}")
+        sys.exit(1)
+    count = export_run_markers(conn, args.run, args.output, args.pair)
+    print(f"[INFO] Exported {count} trades of run {args.run} -> {args.output}")
+
+if __name__ == '__main__':
+    main()
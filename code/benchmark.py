@@ -0,0 +1,527 @@
+"""
+Benchmark the visualization pipeline on synthetic data and compare against a baseline.
+
+Builds a throw-away project (bots/bench_bot with a config, freqtrade-format feather files, a backtest result zip
+and a stub strategy that needs no freqtrade install, plus a copy of code/), then times:
+
+    feather_to_csv          first conversion and the no-op rerun
+    unzip_backtest_results  extraction of the result zip
+    extract_indicators      every pair, no cache
+    chart_pyramid           levels of the first pair's OHLCV and indicator files
+    backtest_catalog        ingest of the result into a fresh catalog, marker export of the first pair's trades
+    chart_bundle            bundle of the first pair's candles, indicators and exported markers
+    copy_to_output          output/ files of the first pair (levels, catalog, markers, bundle) into the output
+                            store, and the rerun with nothing changed
+
+and checks the written files: row counts and sizes, a time axis equal to the generated candle times, and the
+first and last OHLC values of the source. Results are saved as JSON; with --baseline, any stage slower than the
+baseline by more than --threshold fails the run (exit code 1).
+
+    python code/benchmark.py --preset small
+    python code/benchmark.py --candles 1000000 --pairs 20 --trades 10000 --baseline output/benchmarks/base.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+import chart_binary
+import chart_pyramid
+import feather_to_csv
+
+PRESETS = {
+    'small': {'candles': 10_000, 'pairs': 1, 'trades': 100},
+    'medium': {'candles': 500_000, 'pairs': 10, 'trades': 10_000},
+    'large': {'candles': 10_000_000, 'pairs': 500, 'trades': 100_000},
+}
+BOT = 'bench_bot'
+STRATEGY = 'BenchStub'
+EXCHANGE = 'binance'
+TIMEFRAME = '5m'
+TIMEFRAME_SECONDS = 300
+START_TIME = 1_577_836_800  # 2020-01-01
+RESULT_NAME = 'backtest-result-bench'
+# Files of the stages run outside of the pipeline layout, under the bench project
+BENCH_DIR = 'bench'
+OHLC_COLUMNS = ['open', 'high', 'low', 'close']
+# Scripts of code/ that the pipeline needs in the bench project
+SCRIPTS = ['main.py', 'feather_to_csv.py', 'unzip_backtest_results.py', 'export_markers.py', 'chart_binary.py',
+           'chart_pyramid.py', 'chart_server.py', 'chart_bundle.py', 'stage_timer.py', 'strategy_index.py',
+           'extract_indicators.py', 'extraction_daemon.py', 'hyperopt_epochs.py', 'fs_watch.py',
+           'backtest_catalog.py', 'output_store.py']
+CONTAINER_SCRIPTS = ['extract_indicators.py', 'chart_binary.py', 'stage_timer.py', 'strategy_index.py']
+DEFAULT_THRESHOLD = 0.25
+# Stages faster than this are too noisy to fail on
+DEFAULT_MIN_SECONDS = 0.2
+
+STUB_STRATEGY = '''
+import numpy as np
+
+
+class IStrategy:
+    """Stand-in for freqtrade's IStrategy, the benchmark runs without freqtrade"""
+
+    def __init__(self, config=None):
+        self.config = config
+
+
+class BenchStub(IStrategy):
+    startup_candle_count = 200
+
+    def populate_indicators(self, dataframe, metadata):
+        close = dataframe['close']
+        dataframe['ema_fast'] = close.ewm(span=12, adjust=False).mean()
+        dataframe['ema_slow'] = close.ewm(span=26, adjust=False).mean()
+        dataframe['sma_200'] = close.rolling(200).mean()
+        delta = close.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+        dataframe['rsi'] = 100 - 100 / (1 + gain / loss)
+        std = close.rolling(20).std()
+        dataframe['bb_upper'] = dataframe['sma_200'] + 2 * std
+        dataframe['bb_lower'] = dataframe['sma_200'] - 2 * std
+        dataframe['atr'] = (dataframe['high'] - dataframe['low']).rolling(14).mean()
+        dataframe['signal'] = np.where(dataframe['ema_fast'] > dataframe['ema_slow'], 1.0, 0.0)
+        return dataframe
+'''
+
+def pair_names(count):
+    return [f"P{i:03d}/USDT" for i in range(count)]
+
+def synthetic_ohlcv(candles, seed):
+    """Random walk OHLCV frame in freqtrade's feather layout"""
+    rng = np.random.default_rng(seed)
+    # Prices on a 0.01 tick and volumes on a 0.001 step like exchange data, so some are whole numbers
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.002, candles))), 2)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.round(np.abs(rng.normal(0, 0.001, candles)) * close, 2)
+    return pd.DataFrame({
+        'date': pd.to_datetime(START_TIME + np.arange(candles, dtype='int64') * TIMEFRAME_SECONDS, unit='s', utc=True),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': np.round(rng.gamma(2.0, 50.0, candles), 3),
+    })
+
+def synthetic_trades(pairs, candles, trades, seed):
+    """freqtrade-like trade dicts spread evenly over the pairs"""
+    rng = np.random.default_rng(seed)
+    result = []
+    for i in range(trades):
+        pair = pairs[i % len(pairs)]
+        open_idx = int(rng.integers(0, max(1, candles - 50)))
+        duration = int(rng.integers(1, 48))
+        open_ts = (START_TIME + open_idx * TIMEFRAME_SECONDS) * 1000
+        close_ts = open_ts + duration * TIMEFRAME_SECONDS * 1000
+        open_rate = float(100 * np.exp(rng.normal(0, 0.1)))
+        profit = float(rng.normal(0.002, 0.01))
+        result.append({
+            'pair': pair,
+            'stake_amount': 100.0,
+            'amount': 100.0 / open_rate,
+            'open_date': pd.Timestamp(open_ts, unit='ms', tz='UTC').isoformat(sep=' '),
+            'close_date': pd.Timestamp(close_ts, unit='ms', tz='UTC').isoformat(sep=' '),
+            'open_rate': open_rate,
+            'close_rate': open_rate * (1 + profit),
+            'fee_open': 0.001,
+            'fee_close': 0.001,
+            'trade_duration': duration * TIMEFRAME_SECONDS // 60,
+            'profit_ratio': profit,
+            'profit_abs': 100.0 * profit,
+            'exit_reason': 'exit_signal',
+            'is_open': False,
+            'enter_tag': '',
+            'leverage': 1.0,
+            'is_short': bool(i % 5 == 0),
+            'open_timestamp': open_ts,
+            'close_timestamp': close_ts,
+            'orders': [],
+            'funding_fees': 0.0,
+        })
+    return result
+
+def write_result_zip(bt_dir, pairs, candles, trades, seed):
+    """Backtest result zip in freqtrade's layout, plus the .last_result.json pointer"""
+    os.makedirs(bt_dir, exist_ok=True)
+    trade_list = synthetic_trades(pairs, candles, trades, seed)
+    result = {
+        'strategy': {STRATEGY: {
+            'trades': trade_list,
+            'locks': [],
+            'results_per_pair': [{'key': p, 'trades': sum(1 for t in trade_list if t['pair'] == p)} for p in pairs],
+            'total_trades': len(trade_list),
+            'pairlist': pairs,
+            'timeframe': TIMEFRAME,
+            'strategy_name': STRATEGY,
+        }},
+        'strategy_comparison': [{'key': STRATEGY, 'trades': len(trade_list)}],
+    }
+    zip_path = os.path.join(bt_dir, f"{RESULT_NAME}.zip")
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{RESULT_NAME}.json", json.dumps(result))
+        zf.writestr(f"{RESULT_NAME}_config.json", json.dumps({'strategy': STRATEGY}))
+    with open(os.path.join(bt_dir, '.last_result.json'), 'w', encoding='utf-8') as f:
+        json.dump({'latest_backtest': os.path.basename(zip_path)}, f)
+    return zip_path
+
+def build_project(workdir, candles, pair_count, trades, seed=42):
+    """Lay out a bench project in workdir, returns its paths"""
+    code_src = os.path.dirname(os.path.abspath(__file__))
+    code_dir = os.path.join(workdir, 'code')
+    user_data = os.path.join(workdir, 'bots', BOT, 'user_data')
+    data_dir = os.path.join(user_data, 'data', EXCHANGE)
+    for path in (code_dir, data_dir, os.path.join(user_data, 'strategies'), os.path.join(user_data, 'code')):
+        os.makedirs(path, exist_ok=True)
+    for script in SCRIPTS:
+        shutil.copy2(os.path.join(code_src, script), code_dir)
+    for script in CONTAINER_SCRIPTS:
+        shutil.copy2(os.path.join(code_src, script), os.path.join(user_data, 'code'))
+    with open(os.path.join(user_data, 'strategies', f"{STRATEGY}.py"), 'w', encoding='utf-8') as f:
+        f.write(STUB_STRATEGY)
+
+    pairs = pair_names(pair_count)
+    config = {'timeframe': TIMEFRAME, 'stake_currency': 'USDT',
+              'exchange': {'name': EXCHANGE, 'pair_whitelist': pairs}}
+    with open(os.path.join(user_data, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    with open(os.path.join(workdir, 'bots', BOT, 'docker-compose.yml'), 'w', encoding='utf-8') as f:
+        f.write('services:\n  freqtrade:\n    container_name: bench_freqtrade\n')
+
+    for i, pair in enumerate(pairs):
+        # Same compression freqtrade uses for its data files
+        synthetic_ohlcv(candles, seed + i).to_feather(
+            os.path.join(data_dir, f"{pair.replace('/', '_')}-{TIMEFRAME}.feather"),
+            compression='lz4', compression_level=9)
+    write_result_zip(os.path.join(user_data, 'backtest_results'), pairs, candles, trades, seed)
+    return {'root': workdir, 'code': code_dir, 'user_data': user_data, 'data': data_dir, 'pairs': pairs}
+
+def run_stage(name, cmd, cwd, trace_path=None):
+    """Run one pipeline script, returns its stage record (wall time, peak memory/rows/bytes from its trace)"""
+    if trace_path:
+        cmd = cmd + ['--trace', trace_path]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    record = {'name': name, 'wall_s': round(time.perf_counter() - start, 4), 'returncode': proc.returncode}
+    if proc.returncode != 0:
+        print(f"[ERROR] {name} failed:\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}")
+        record['error'] = proc.stderr[-2000:] or proc.stdout[-2000:]
+    if trace_path and os.path.exists(trace_path):
+        with open(trace_path, 'r', encoding='utf-8') as f:
+            trace = json.load(f)
+        for key in ('cpu_s', 'peak_rss_mb', 'rows', 'bytes'):
+            record[key] = trace.get(key)
+        os.remove(trace_path)
+    print(f"[INFO] {name}: {record['wall_s']:.2f}s")
+    return record
+
+def first_pair_files(project):
+    """Paths of the files written for the first pair"""
+    pair_file = project['pairs'][0].replace('/', '_')
+    indicators = os.path.join(project['user_data'], 'data', 'indicator_data', f"indicator_data_{STRATEGY}_{pair_file}")
+    output = os.path.join(project['root'], 'output')
+    bench = os.path.join(project['root'], BENCH_DIR)
+    name = f"{STRATEGY}_{pair_file.replace('_', '')}-{TIMEFRAME}{chart_binary.EXTENSION}"
+    return {
+        'feather': os.path.join(project['data'], f"{pair_file}-{TIMEFRAME}.feather"),
+        'ohlcv_lwcb': os.path.join(project['data'], f"{pair_file}-{TIMEFRAME}_tv.lwcb"),
+        'ohlcv_csv': os.path.join(project['data'], f"{pair_file}-{TIMEFRAME}_tv.csv"),
+        'indicator_lwcb': indicators + chart_binary.EXTENSION,
+        'indicator_csv': indicators + '.csv',
+        'markers': os.path.join(output, f"Markers_{name}"),
+        'bundle': os.path.join(output, f"Chart_{name}"),
+        'catalog': os.path.join(bench, 'catalog.sqlite'),
+        'catalog_markers': os.path.join(bench, f"catalog_markers{chart_binary.EXTENSION}"),
+        'catalog_bundle': os.path.join(bench, f"catalog_bundle{chart_binary.EXTENSION}"),
+        'streamed_csv': os.path.join(bench, 'streamed_tv.csv'),
+    }
+
+def run_stages(project, repeat):
+    """Time every stage repeat times, keep the fastest run of each"""
+    root, code_dir = project['root'], project['code']
+    user_data_code = os.path.join(project['user_data'], 'code')
+    traces = os.path.join(root, 'traces')
+    os.makedirs(traces, exist_ok=True)
+    files = first_pair_files(project)
+    python = sys.executable
+    copy_cmd = [python, '-c', f"import main; main.copy_to_output({BOT!r}, {STRATEGY!r})"]
+    best = {}
+    for _ in range(repeat):
+        # Start from a clean slate so each attempt does the same work
+        for path in glob_outputs(project):
+            os.remove(path)
+        manifest = os.path.join(project['user_data'], 'data', feather_to_csv.MANIFEST_NAME)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        extract_dir = os.path.join(project['user_data'], 'backtest_results', RESULT_NAME)
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        # The output store and the catalogs would otherwise make the next attempt's copy a no-op
+        for folder in (os.path.join(root, 'output'), os.path.join(root, BENCH_DIR)):
+            shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(os.path.join(root, BENCH_DIR))
+
+        stages = [
+            run_stage('feather_to_csv', [python, 'feather_to_csv.py', '--format', 'both'], code_dir,
+                      os.path.join(traces, 'feather.json')),
+            run_stage('feather_to_csv_noop', [python, 'feather_to_csv.py', '--format', 'both'], code_dir,
+                      os.path.join(traces, 'feather_noop.json')),
+            run_stage('unzip_backtest_results', [python, 'unzip_backtest_results.py'], code_dir,
+                      os.path.join(traces, 'unzip.json')),
+            run_stage('extract_indicators', [python, 'extract_indicators.py', '--strategy', STRATEGY, '--all-pairs',
+                                             '--format', 'both', '--no-cache'], user_data_code,
+                      os.path.join(traces, 'extract.json')),
+            run_stage('chart_pyramid', [python, 'chart_pyramid.py', files['ohlcv_lwcb'], files['indicator_lwcb']],
+                      code_dir),
+            run_stage('backtest_catalog_ingest', [python, 'backtest_catalog.py', '--catalog', files['catalog'],
+                                                  'ingest'], code_dir),
+            run_stage('backtest_catalog_export', [python, 'backtest_catalog.py', '--catalog', files['catalog'],
+                                                  'export', '1', '--pair', project['pairs'][0],
+                                                  '--output', files['catalog_markers']], code_dir),
+            run_stage('chart_bundle', [python, 'chart_bundle.py', '--ohlcv', files['ohlcv_lwcb'],
+                                       '--indicators', files['indicator_lwcb'], '--markers', files['catalog_markers'],
+                                       '--output', files['catalog_bundle']], code_dir),
+            run_stage('copy_to_output', copy_cmd, code_dir),
+            run_stage('copy_to_output_noop', copy_cmd, code_dir),
+        ]
+        for record in stages:
+            if record['name'] not in best or record['wall_s'] < best[record['name']]['wall_s']:
+                best[record['name']] = record
+    return [best[name] for name in best]
+
+def glob_outputs(project):
+    """Every file written by a previous attempt"""
+    paths = []
+    for folder in (project['data'], os.path.join(project['user_data'], 'data', 'indicator_data'),
+                   os.path.join(project['root'], 'output')):
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path) and not name.endswith('.feather'):
+                    paths.append(path)
+    return paths
+
+def expected_lwcb_size(rows, columns, meta=None):
+    """Size of an .lwcb file with columns [(name, dtype), ...], from the format definition"""
+    header, data_start, descriptors = chart_binary.build_header(rows, columns, meta)
+    last = descriptors[-1]
+    return chart_binary.align8(data_start + last['offset'] + last['length'])
+
+def lwcb_rows_and_check(path):
+    """(rows, bytes, problem or None) of an .lwcb file, checking its size against its header"""
+    header, _ = chart_binary.read_header(path)
+    size = os.path.getsize(path)
+    expected = expected_lwcb_size(header['rows'], [(c['name'], c['dtype']) for c in header['columns']],
+                                  header.get('meta'))
+    problem = None if size == expected else f"{os.path.basename(path)} is {size} bytes, header implies {expected}"
+    return header['rows'], size, problem
+
+def content_problems(path, columns, times=None, ends=None):
+    """Problems of a file's time axis (strictly increasing, equal to times) and of its first and last values
+    against ends {column: (first, last)}, None ends are not checked"""
+    name = os.path.basename(path)
+    problems = []
+    actual = np.asarray(columns['time'], dtype='int64')
+    if len(actual) > 1 and not (np.diff(actual) > 0).all():
+        problems.append(f"{name}: times are not strictly increasing")
+    if times is not None and not np.array_equal(actual, times):
+        if len(actual) != len(times):
+            problems.append(f"{name}: {len(actual)} times, expected {len(times)}")
+        else:
+            row = int(np.argmax(actual != times))
+            problems.append(f"{name}: time {actual[row]} at row {row}, the source candle is at {times[row]}")
+    for column, expected in (ends or {}).items():
+        values = np.asarray(columns[column])
+        if not len(values):
+            continue
+        for label, value, want in (('first', values[0], expected[0]), ('last', values[-1], expected[1])):
+            if want is not None and value != want:
+                problems.append(f"{name}: {label} {column} is {value}, the source has {want}")
+    return problems
+
+def check_outputs(project, candles, trades):
+    """Check rows, sizes and content of the written files, returns (sizes dict, problems)"""
+    problems = []
+    sizes = {}
+    files = first_pair_files(project)
+    source = pd.read_feather(files['feather'], columns=OHLC_COLUMNS)
+    # The generated candle times, not a conversion of the feather dates like the one under test
+    times = START_TIME + np.arange(candles, dtype='int64') * TIMEFRAME_SECONDS
+    ends = {c: (source[c].iat[0], source[c].iat[-1]) for c in OHLC_COLUMNS}
+    # Coarser levels start with the first open and end with the last close
+    level_ends = {'open': (ends['open'][0], None), 'close': (None, ends['close'][1])}
+    trades_per_pair = len(range(0, trades, len(project['pairs'])))
+    checks = [('ohlcv', files['ohlcv_lwcb'], candles, times, ends),
+              ('indicators', files['indicator_lwcb'], candles, times, None),
+              ('markers', files['markers'], trades_per_pair, None, None),
+              ('catalog_markers', files['catalog_markers'], trades_per_pair, None, None),
+              ('bundle', files['bundle'], candles, times, ends),
+              ('catalog_bundle', files['catalog_bundle'], candles, times, ends)]
+    levels = chart_pyramid.existing_levels(files['ohlcv_lwcb'])
+    if not levels:
+        problems.append(f"No pyramid levels of {files['ohlcv_lwcb']}")
+    for path in levels:
+        factor = int(chart_pyramid.LEVEL_PATTERN.search(path).group(1))
+        first_bar = START_TIME // (factor * TIMEFRAME_SECONDS)
+        last_bar = (START_TIME + (candles - 1) * TIMEFRAME_SECONDS) // (factor * TIMEFRAME_SECONDS)
+        checks.append((f"ohlcv_lod{factor}", path, last_bar - first_bar + 1, None, level_ends))
+    for name, path, rows, expected_times, expected_ends in checks:
+        if not os.path.exists(path):
+            problems.append(f"Missing {path}")
+            continue
+        actual_rows, size, problem = lwcb_rows_and_check(path)
+        if problem:
+            problems.append(problem)
+        if actual_rows != rows:
+            problems.append(f"{os.path.basename(path)} has {actual_rows} rows, expected {rows}")
+        elif name not in ('markers', 'catalog_markers'):
+            problems += content_problems(path, chart_binary.read_columns(path, ['time'] + OHLC_COLUMNS),
+                                         expected_times, expected_ends)
+        sizes[f"{name}_lwcb_bytes"] = size
+        sizes[f"{name}_lwcb_bytes_per_row"] = round(size / max(1, actual_rows), 2)
+    for name, path, expected_ends in (('ohlcv', files['ohlcv_csv'], ends),
+                                      ('indicators', files['indicator_csv'], None)):
+        if not os.path.exists(path):
+            problems.append(f"Missing {path}")
+            continue
+        sizes[f"{name}_csv_bytes"] = os.path.getsize(path)
+        sizes[f"{name}_csv_bytes_per_row"] = round(os.path.getsize(path) / max(1, candles), 2)
+        columns = ['time'] + (OHLC_COLUMNS if expected_ends else [])
+        problems += content_problems(path, pd.read_csv(path, usecols=columns, float_precision='round_trip'),
+                                     times, expected_ends)
+    if os.path.exists(files['ohlcv_csv']):
+        problems += streaming_problems(files['feather'], files['ohlcv_csv'], files['streamed_csv'])
+    return sizes, problems
+
+def first_difference(path_a, path_b):
+    """(line number, line of a, line of b) where two text files first differ, or None"""
+    with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+        for number, (line_a, line_b) in enumerate(zip(a, b), 1):
+            if line_a != line_b:
+                return number, line_a, line_b
+        rest_a, rest_b = a.readline(), b.readline()
+        return (number + 1, rest_a, rest_b) if rest_a or rest_b else None
+
+def streaming_problems(feather_path, pandas_csv, streamed_csv):
+    """The csv of feather_to_csv.py --streaming must be byte for byte the pandas path's, written whole or
+    appended to a csv the pandas path started"""
+    problems = []
+    feather_to_csv.convert_file(feather_path, {'csv': streamed_csv}, full=True, streaming=True)
+    difference = first_difference(pandas_csv, streamed_csv)
+    if difference:
+        problems.append(f"{os.path.basename(streamed_csv)} (--streaming) differs from the pandas csv at line "
+                        f"{difference[0]}: {difference[2]!r} instead of {difference[1]!r}")
+    with open(pandas_csv, 'rb') as f:
+        rows = sum(1 for _ in f) - 1
+    if rows < 2:
+        return problems
+    # The header and the first half of the rows, then the rest appended by the streaming path
+    with open(pandas_csv, 'rb') as f, open(streamed_csv, 'wb') as out:
+        for _ in range(1 + rows // 2):
+            line = f.readline()
+            out.write(line)
+    feather_to_csv.stream_export(feather_to_csv.open_feather(feather_path), streamed_csv,
+                                 after_time=int(line.split(b',')[0]))
+    difference = first_difference(pandas_csv, streamed_csv)
+    if difference:
+        problems.append(f"{os.path.basename(streamed_csv)} (--streaming append) differs from the pandas csv at "
+                        f"line {difference[0]}: {difference[2]!r} instead of {difference[1]!r}")
+    return problems
+
+def compare(results, baseline, threshold, min_seconds):
+    """Regression messages of results against baseline"""
+    if baseline.get('params') != results['params']:
+        print(f"[WARN] Baseline was run with {baseline.get('params')}, this run with {results['params']}")
+    base_stages = {s['name']: s for s in baseline.get('stages', [])}
+    regressions = []
+    print(f"\n[SUMMARY] {'stage':<26} {'baseline s':>10} {'now s':>8} {'change':>8}")
+    for stage in results['stages']:
+        base = base_stages.get(stage['name'])
+        if not base:
+            continue
+        change = (stage['wall_s'] - base['wall_s']) / base['wall_s'] if base['wall_s'] else 0.0
+        flag = ''
+        if stage['wall_s'] > base['wall_s'] * (1 + threshold) and stage['wall_s'] - base['wall_s'] > min_seconds:
+            flag = '  REGRESSION'
+            regressions.append(f"{stage['name']}: {base['wall_s']:.2f}s -> {stage['wall_s']:.2f}s ({change:+.0%})")
+        print(f"[SUMMARY] {stage['name']:<26} {base['wall_s']:>10.2f} {stage['wall_s']:>8.2f} {change:>+8.0%}{flag}")
+    for key, base_size in baseline.get('sizes', {}).items():
+        size = results['sizes'].get(key)
+        if key.endswith('_bytes_per_row') and size is not None and size > base_size * (1 + threshold):
+            regressions.append(f"{key}: {base_size} -> {size}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the visualization pipeline on synthetic data')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small', help='Data size (default: small)')
+    parser.add_argument('--candles', type=int, help='Candles per pair (overrides the preset)')
+    parser.add_argument('--pairs', type=int, help='Number of pairs (overrides the preset)')
+    parser.add_argument('--trades', type=int, help='Trades in the backtest result (overrides the preset)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage, the fastest counts (default: 1)')
+    parser.add_argument('--output', '-o', help='Results JSON path (default: output/benchmarks/<preset>_<time>.json)')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed slowdown as a fraction of the baseline (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help=f'Ignore slowdowns smaller than this many seconds (default: {DEFAULT_MIN_SECONDS})')
+    parser.add_argument('--workdir', help='Where to build the bench project (default: a temp folder)')
+    parser.add_argument('--keep', action='store_true', help='Keep the bench project afterwards')
+    args = parser.parse_args()
+
+    params = dict(PRESETS[args.preset])
+    for key in ('candles', 'pairs', 'trades'):
+        if getattr(args, key):
+            params[key] = getattr(args, key)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='lwc_bench_')
+    print(f"[INFO] Building bench project in {workdir}: {params}")
+    try:
+        start = time.perf_counter()
+        project = build_project(workdir, params['candles'], params['pairs'], params['trades'])
+        print(f"[INFO] Synthetic data generated in {time.perf_counter() - start:.1f}s")
+        stages = run_stages(project, max(1, args.repeat))
+        sizes, problems = check_outputs(project, params['candles'], params['trades'])
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'params': params,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'stages': stages,
+        'sizes': sizes,
+        'problems': problems,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'output',
+                                         'benchmarks', f"{args.preset}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"[INFO] Results saved to {output}")
+
+    failed = [s['name'] for s in stages if s.get('returncode')]
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(f"[ERROR] Regression: {regression}")
+    if failed:
+        print(f"[ERROR] Failed stages: {failed}")
+    if failed or problems or regressions:
+        sys.exit(1)
+    print("[SUCCESS] Benchmark passed")
+
+if __name__ == '__main__':
+    main()
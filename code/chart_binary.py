@@ -0,0 +1,133 @@
+"""
+Compact columnar chart data format (.lwcb) read by lightweight-charts.html without any text parsing.
+
+Layout (all integers little-endian):
+    bytes 0-3    magic b'LWCB'
+    bytes 4-7    uint32 length of the JSON header
+    header       UTF-8 JSON: {"version": 1, "rows": N, "columns": [{"name", "dtype", "offset", "length"}, ...]}
+                 plus an optional "meta" object (e.g. the level of detail of chart_pyramid.py files)
+    padding      up to the next multiple of 8
+    data         one contiguous buffer per column, each starting on an 8 byte boundary
+
+Column offsets are relative to the start of the data section. Supported dtypes are
+uint32/int64 (time) and float32/float64 (values), so the page can wrap every column in a typed array view.
+"""
+import io
+import json
+import struct
+import numpy as np
+
+MAGIC = b'LWCB'
+VERSION = 1
+EXTENSION = '.lwcb'
+DTYPES = {
+    'uint32': np.dtype('<u4'),
+    'int64': np.dtype('<i8'),
+    'float32': np.dtype('<f4'),
+    'float64': np.dtype('<f8'),
+}
+
+def align8(n):
+    """Round n up to a multiple of 8"""
+    return (n + 7) // 8 * 8
+
+def build_header(rows, columns, meta=None):
+    """
+    Build the encoded header for columns given as [(name, dtype), ...].
+    Returns (header bytes, data section start, column descriptors).
+    """
+    descriptors = []
+    offset = 0
+    for name, dtype in columns:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported column dtype '{dtype}' for column '{name}'")
+        length = rows * DTYPES[dtype].itemsize
+        descriptors.append({'name': name, 'dtype': dtype, 'offset': offset, 'length': length})
+        offset = align8(offset + length)
+    header = {'version': VERSION, 'rows': rows, 'columns': descriptors}
+    if meta:
+        header['meta'] = meta
+    header = json.dumps(header).encode('utf-8')
+    data_start = align8(8 + len(header))
+    return header, data_start, descriptors
+
+def write_prelude(f, header, data_start):
+    """Write magic, header length, header and the padding up to the data section"""
+    f.write(MAGIC)
+    f.write(struct.pack('<I', len(header)))
+    f.write(header)
+    f.write(b' ' * (data_start - 8 - len(header)))
+
+def write_stream(f, columns, meta=None):
+    """
+    Write columns given as [(name, array, dtype), ...] to the binary file object f, with an optional meta
+    dict in the header. Arrays must all have the same length; they are cast to the requested dtype.
+    """
+    rows = len(columns[0][1]) if columns else 0
+    for name, values, dtype in columns:
+        if len(values) != rows:
+            raise ValueError(f"Column '{name}' has {len(values)} rows, expected {rows}")
+    header, data_start, descriptors = build_header(rows, [(name, dtype) for name, _, dtype in columns], meta)
+    write_prelude(f, header, data_start)
+    for (name, values, dtype), desc in zip(columns, descriptors):
+        f.write(b'\0' * (data_start + desc['offset'] - f.tell()))
+        f.write(np.ascontiguousarray(values, dtype=DTYPES[dtype]).tobytes())
+    # Keep the length a multiple of 8 even when the last column is not
+    f.write(b'\0' * (align8(f.tell()) - f.tell()))
+
+def write_columns(path, columns, meta=None):
+    """Write columns given as [(name, array, dtype), ...] to path (see write_stream)"""
+    with open(path, 'wb') as f:
+        write_stream(f, columns, meta)
+    return path
+
+def encode_columns(columns, meta=None):
+    """The .lwcb bytes of columns given as [(name, array, dtype), ...], e.g. for an HTTP response"""
+    buf = io.BytesIO()
+    write_stream(buf, columns, meta)
+    return buf.getvalue()
+
+def write_frame(path, df, time_col='time', time_dtype='uint32', value_dtype='float64'):
+    """
+    Write a DataFrame with an epoch seconds time column, every other column as value_dtype (float32 columns
+    stay float32). Columns that are not numeric (tags, strings) cannot be stored and are skipped; their names
+    are returned.
+    """
+    columns = [(time_col, df[time_col].to_numpy(), time_dtype)]
+    skipped = []
+    for col in df.columns:
+        if col == time_col:
+            continue
+        # Already narrowed (extract_indicators.py --downcast-rtol), widening would only cost memory
+        narrow = df[col].dtype == np.float32
+        try:
+            # NaN stays NaN, which the page treats as a gap (warm-up candles etc.)
+            values = df[col].to_numpy(dtype='float32' if narrow else 'float64', na_value=np.nan)
+        except (TypeError, ValueError):
+            skipped.append(col)
+            continue
+        columns.append((str(col), values, 'float32' if narrow else value_dtype))
+    write_columns(path, columns)
+    return skipped
+
+def read_header(path):
+    """Return (header dict, data section start) of an .lwcb file"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an .lwcb file")
+        (header_len,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    return header, align8(8 + header_len)
+
+def read_columns(path, names=None):
+    """Memory-map the columns of an .lwcb file, returns {name: numpy array}"""
+    header, data_start = read_header(path)
+    out = {}
+    for desc in header['columns']:
+        if names is not None and desc['name'] not in names:
+            continue
+        dtype = DTYPES[desc['dtype']]
+        out[desc['name']] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + desc['offset'],
+                                      shape=(header['rows'],)) if header['rows'] else np.empty(0, dtype)
+    return out
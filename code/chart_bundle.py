@@ -0,0 +1,120 @@
+"""
+One pre-aligned .lwcb file with everything lightweight-charts.html draws, so the page only slices arrays.
+
+    Chart_<strategy>_<pair>-<timeframe>.lwcb
+        time, open, high, low, close, volume        the candles, the shared time axis
+        <indicator columns>                         aligned to the candles, NaN where the indicator file has no
+                                                    row (warm-up, outside the extracted timerange)
+        trade_entries, trade_entry_rate             trades opened in each candle and the rate of the first one
+        trade_exits, trade_exit_rate                same for closed trades
+
+Trades are snapped to the open time of the candle they happened in with searchsorted. The header meta lists
+the column groups ('indicators', 'markers') and how chart_pyramid.py aggregates each non OHLC column.
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+import chart_binary
+import chart_pyramid
+
+EXTENSION = chart_binary.EXTENSION
+BUNDLE_VERSION = 1
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MARKER_COLUMNS = [
+    ('trade_entries', 'uint32'),
+    ('trade_entry_rate', 'float64'),
+    ('trade_exits', 'uint32'),
+    ('trade_exit_rate', 'float64'),
+]
+# chart_pyramid.py: 'line' columns are decimated, 'first' keeps the first value of a bar, the rest are summed
+AGGREGATE = {'trade_entries': 'sum', 'trade_entry_rate': 'first', 'trade_exits': 'sum', 'trade_exit_rate': 'first'}
+
+def align_to(times, source_times, values):
+    """values (on source_times) at times, NaN where source_times has no such time"""
+    idx = np.searchsorted(source_times, times)
+    found = idx < len(source_times)
+    found[found] = source_times[idx[found]] == times[found]
+    out = np.full(len(times), np.nan)
+    out[found] = values[idx[found]]
+    return out
+
+def snap_trades(times, bar_seconds, trade_times, rates):
+    """(count per candle, rate of the first trade per candle) of trades at trade_times"""
+    counts = np.zeros(len(times), dtype=np.uint32)
+    first_rates = np.full(len(times), np.nan)
+    if not len(times):
+        return counts, first_rates
+    # The candle a trade happened in is the last one opening at or before it
+    idx = np.searchsorted(times, trade_times, side='right') - 1
+    keep = (idx >= 0) & (trade_times < times[-1] + bar_seconds)
+    idx, trade_times, rates = idx[keep], trade_times[keep], rates[keep]
+    order = np.argsort(trade_times, kind='stable')
+    idx, rates = idx[order], rates[order]
+    np.add.at(counts, idx, 1)
+    candles, first = np.unique(idx, return_index=True)
+    first_rates[candles] = rates[first]
+    return counts, first_rates
+
+def build_bundle(ohlcv_path, indicator_path=None, markers_path=None, dest=None, meta=None):
+    """Write the bundle of an OHLCV .lwcb file (plus optional indicator and markers .lwcb files) to dest"""
+    header, _ = chart_binary.read_header(ohlcv_path)
+    dtypes = {desc['name']: desc['dtype'] for desc in header['columns']}
+    ohlcv = chart_binary.read_columns(ohlcv_path)
+    times = np.asarray(ohlcv['time'])
+    columns = [('time', times, dtypes['time'])]
+    columns += [(name, ohlcv[name], dtypes[name]) for name in OHLCV_COLUMNS if name in ohlcv]
+    bar_seconds = chart_pyramid.bar_seconds(times)
+
+    indicators = []
+    if indicator_path:
+        ind_header, _ = chart_binary.read_header(indicator_path)
+        ind = chart_binary.read_columns(indicator_path)
+        ind_times = np.asarray(ind['time'])
+        for desc in ind_header['columns']:
+            name = desc['name']
+            if name == 'time':
+                continue
+            if name in dtypes or name in AGGREGATE:
+                print(f"[WARN] Indicator column '{name}' clashes with a candle/marker column, left out of the bundle")
+                continue
+            columns.append((name, align_to(times, ind_times, ind[name]), desc['dtype']))
+            indicators.append(name)
+
+    markers = []
+    if markers_path:
+        m = chart_binary.read_columns(markers_path)
+        closed = np.asarray(m['close_time']) > 0
+        entries, entry_rates = snap_trades(times, bar_seconds, np.asarray(m['open_time']), np.asarray(m['open_rate']))
+        exits, exit_rates = snap_trades(times, bar_seconds, np.asarray(m['close_time'])[closed],
+                                        np.asarray(m['close_rate'])[closed])
+        arrays = {'trade_entries': entries, 'trade_entry_rate': entry_rates,
+                  'trade_exits': exits, 'trade_exit_rate': exit_rates}
+        columns += [(name, arrays[name], dtype) for name, dtype in MARKER_COLUMNS]
+        markers = [name for name, _ in MARKER_COLUMNS]
+
+    bundle_meta = dict(meta or {}, bundle=BUNDLE_VERSION, indicators=indicators, markers=markers,
+                       aggregate=dict({name: 'line' for name in indicators},
+                                      **{name: AGGREGATE[name] for name in markers}))
+    dest = dest or os.path.splitext(ohlcv_path)[0] + '_bundle' + EXTENSION
+    chart_binary.write_columns(dest, columns, bundle_meta)
+    return dest
+
+def main():
+    parser = argparse.ArgumentParser(description='Write one pre-aligned chart bundle from OHLCV/indicator/markers .lwcb files')
+    parser.add_argument('--ohlcv', required=True, help='OHLCV .lwcb file (the time axis of the bundle)')
+    parser.add_argument('--indicators', help='Indicator .lwcb file')
+    parser.add_argument('--markers', help='Markers .lwcb file written by export_markers.py')
+    parser.add_argument('--output', '-o', help='Output .lwcb path (default: <ohlcv>_bundle.lwcb)')
+    args = parser.parse_args()
+
+    for path in (args.ohlcv, args.indicators, args.markers):
+        if path and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            sys.exit(1)
+    dest = build_bundle(args.ohlcv, args.indicators, args.markers, args.output)
+    print(f"[INFO] Bundle written -> {dest}")
+
+if __name__ == '__main__':
+    main()
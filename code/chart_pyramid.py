@@ -0,0 +1,189 @@
+"""
+Multi-resolution (level of detail) copies of the OHLCV and indicator .lwcb files, so lightweight-charts.html
+can open any history at an overview resolution and switch to finer levels while zooming in.
+
+    OHLCV_BTCUSDT-5m.lwcb           full resolution
+    OHLCV_BTCUSDT-5m.lod2.lwcb      2 candles per bar
+    OHLCV_BTCUSDT-5m.lod4.lwcb      4 candles per bar
+    OHLCV_BTCUSDT-5m.lod16.lwcb     16 candles per bar, then x4 until a level fits in the point budget
+
+Bars are aligned on multiples of their width in epoch seconds, so the OHLCV and indicator levels of the same
+factor share their time axis and coarser bars are made of whole finer bars. OHLCV bars are aggregated
+(first open, max high, min low, last close, summed volume). Indicator lines keep one point per bar picked the
+largest-triangle way (the point furthest from the line between the neighbouring bars' averages), so spikes
+survive where a plain mean or stride would flatten them. Each level stores its factor and bar width in the
+header meta.
+"""
+import os
+import re
+import glob
+import argparse
+import numpy as np
+
+import chart_binary
+
+# Must match POINT_BUDGET in lightweight-charts.html
+DEFAULT_POINT_BUDGET = 5000
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close')
+LEVEL_PATTERN = re.compile(r'\.lod(\d+)\.lwcb$')
+
+def level_factors():
+    """2, 4, 16, 64, ..."""
+    yield 2
+    factor = 4
+    while True:
+        yield factor
+        factor *= 4
+
+def level_path(path, factor):
+    """OHLCV_X.lwcb -> OHLCV_X.lod<factor>.lwcb"""
+    return os.path.splitext(path)[0] + f".lod{factor}" + chart_binary.EXTENSION
+
+def is_level_file(path):
+    return LEVEL_PATTERN.search(path) is not None
+
+def existing_levels(path):
+    """Level files written for path, finest first"""
+    pattern = glob.escape(os.path.splitext(path)[0]) + '.lod*' + chart_binary.EXTENSION
+    levels = [p for p in glob.glob(pattern) if is_level_file(p)]
+    return sorted(levels, key=lambda p: int(LEVEL_PATTERN.search(p).group(1)))
+
+def bar_seconds(times):
+    """Candle width of a time column (most common step, robust to gaps)"""
+    if len(times) < 2:
+        return 0
+    steps = np.diff(times.astype(np.int64))
+    steps = steps[steps > 0]
+    if not len(steps):
+        return 0
+    values, counts = np.unique(steps, return_counts=True)
+    return int(values[np.argmax(counts)])
+
+def buckets(times, width):
+    """(bar start times, index of the first row of each bar) for bars of width seconds"""
+    keys = times.astype(np.int64) // width * width
+    if not len(keys):
+        return keys, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], starts
+
+def first_valid(values, starts):
+    """First non-NaN value of each bar starting at starts (NaN for all-NaN bars)"""
+    positions = np.where(np.isnan(values), len(values), np.arange(len(values)))
+    first = np.minimum.reduceat(positions, starts)
+    found = first < len(values)
+    out = np.full(len(starts), np.nan)
+    out[found] = values[first[found]]
+    return out
+
+def aggregate_ohlcv(columns, starts, kinds=None):
+    """Aggregate OHLCV columns over the bars starting at starts, other columns by kinds (default: summed)"""
+    ends = np.r_[starts[1:], len(columns['close'])] - 1
+    out = {
+        'open': columns['open'][starts],
+        'high': np.fmax.reduceat(columns['high'], starts),
+        'low': np.fmin.reduceat(columns['low'], starts),
+        'close': columns['close'][ends],
+    }
+    for name, values in columns.items():
+        if name in out or name == 'time':
+            continue
+        if (kinds or {}).get(name) == 'first':
+            out[name] = first_valid(np.asarray(values, dtype=np.float64), starts)
+        else:
+            # volume, trade counts and anything else additive
+            out[name] = np.add.reduceat(np.nan_to_num(values), starts)
+    return out
+
+def decimate_line(times, values, starts):
+    """One value per bar: the point with the largest triangle to the neighbouring bars' averages"""
+    n = len(starts)
+    counts = np.diff(np.r_[starts, len(values)])
+    bar = np.repeat(np.arange(n), counts)
+    values = values.astype(np.float64)
+    times = times.astype(np.float64)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    valid_counts = np.bincount(bar, weights=valid, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_v = np.bincount(bar, weights=filled, minlength=n) / valid_counts
+    avg_t = np.bincount(bar, weights=times, minlength=n) / counts
+    # The first and last bar, and bars next to a gap, are compared against their own average
+    prev_v = np.r_[avg_v[:1], avg_v[:-1]]
+    next_v = np.r_[avg_v[1:], avg_v[-1:]]
+    prev_v = np.where(np.isnan(prev_v), avg_v, prev_v)[bar]
+    next_v = np.where(np.isnan(next_v), avg_v, next_v)[bar]
+    prev_t = np.r_[avg_t[:1], avg_t[:-1]][bar]
+    next_t = np.r_[avg_t[1:], avg_t[-1:]][bar]
+    area = np.abs((prev_t - next_t) * (filled - prev_v) - (prev_t - times) * (next_v - prev_v))
+    area = np.where(valid & ~np.isnan(area), area, -1.0)
+    # Rows sorted by bar then by decreasing area, the first of each bar is its pick
+    order = np.lexsort((-area, bar))
+    return values[order[starts]]
+
+def column_dtypes(path):
+    header, _ = chart_binary.read_header(path)
+    return {desc['name']: desc['dtype'] for desc in header['columns']}, header.get('meta', {})
+
+def build_pyramid(path, point_budget=DEFAULT_POINT_BUDGET):
+    """
+    Write the levels of an OHLCV or indicator .lwcb file next to it until one has at most point_budget bars.
+    Stale levels of an earlier run are removed. Returns the written paths, coarsest last.
+    """
+    for old in existing_levels(path):
+        os.remove(old)
+    dtypes, base_meta = column_dtypes(path)
+    columns = chart_binary.read_columns(path)
+    times = np.asarray(columns['time'])
+    rows = len(times)
+    step = bar_seconds(times)
+    if rows <= point_budget or not step:
+        return []
+    is_ohlcv = all(name in columns for name in OHLCV_COLUMNS)
+    names = [name for name in dtypes if name != 'time']
+    # chart_bundle.py files carry indicator lines next to the candles, and say so in their meta
+    kinds = base_meta.get('aggregate', {})
+    lines = [name for name in names if kinds.get(name) == 'line'] if is_ohlcv else names
+    written = []
+    level = {name: np.asarray(columns[name]) for name in names if name not in lines}
+    level_times = times
+    for factor in level_factors():
+        width = step * factor
+        bar_times, starts = buckets(level_times if is_ohlcv else times, width)
+        if is_ohlcv:
+            # Coarser bars are made of whole finer bars, aggregate the previous level
+            level = aggregate_ohlcv({name: level[name] for name in names if name not in lines}, starts, kinds)
+        if lines:
+            # Lines are always picked from the full resolution so errors do not compound. The full resolution
+            # bars of this width are the same as the ones aggregated from the previous level
+            line_starts = buckets(times, width)[1] if is_ohlcv else starts
+            level.update({name: decimate_line(times, np.asarray(columns[name]), line_starts) for name in lines})
+        level_times = bar_times
+        out = level_path(path, factor)
+        meta = dict(base_meta, lod_factor=factor, bar_seconds=int(width), source_rows=rows)
+        chart_binary.write_columns(out, [('time', bar_times, dtypes['time'])] +
+                                   [(name, level[name], dtypes[name]) for name in names], meta)
+        written.append(out)
+        if len(bar_times) <= point_budget or len(bar_times) <= 1:
+            break
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='Write level of detail copies of OHLCV/indicator .lwcb files')
+    parser.add_argument('files', nargs='+', help='OHLCV or indicator .lwcb files')
+    parser.add_argument('--budget', type=int, default=DEFAULT_POINT_BUDGET,
+                        help=f'Stop once a level has at most this many bars (default: {DEFAULT_POINT_BUDGET})')
+    args = parser.parse_args()
+
+    for path in args.files:
+        if is_level_file(path):
+            continue
+        written = build_pyramid(path, args.budget)
+        if written:
+            print(f"[INFO] {os.path.basename(path)}: {len(written)} levels, coarsest "
+                  f"{os.path.basename(written[-1])}")
+        else:
+            print(f"[INFO] {os.path.basename(path)} already fits in {args.budget} points, no levels needed")
+
+if __name__ == '__main__':
+    main()
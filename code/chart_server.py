@@ -0,0 +1,307 @@
+"""
+Local HTTP server answering lightweight-charts.html with the part of the chart data that is on screen.
+
+    python chart_server.py --ohlcv output/OHLCV_BTCUSDT-5m.lwcb --indicators output/Indicator_X.lwcb \\
+                           --markers output/Markers_X_BTCUSDT-5m.lwcb
+
+main.py offers to start it after copying the output files. Endpoints (times in epoch seconds):
+
+    /                                   lightweight-charts.html, which then loads everything from this server
+    /info                               JSON: levels, time extent, indicator columns, marker count
+    /ohlcv?from=&to=&res=               OHLCV bars between from and to as .lwcb
+    /indicators?cols=a,b&from=&to=&res= indicator columns aligned to the bars /ohlcv returns for the same query
+    /markers?from=&to=                  trades opened between from and to as .lwcb (export_markers.py columns)
+    /events                             server-sent events: 'reload' when main.py --watch rewrote the files
+
+res is a level factor of chart_pyramid.py (1 is the full resolution) or 'auto' (default): the finest level
+with at most POINT_BUDGET bars in the range. Every file is memory-mapped once and each query is a binary
+search on its time column, so memory stays flat whatever the history length.
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import threading
+import webbrowser
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+
+import chart_binary
+import chart_pyramid
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+POINT_BUDGET = chart_pyramid.DEFAULT_POINT_BUDGET
+# Explicit res queries may ask for more than the budget (prefetching), but not for everything at once
+MAX_ROWS = 8 * POINT_BUDGET
+CHART_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lightweight-charts.html')
+# Seconds between the checks of /events for reloaded data, and between its keep-alive comments
+EVENTS_CHECK_SECONDS = 0.5
+EVENTS_PING_SECONDS = 15
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+class QueryError(Exception):
+    """Bad query parameters, answered with 400"""
+
+def load_levels(path):
+    """Memory-mapped full resolution file and its chart_pyramid.py levels, finest first"""
+    levels = []
+    for level_path in [path] + chart_pyramid.existing_levels(path):
+        header, _ = chart_binary.read_header(level_path)
+        columns = chart_binary.read_columns(level_path)
+        meta = header.get('meta', {})
+        times = columns['time']
+        levels.append({
+            'path': level_path,
+            'factor': meta.get('lod_factor', 1),
+            'bar_seconds': meta.get('bar_seconds') or chart_pyramid.bar_seconds(np.asarray(times[:1000])),
+            'dtypes': {desc['name']: desc['dtype'] for desc in header['columns']},
+            'columns': columns,
+            'times': times,
+        })
+    return levels
+
+class ChartData:
+    """
+    The memory-mapped files of one chart and the range queries on them. Whoever rewrites the files holds lock
+    meanwhile and calls reload() afterwards; requests are answered under the same lock.
+    """
+
+    def __init__(self, ohlcv, indicators=None, markers=None):
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.load(ohlcv, indicators, markers)
+
+    def reload(self, ohlcv, indicators=None, markers=None):
+        """Map the (rewritten) files again, pages listening on /events reload"""
+        with self.lock:
+            self.load(ohlcv, indicators, markers)
+            self.generation += 1
+
+    def load(self, ohlcv, indicators=None, markers=None):
+        self.ohlcv = load_levels(ohlcv)
+        self.indicators = load_levels(indicators) if indicators else []
+        self.markers = None
+        if markers:
+            header, _ = chart_binary.read_header(markers)
+            columns = chart_binary.read_columns(markers)
+            # Trades are in result order, keep an open time order index (one int per trade)
+            order = np.argsort(columns['open_time'], kind='stable')
+            self.markers = {'dtypes': {d['name']: d['dtype'] for d in header['columns']},
+                            'columns': columns, 'order': order, 'times': columns['open_time'][order]}
+
+    def info(self):
+        base = self.ohlcv[0]
+        return {
+            'point_budget': POINT_BUDGET,
+            'rows': len(base['times']),
+            'first_time': int(base['times'][0]) if len(base['times']) else None,
+            'last_time': int(base['times'][-1]) if len(base['times']) else None,
+            'levels': [{'factor': lv['factor'], 'bar_seconds': lv['bar_seconds'], 'rows': len(lv['times'])}
+                       for lv in self.ohlcv],
+            'indicator_columns': [c for c in self.indicators[0]['dtypes'] if c != 'time'] if self.indicators else [],
+            'markers': len(self.markers['times']) if self.markers else 0,
+        }
+
+    def window(self, query):
+        """(level, first row, end row) of the OHLCV bars a query asks for"""
+        start, end = query_time(query, 'from', 0), query_time(query, 'to', 2**32 - 1)
+        res = query.get('res', 'auto')
+        if res == 'auto':
+            for level in self.ohlcv:
+                lo, hi = time_slice(level['times'], start, end)
+                if hi - lo <= POINT_BUDGET:
+                    break
+            if hi - lo > POINT_BUDGET:
+                # Not even the coarsest level fits, send the budget around the middle of the range
+                lo += (hi - lo - POINT_BUDGET) // 2
+                hi = lo + POINT_BUDGET
+            return level, lo, hi
+        levels = {str(level['factor']): level for level in self.ohlcv}
+        if res not in levels:
+            raise QueryError(f"Unknown res '{res}', available: auto, {', '.join(levels)}")
+        level = levels[res]
+        lo, hi = time_slice(level['times'], start, end)
+        if hi - lo > MAX_ROWS:
+            raise QueryError(f"{hi - lo} bars in range at res {res}, at most {MAX_ROWS} per query")
+        return level, lo, hi
+
+    def ohlcv_slice(self, query):
+        level, lo, hi = self.window(query)
+        meta = {'lod_factor': level['factor'], 'bar_seconds': level['bar_seconds'], 'first_row': lo}
+        return chart_binary.encode_columns(
+            [(name, level['columns'][name][lo:hi], dtype) for name, dtype in level['dtypes'].items()], meta)
+
+    def indicator_slice(self, query):
+        if not self.indicators:
+            raise QueryError("No indicator file loaded")
+        level, lo, hi = self.window(query)
+        times = np.asarray(level['times'][lo:hi])
+        # Same factor level if there is one, else the values at the bar start times from the full resolution
+        source = next((lv for lv in self.indicators if lv['factor'] == level['factor']), self.indicators[0])
+        names = [c for c in query.get('cols', '').split(',') if c] or \
+                [c for c in source['dtypes'] if c != 'time']
+        unknown = [c for c in names if c not in source['dtypes'] or c == 'time']
+        if unknown:
+            raise QueryError(f"Unknown indicator column(s): {unknown}")
+        idx = np.searchsorted(source['times'], times)
+        found = idx < len(source['times'])
+        found[found] = np.asarray(source['times'][idx[found]]) == times[found]
+        idx = np.where(found, idx, 0)
+        columns = [('time', times, level['dtypes']['time'])]
+        for name in names:
+            values = np.asarray(source['columns'][name][idx], dtype=np.float64) if len(source['times']) else \
+                np.full(len(times), np.nan)
+            columns.append((name, np.where(found, values, np.nan), source['dtypes'][name]))
+        return chart_binary.encode_columns(columns, {'lod_factor': level['factor'],
+                                                     'bar_seconds': level['bar_seconds']})
+
+    def marker_slice(self, query):
+        if not self.markers:
+            raise QueryError("No markers file loaded")
+        start, end = query_time(query, 'from', 0), query_time(query, 'to', 2**32 - 1)
+        lo, hi = time_slice(self.markers['times'], start, end)
+        rows = self.markers['order'][lo:hi]
+        return chart_binary.encode_columns(
+            [(name, self.markers['columns'][name][rows], dtype) for name, dtype in self.markers['dtypes'].items()])
+
+def time_slice(times, start, end):
+    """Rows of a sorted time column between start and end (both included)"""
+    return int(np.searchsorted(times, start, side='left')), int(np.searchsorted(times, end, side='right'))
+
+def query_time(query, name, default):
+    value = query.get(name, '')
+    if value == '':
+        return default
+    try:
+        return int(float(value))
+    except ValueError:
+        raise QueryError(f"'{name}' must be epoch seconds, got '{value}'")
+
+def route(data, path, query):
+    """(status, content type, body) of a GET request"""
+    if path in ('/', '/lightweight-charts.html'):
+        with open(CHART_PAGE, 'rb') as f:
+            return 200, 'text/html; charset=utf-8', f.read()
+    if path == '/info':
+        return 200, 'application/json', json.dumps(data.info()).encode('utf-8')
+    handlers = {'/ohlcv': data.ohlcv_slice, '/indicators': data.indicator_slice, '/markers': data.marker_slice}
+    if path not in handlers:
+        return 404, 'text/plain', f"Unknown path {path}".encode('utf-8')
+    try:
+        return 200, 'application/octet-stream', handlers[path](query)
+    except QueryError as e:
+        return 400, 'text/plain', str(e).encode('utf-8')
+
+async def stream_events(data, writer):
+    """Answer /events: one 'reload' event each time data is reloaded, until the page goes away"""
+    writer.write(("HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-store\r\n"
+                  "Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n").encode('latin-1'))
+    generation = data.generation
+    idle = 0.0
+    while True:
+        if data.generation != generation:
+            generation = data.generation
+            writer.write(f"event: reload\ndata: {generation}\n\n".encode('utf-8'))
+        elif idle >= EVENTS_PING_SECONDS:
+            writer.write(b": ping\n\n")
+        else:
+            idle += EVENTS_CHECK_SECONDS
+            await asyncio.sleep(EVENTS_CHECK_SECONDS)
+            continue
+        idle = 0.0
+        await writer.drain()
+
+async def handle_connection(data, reader, writer):
+    """Answer the requests of one (keep-alive) connection"""
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode('latin-1').split('\r\n')
+            parts = lines[0].split(' ')
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(':') for l in lines[1:] if l)}
+            if len(parts) != 3:
+                break
+            method, target, _ = parts
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if method == 'GET' and url.path == '/events':
+                await stream_events(data, writer)
+                break
+            if method == 'OPTIONS':
+                status, content_type, body = 204, 'text/plain', b''
+            elif method != 'GET':
+                status, content_type, body = 405, 'text/plain', b'Only GET is supported'
+            else:
+                try:
+                    with data.lock:
+                        status, content_type, body = route(data, url.path, query)
+                except Exception as e:
+                    print(f"[ERROR] {target}: {type(e).__name__}: {e}")
+                    status, content_type, body = 500, 'text/plain', str(e).encode('utf-8')
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                          f"Content-Type: {content_type}\r\n"
+                          f"Content-Length: {len(body)}\r\n"
+                          # The page may also be opened from disk or another local server
+                          "Access-Control-Allow-Origin: *\r\n"
+                          "Cache-Control: no-store\r\n"
+                          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1'))
+            writer.write(body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve(data, host=DEFAULT_HOST, port=DEFAULT_PORT, open_browser=False):
+    server = await asyncio.start_server(lambda r, w: handle_connection(data, r, w), host, port)
+    url = f"http://{host}:{port}/"
+    info = data.info()
+    print(f"[INFO] Chart data server on {url} ({info['rows']} candles, {len(info['levels'])} levels, "
+          f"{len(info['indicator_columns'])} indicator columns, {info['markers']} trades), Ctrl+C to stop")
+    if open_browser:
+        webbrowser.open(url)
+    async with server:
+        await server.serve_forever()
+
+def run(ohlcv, indicators=None, markers=None, host=DEFAULT_HOST, port=DEFAULT_PORT, open_browser=False):
+    """Serve the given files until Ctrl+C"""
+    data = ChartData(ohlcv, indicators, markers)
+    try:
+        asyncio.run(serve(data, host, port, open_browser))
+    except KeyboardInterrupt:
+        print("\n[INFO] Chart data server stopped")
+
+def start(data, host=DEFAULT_HOST, port=DEFAULT_PORT, open_browser=False):
+    """Serve data from a background thread (main.py --watch keeps working in the main one)"""
+    thread = threading.Thread(target=asyncio.run, args=(serve(data, host, port, open_browser),), daemon=True,
+                              name='chart_server')
+    thread.start()
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve visible-range chart data to lightweight-charts.html')
+    parser.add_argument('--ohlcv', required=True, help='OHLCV .lwcb file (its .lod<N>.lwcb levels are found next to it)')
+    parser.add_argument('--indicators', help='Indicator .lwcb file')
+    parser.add_argument('--markers', help='Markers .lwcb file written by export_markers.py')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Interface to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--open', action='store_true', help='Open the chart in the default browser')
+    args = parser.parse_args()
+
+    for path in (args.ohlcv, args.indicators, args.markers):
+        if path and not os.path.exists(path):
+            print(f"[ERROR] File not found: {path}")
+            sys.exit(1)
+    run(args.ohlcv, args.indicators, args.markers, args.host, args.port, args.open)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Export the trades of one strategy (and optionally one pair) from a backtest result into a small
+columnar .lwcb markers file for lightweight-charts.html.
+
+The result json is parsed incrementally: only the trades array of the selected strategy is decoded,
+one trade at a time, so multi-GB result files are never held in memory. Everything else is skipped by
+scanning its brackets and strings, without decoding it.
+"""
+import io
+import os
+import re
+import sys
+import json
+import zipfile
+import argparse
+from contextlib import contextmanager
+import numpy as np
+
+import chart_binary
+import unzip_backtest_results
+
+CHUNK_SIZE = 1 << 16
+# What skip_value() steps over in one go: everything up to the next bracket, strings (which may hold brackets)
+# included as a whole. It stops short of a string that goes on in the next chunk.
+SKIP_RUN = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+MARKER_COLUMNS = [
+    ('open_time', 'uint32'),
+    ('open_rate', 'float64'),
+    ('close_time', 'uint32'),     # 0 while the trade is still open
+    ('close_rate', 'float64'),    # NaN while the trade is still open
+    ('is_short', 'uint32'),
+    ('profit_ratio', 'float64'),
+]
+
+class JsonStream:
+    """Minimal pull parser over a text stream, decodes one value at a time with json.JSONDecoder.raw_decode"""
+
+    def __init__(self, text_stream):
+        self.stream = text_stream
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_size=CHUNK_SIZE):
+        """Drop consumed text and read at least min_size more characters"""
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        chunk = self.stream.read(max(min_size, CHUNK_SIZE))
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it), '' at end of input"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in result json, found '{self.peek()}'")
+        self.pos += 1
+
+    def read_value(self):
+        """Decode the next complete json value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number ending exactly at the buffer end might continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so skipping a huge value stays linear
+            self._fill(len(self.buf))
+
+    def skip_value(self):
+        """
+        Consume the next json value without decoding it: a regex steps over everything between its brackets,
+        which are counted. Consumed text is dropped as the scan goes, so skipping a huge value takes constant memory.
+        """
+        if self.peek() not in ('{', '['):
+            # String, number, true, false or null
+            self.read_value()
+            return
+        depth = 0
+        while True:
+            self.pos = SKIP_RUN.match(self.buf, self.pos).end()
+            char = self.buf[self.pos:self.pos + 1]
+            if char in ('{', '['):
+                depth += 1
+            elif char in ('}', ']'):
+                depth -= 1
+            else:
+                # End of the chunk, or a string that goes on in the next one: read on (geometrically, a
+                # string is scanned again)
+                if self.eof:
+                    raise ValueError('Unexpected end of result json')
+                self._fill(len(self.buf) - self.pos)
+                continue
+            self.pos += 1
+            if depth == 0:
+                return
+
+    def iter_object(self):
+        """Yield the keys of the object at the current position; the caller must consume each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def iter_array(self):
+        """Yield once per element of the array at the current position; the caller must consume each element"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+def iter_trades(text_stream, strategy=None, pair=None):
+    """
+    Yield (strategy name, trade dict) for every trade of the selected strategy (first one if None),
+    filtered on pair when given.
+    """
+    parser = JsonStream(text_stream)
+    for key in parser.iter_object():
+        if key != 'strategy':
+            parser.skip_value()
+            continue
+        for strat_name in parser.iter_object():
+            if strategy is None:
+                strategy = strat_name
+            if strat_name != strategy:
+                parser.skip_value()
+                continue
+            for field in parser.iter_object():
+                if field != 'trades':
+                    parser.skip_value()
+                    continue
+                for _ in parser.iter_array():
+                    trade = parser.read_value()
+                    if pair is None or trade.get('pair') == pair:
+                        yield strat_name, trade
+
+@contextmanager
+def open_text(result_path):
+    """Text stream over a result .json, or over the result member of a .zip"""
+    if zipfile.is_zipfile(result_path):
+        with unzip_backtest_results.open_result(result_path) as stream:
+            yield io.TextIOWrapper(stream, encoding='utf-8')
+    else:
+        with open(result_path, 'r', encoding='utf-8') as f:
+            yield f
+
+def collect_markers(result_path, strategy=None, pair=None):
+    """Return {column: numpy array} with one row per matching trade"""
+    values = {name: [] for name, _ in MARKER_COLUMNS}
+    with open_text(result_path) as text:
+        for _, trade in iter_trades(text, strategy, pair):
+            close_ts = trade.get('close_timestamp')
+            close_rate = trade.get('close_rate')
+            closed = bool(close_ts) and close_rate is not None and not trade.get('is_open', False)
+            values['open_time'].append(trade['open_timestamp'] // 1000)
+            values['open_rate'].append(trade['open_rate'])
+            values['close_time'].append(close_ts // 1000 if closed else 0)
+            values['close_rate'].append(close_rate if closed else np.nan)
+            values['is_short'].append(1 if trade.get('is_short') else 0)
+            values['profit_ratio'].append(trade.get('profit_ratio', np.nan))
+    return {name: np.asarray(values[name], dtype=chart_binary.DTYPES[dtype]) for name, dtype in MARKER_COLUMNS}
+
+def export_markers(result_path, dest, strategy=None, pair=None):
+    """Write the markers of one strategy/pair to dest, returns the number of trades"""
+    columns = collect_markers(result_path, strategy, pair)
+    chart_binary.write_columns(dest, [(name, columns[name], dtype) for name, dtype in MARKER_COLUMNS])
+    return len(columns['open_time'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Export compact trade markers from a backtest result')
+    parser.add_argument('--result', '-r', required=True, help='Backtest result .json or .zip')
+    parser.add_argument('--strategy', '-s', help='Strategy name (default: first strategy in the result)')
+    parser.add_argument('--pair', '-p', help='Only trades of this pair (e.g. BTC/USDT)')
+    parser.add_argument('--output', '-o', help='Output .lwcb path (default: next to the result)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.result):
+        print(f"[ERROR] Result not found: {args.result}")
+        sys.exit(1)
+    output = args.output or os.path.splitext(args.result)[0] + '_markers' + chart_binary.EXTENSION
+    count = export_markers(args.result, output, args.strategy, args.pair)
+    if not count:
+        print(f"[WARN] No trades matched strategy={args.strategy} pair={args.pair}")
+    print(f"[INFO] Exported {count} trades -> {output}")
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,39 @@ import os
 import sys
 import json
 import argparse
-import glob
-import re
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import io
 import importlib.util
 import inspect 
+import time
+import hashlib
+import cProfile
+import pstats
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+# Copied next to this script by main.py
+import stage_timer
+import strategy_index
+
+# Strategy instance of this process, set once in the parent and inherited (or rebuilt) by pool workers
+_STRATEGY = None
+# Imported strategy modules by file path, lets a long-lived process (extraction_daemon.py) skip re-executing them
+_STRATEGY_MODULES = {}
+# {strategies folder: strategy_dir_state() when its modules were imported}, any change re-imports them all
+_STRATEGY_DIR_STATES = {}
+BASE_COLS = {'time', 'date', 'open', 'high', 'low', 'close', 'volume'}
+# Bump when the cached frame layout or the extraction logic changes, invalidates every cache entry
+CACHE_VERSION = 2
+DEFAULT_CACHE_MB = 1024
+# Warm-up candles for --incremental when the strategy has no startup_candle_count
+DEFAULT_LOOKBACK = 500
+CSV_CHUNK_ROWS = 100000
+# Functions listed by --profile
+PROFILE_TOP = 20
 
 def find_user_data_dir():
     """Walk up parent folder structuure until we can find config.json"""
@@ -22,29 +50,56 @@ def find_user_data_dir():
 
 def find_strategy_file(strategy_name, strategy_dir, recursive=True):
     print(f"[DEBUG] Looking for strategy '{strategy_name}' in: {strategy_dir} (recursive={recursive})")
-    pattern = re.compile(rf'class\s+{strategy_name}\s*\(.*IStrategy.*\)\s*:')
-    if recursive:
-        files = glob.glob(os.path.join(strategy_dir, '**/*.py'), recursive=True)
+    strategies = strategy_index.find_strategies(strategy_dir, recursive)
+    print(f"[DEBUG] Strategy index lists {len(strategies)} strategies")
+    file = strategies.get(strategy_name)
+    if file:
+        print(f"[DEBUG] Matched class in {file}")
     else:
-        files = glob.glob(os.path.join(strategy_dir, '*.py'))
-    print(f"[DEBUG] Found {len(files)} python files in strategies directory")
-    for file in files:
-        print(f"[DEBUG] Checking {file}")
-        with open(file, 'r', encoding='utf-8') as f:
-            code = f.read()
-            if pattern.search(code):
-                print(f"[DEBUG] Matched class in {file}")
-                return file
-    print(f"[DEBUG] No matching strategy class found in any file")
-    return None
+        print(f"[DEBUG] No matching strategy class found in any file")
+    return file
+
+def strategy_dir_state(strategy_dir):
+    """(path, mtime, size) of every python file of a strategies folder"""
+    state = []
+    for rel_path in strategy_index.list_python_files(strategy_dir):
+        st = os.stat(os.path.join(strategy_dir, rel_path))
+        state.append((rel_path, st.st_mtime_ns, st.st_size))
+    return state
 
-def dynamic_import_strategy(strategy_path, strategy_name):
+def forget_strategy_modules(strategy_dir):
+    """Drop the imported modules of a strategies folder, the next import executes their current source"""
+    prefix = strategy_dir + os.sep
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.abspath(path).startswith(prefix):
+            del sys.modules[name]
+    for path in [p for p in _STRATEGY_MODULES if p.startswith(prefix)]:
+        del _STRATEGY_MODULES[path]
+
+def dynamic_import_strategy(strategy_path, strategy_name, strategy_dir=None):
+    """
+    Strategy class strategy_name of strategy_path. An already imported module is reused until any python file
+    of strategy_dir (default: the strategy's folder) changed: base classes and helpers live there too.
+    """
+    strategy_path = os.path.abspath(strategy_path)
+    strategy_dir = os.path.abspath(strategy_dir or os.path.dirname(strategy_path))
+    state = strategy_dir_state(strategy_dir)
+    if _STRATEGY_DIR_STATES.get(strategy_dir, state) != state:
+        print(f"[DEBUG] Python files in {strategy_dir} changed, importing its modules again")
+        forget_strategy_modules(strategy_dir)
+    _STRATEGY_DIR_STATES[strategy_dir] = state
+    module = _STRATEGY_MODULES.get(strategy_path)
+    if module is not None:
+        print(f"[DEBUG] Reusing imported strategy module {strategy_path}")
+        return getattr(module, strategy_name, None)
     print(f"[DEBUG] Importing strategy class {strategy_name} from {strategy_path}")
     module_name = os.path.splitext(os.path.basename(strategy_path))[0]
     spec = importlib.util.spec_from_file_location(module_name, strategy_path)
     module = importlib.util.module_from_spec(spec)
     sys.modules[module_name] = module
     spec.loader.exec_module(module)
+    _STRATEGY_MODULES[strategy_path] = module
     return getattr(module, strategy_name, None)
 
 def load_config(path):
@@ -52,16 +107,578 @@ def load_config(path):
     with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def ohlcv_candidates(data_dir, exchange_name, pair, timeframe):
+    """Possible OHLCV file locations for a pair, feather first"""
+    # Preventing any OHLCV errors
+    pair_base = pair.replace('/', '').replace('_', '')      # BTC/USDT -> BTCUSDT
+    pair_uscore = pair.replace('/', '_')                    # BTC/USDT -> BTC_USDT
+
+    data_exchange_dir = os.path.join(data_dir, exchange_name)
+    return [
+        os.path.join(data_exchange_dir, f"{pair_base}-{timeframe}.feather"),
+        os.path.join(data_exchange_dir, f"{pair_uscore}-{timeframe}.feather"),
+        os.path.join(data_exchange_dir, f"{pair_base}-{timeframe}.csv"),
+        os.path.join(data_exchange_dir, f"{pair_uscore}-{timeframe}.csv"),
+    ]
+
+def find_ohlcv_file(data_dir, exchange_name, pair, timeframe):
+    """First existing OHLCV file for a pair, or None"""
+    candidates = ohlcv_candidates(data_dir, exchange_name, pair, timeframe)
+    print(f"[DEBUG] Looking for OHLCV file (prefer feather):\n  " + "\n  ".join(candidates))
+    for path in candidates:
+        if os.path.exists(path):
+            print(f"[DEBUG] Using OHLCV {'feather' if path.endswith('.feather') else 'CSV'}: {path}")
+            return path
+    return None
+
+def parse_timerange(timerange):
+    """(start, end) epoch seconds of a YYYYMMDD-YYYYMMDD timerange, either side may be left open (None)"""
+    if not timerange:
+        return None, None
+    start, _, end = timerange.partition('-')
+    start = int(pd.Timestamp(start, tz='UTC').timestamp()) if start else None
+    end = int(pd.Timestamp(end, tz='UTC').timestamp()) if end else None
+    return start, end
+
+def epoch_seconds(dates):
+    """Epoch seconds of a date series, whatever resolution pandas parsed it with"""
+    return (pd.to_datetime(dates, utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+def standardize_ohlcv(df):
+    """Lowercase the columns and make sure there is an epoch seconds 'time' column"""
+    df.columns = [c.lower() for c in df.columns]
+    if 'time' not in df.columns:
+        if 'date' in df.columns:
+            df['time'] = epoch_seconds(df['date'])
+        else:
+            raise ValueError('Missing time or date column.')
+    return df
+
+def range_bounds(times, tmin, tmax, warmup):
+    """Row slice [lo, hi) of a sorted time array covering tmin..tmax plus warmup rows before tmin"""
+    lo = int(times.searchsorted(tmin, side='left')) if tmin is not None else 0
+    hi = int(times.searchsorted(tmax, side='right')) if tmax is not None else len(times)
+    return max(0, lo - warmup), max(hi, lo)
+
+def select_range(df, tmin, tmax, warmup):
+    """Rows of an already loaded frame in tmin..tmax, plus warmup rows before tmin"""
+    if not df['time'].is_monotonic_increasing:
+        df = df.sort_values('time', kind='stable')
+    lo, hi = range_bounds(df['time'].to_numpy(), tmin, tmax, warmup)
+    return df.iloc[lo:hi]
+
+def arrow_batch_times(batch):
+    """Epoch seconds of a record batch, from its 'time' or 'date' column"""
+    names = [n.lower() for n in batch.schema.names]
+    if 'time' in names:
+        return np.asarray(batch.column(names.index('time')).to_numpy(zero_copy_only=False), dtype='int64')
+    if 'date' not in names:
+        raise ValueError('Missing time or date column.')
+    column = batch.column(names.index('date'))
+    if pa.types.is_timestamp(column.type):
+        divisor = {'s': 1, 'ms': 10**3, 'us': 10**6, 'ns': 10**9}[column.type.unit]
+        return column.cast(pa.int64()).to_numpy(zero_copy_only=False) // divisor
+    return epoch_seconds(column.to_pandas()).to_numpy()
+
+def lean_frame(reader, spans):
+    """
+    Convert the row spans [(batch index, start, rows), ...] of an Arrow IPC reader to pandas one record batch
+    at a time, into preallocated columns: next to the result at most one decompressed batch is alive, where
+    Table.to_pandas holds the whole decompressed table until it is done. Returns None for columns it does not
+    handle (strings, nulls outside float columns), the caller then converts the usual way.
+    """
+    schema = reader.schema
+    if not all(pa.types.is_floating(f.type) or pa.types.is_integer(f.type) or pa.types.is_timestamp(f.type)
+               for f in schema):
+        return None
+    rows = sum(n for _, _, n in spans)
+    columns = {}
+    offset = 0
+    for i, start, n in spans:
+        batch = reader.get_batch(i).slice(start, n)
+        for field, column in zip(schema, batch.columns):
+            if column.null_count and not pa.types.is_floating(field.type):
+                return None
+            values = column.to_numpy(zero_copy_only=False)
+            if field.name not in columns:
+                columns[field.name] = np.empty(rows, dtype=values.dtype)
+            columns[field.name][offset:offset + n] = values
+        offset += n
+    df = pd.DataFrame(columns, copy=False)
+    for field in schema:
+        if pa.types.is_timestamp(field.type) and field.type.tz and field.name in df:
+            # Arrow timestamps are UTC instants, numpy drops the zone
+            df[field.name] = df[field.name].dt.tz_localize('UTC').dt.tz_convert(field.type.tz)
+    return df
+
+def load_feather_range(ohlcv_file, tmin, tmax, warmup, lean=False):
+    """
+    Memory-map a feather (Arrow IPC) file, binary search the sorted time column and only convert
+    the record batches that overlap the requested rows to pandas. lean converts them with lean_frame,
+    decompressing into the system allocator so freed batches go back to the OS instead of Arrow's pool.
+    """
+    with pa.memory_map(ohlcv_file, 'r') as source:
+        reader = pa.ipc.open_file(source, memory_pool=pa.system_memory_pool() if lean else None)
+        batch_times = [arrow_batch_times(reader.get_batch(i)) for i in range(reader.num_record_batches)]
+        times = np.concatenate(batch_times) if batch_times else np.empty(0, dtype='int64')
+        if len(times) > 1 and (np.diff(times) < 0).any():
+            return None
+        lo, hi = range_bounds(times, tmin, tmax, warmup)
+        spans = []
+        offset = 0
+        for i, bt in enumerate(batch_times):
+            start, stop = max(lo, offset), min(hi, offset + len(bt))
+            if start < stop:
+                spans.append((i, start - offset, stop - start))
+            offset += len(bt)
+        del batch_times
+        df = lean_frame(reader, spans) if lean else None
+        if df is None:
+            pieces = [reader.get_batch(i).slice(start, n) for i, start, n in spans]
+            df = pa.Table.from_batches(pieces, schema=reader.schema).to_pandas()
+    print(f"[DEBUG] Read {len(df)} of {len(times)} rows from {os.path.basename(ohlcv_file)}")
+    return standardize_ohlcv(df)
+
+def load_csv_range(ohlcv_file, tmin, tmax, warmup, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Scan a csv in chunks, keeping only the last warmup rows before tmin and stopping at the
+    first chunk past tmax (OHLCV files are sorted by time).
+    """
+    tail = None
+    kept = []
+    for chunk in pd.read_csv(ohlcv_file, chunksize=chunk_rows):
+        chunk = standardize_ohlcv(chunk)
+        last_time = chunk['time'].iloc[-1]
+        if tmin is not None and last_time < tmin:
+            if warmup:
+                tail = chunk if tail is None else pd.concat([tail, chunk])
+                tail = tail.iloc[-warmup:]
+            continue
+        kept.append(chunk)
+        if tmax is not None and last_time > tmax:
+            break
+    parts = ([tail] if tail is not None else []) + kept
+    if not parts:
+        return standardize_ohlcv(pd.read_csv(ohlcv_file, nrows=0))
+    return select_range(pd.concat(parts, ignore_index=True), tmin, tmax, warmup)
+
+def load_ohlcv(ohlcv_file, timerange=None, warmup=0, lean=False):
+    """
+    Load an OHLCV feather/csv with a standardized epoch seconds 'time' column, limited to timerange
+    plus warmup candles before its start. Only the needed rows are read when the file is sorted.
+    lean memory-maps feather files even without a timerange.
+    """
+    tmin, tmax = parse_timerange(timerange)
+    if tmin is None and tmax is None and not (lean and ohlcv_file.endswith('.feather')):
+        reader = pd.read_feather if ohlcv_file.endswith('.feather') else pd.read_csv
+        return standardize_ohlcv(reader(ohlcv_file))
+    if ohlcv_file.endswith('.feather'):
+        try:
+            df = load_feather_range(ohlcv_file, tmin, tmax, warmup, lean)
+        except pa.ArrowInvalid:
+            # Feather v1 files are not Arrow IPC files
+            df = None
+        if df is not None:
+            return df
+        return select_range(standardize_ohlcv(pd.read_feather(ohlcv_file)), tmin, tmax, warmup)
+    return load_csv_range(ohlcv_file, tmin, tmax, warmup)
+
+def trim_warmup(df_out, timerange):
+    """Drop the warm-up rows before the timerange start once the indicators are computed"""
+    tmin, _ = parse_timerange(timerange)
+    if tmin is None:
+        return df_out
+    return df_out[df_out['time'] >= tmin].reset_index(drop=True)
+
+def instantiate_strategy(strat_cls, config):
+    """Create the strategy, passing config when the constructor accepts it"""
+    try:
+        sig = inspect.signature(strat_cls)
+        if 'config' in sig.parameters:
+            return strat_cls(config=config)
+        return strat_cls()
+    except TypeError as e:
+        print(f"[WARN] Could not instantiate with config: {e}")
+        return strat_cls()
+
+def compute_indicators(strat, df, pair, profile_path=None, copy=True):
+    """
+    Run populate_indicators, returns (result frame, indicator column names).
+    With profile_path, the call runs under cProfile and its stats are saved there. copy=False hands df itself
+    to the strategy, for callers that do not use it afterwards.
+    """
+    df_in = df.copy() if copy else df
+    if not profile_path:
+        df_out = strat.populate_indicators(df_in, metadata={'pair': pair})
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            df_out = strat.populate_indicators(df_in, metadata={'pair': pair})
+        finally:
+            profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"[INFO] populate_indicators profile for {pair} saved to {profile_path}, top functions:")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(PROFILE_TOP)
+    indicator_cols = [c for c in df_out.columns if c not in BASE_COLS]
+    print(f"[DEBUG] Indicator columns: {indicator_cols}")
+    return df_out, indicator_cols
+
+def downcast_float32(df_out, indicator_cols, rtol):
+    """
+    Store float64 indicator columns as float32 when every value stays within rtol relative error
+    (NaN stays NaN, values out of float32 range fail). Returns the names of the columns left in float64.
+    """
+    kept = []
+    for name in indicator_cols:
+        values = df_out[name].to_numpy()
+        if values.dtype != np.float64:
+            continue
+        with np.errstate(over='ignore', invalid='ignore'):
+            narrow = values.astype(np.float32)
+            ok = np.allclose(narrow, values, rtol=rtol, atol=0, equal_nan=True)
+        if ok:
+            df_out[name] = narrow
+        else:
+            kept.append(name)
+    return kept
+
+def write_outputs(df_out, indicator_cols, output, fmt='csv', value_dtype='float64'):
+    """Write indicator csv and/or .lwcb next to it, returns the written paths"""
+    written = []
+    if fmt in ('csv', 'both'):
+        df_out[['time'] + indicator_cols].to_csv(output, index=False)
+        written.append(output)
+    if fmt in ('lwcb', 'both'):
+        # chart_binary.py is copied next to this script by main.py
+        import chart_binary
+        binary_output = os.path.splitext(output)[0] + chart_binary.EXTENSION
+        skipped = chart_binary.write_frame(binary_output, df_out[['time'] + indicator_cols],
+                                           value_dtype=value_dtype)
+        if skipped:
+            print(f"[WARN] Non-numeric columns left out of {binary_output}: {skipped}")
+        written.append(binary_output)
+    return written
+
+def pair_output_path(indicator_dir, strategy_name, pair):
+    """Per pair output path used by the multi-pair mode"""
+    return os.path.join(indicator_dir, f"indicator_data_{strategy_name}_{pair.replace('/', '_')}.csv")
+
+def cache_base_key(strat_dir, strategy_name, config):
+    """
+    Hash of everything that is shared by all pairs: class name, config and the source of the strategy, of its
+    base classes and of the helper modules it may import (strategy_index.dependency_files)
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}:{strategy_name}:".encode())
+    files = strategy_index.update_index(strat_dir)
+    for rel_path in strategy_index.dependency_files(files, strategy_name):
+        h.update(f"{rel_path}:".encode())
+        with open(os.path.join(strat_dir, rel_path), 'rb') as f:
+            h.update(f.read())
+    h.update(json.dumps(config, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+def cache_key(base_key, ohlcv_file, job):
+    """Per pair cache key: base key + OHLCV file identity + timeframe/pair/timerange"""
+    st = os.stat(ohlcv_file)
+    parts = [base_key, os.path.abspath(ohlcv_file), str(st.st_size), str(st.st_mtime_ns),
+             job['timeframe'], job['pair'], str(job['timerange']), str(job['warmup'])]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+def cache_get(cache_dir, key):
+    """Cached indicator frame for key or None; a hit refreshes the entry for LRU eviction"""
+    path = os.path.join(cache_dir, f"{key}.feather")
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_feather(path)
+    except Exception as e:
+        print(f"[WARN] Dropping unreadable cache entry {path}: {e}")
+        os.remove(path)
+        return None
+    os.utime(path)
+    return df
+
+def cache_put(cache_dir, key, df_out, max_bytes):
+    """Store an indicator frame, then evict least recently used entries above max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.feather")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df_out.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+    evict_cache(cache_dir, max_bytes)
+
+def evict_cache(cache_dir, max_bytes):
+    """Remove the oldest (by last use) entries until the cache fits in max_bytes"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.feather'):
+            continue
+        try:
+            st = os.stat(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            print(f"[DEBUG] Evicted cache entry {name}")
+        except FileNotFoundError:
+            # Another worker evicted it first
+            pass
+        total -= size
+
+def state_path(output):
+    """Sidecar file remembering what the output was computed from, used by --incremental"""
+    return os.path.splitext(output)[0] + '.state.json'
+
+def save_state(job, df_out, indicator_cols):
+    state = {
+        'base_key': job['cache_base_key'],
+        'pair': job['pair'],
+        'timeframe': job['timeframe'],
+        'timerange': job['timerange'],
+        'warmup': job['warmup'],
+        'rows': len(df_out),
+        'last_time': int(df_out['time'].iloc[-1]) if len(df_out) else None,
+        'columns': [str(c) for c in indicator_cols],
+    }
+    with open(state_path(job['output']), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def load_previous_output(job, state):
+    """Previous indicator frame (time + indicator columns) from the csv or .lwcb output, or None"""
+    columns = ['time'] + state['columns']
+    if os.path.exists(job['output']):
+        prev = pd.read_csv(job['output'])
+    else:
+        import chart_binary
+        binary_output = os.path.splitext(job['output'])[0] + chart_binary.EXTENSION
+        if not os.path.exists(binary_output):
+            return None
+        prev = pd.DataFrame({k: v for k, v in chart_binary.read_columns(binary_output).items()})
+    if list(prev.columns) != columns or len(prev) != state['rows']:
+        return None
+    return prev
+
+def extend_indicators(job, df):
+    """
+    Recompute only the candles newer than the previous output, plus a warm-up window before them,
+    and splice them onto the previous output. Returns (frame, indicator columns) or None when a
+    full recompute is needed.
+    """
+    path = state_path(job['output'])
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if any(state.get(k) != job[v] for k, v in (('base_key', 'cache_base_key'), ('pair', 'pair'),
+                                                ('timeframe', 'timeframe'), ('timerange', 'timerange'),
+                                                ('warmup', 'warmup'))):
+        print(f"[DEBUG] {job['pair']}: strategy, config or timerange changed, full recompute")
+        return None
+    prev = load_previous_output(job, state)
+    if prev is None or not state['last_time']:
+        return None
+
+    df = df.reset_index(drop=True)
+    times = df['time'].to_numpy()
+    # Warm-up rows loaded before the timerange start are not part of the previous output
+    tmin, _ = parse_timerange(job['timerange'])
+    offset = int(times.searchsorted(tmin, side='left')) if tmin is not None else 0
+    first_new = int(times.searchsorted(state['last_time'], side='right'))
+    if first_new - offset != state['rows'] or times[first_new - 1] != state['last_time']:
+        print(f"[DEBUG] {job['pair']}: OHLCV history changed, full recompute")
+        return None
+    if first_new == len(df):
+        print(f"[INFO] {job['pair']}: no new candles")
+        return prev, state['columns']
+
+    lookback, verify_rows = job['lookback'], job['verify_rows']
+    start = max(0, first_new - lookback - verify_rows)
+    window_out, indicator_cols = compute_indicators(_STRATEGY, df.iloc[start:], job['pair'])
+    if [str(c) for c in indicator_cols] != state['columns']:
+        return None
+    window_out = window_out[['time'] + indicator_cols]
+
+    if verify_rows and start > 0:
+        # Rows right after the warm-up must match what the full computation produced before
+        check_from = max(first_new - verify_rows, offset)
+        recomputed = window_out[(window_out['time'] >= times[check_from])
+                                & (window_out['time'] <= state['last_time'])]
+        expected = prev.iloc[check_from - offset:first_new - offset]
+        for col in indicator_cols:
+            a = pd.to_numeric(recomputed[col], errors='coerce').to_numpy(dtype='float64')
+            b = pd.to_numeric(expected[col], errors='coerce').to_numpy(dtype='float64')
+            if not np.allclose(a, b, rtol=1e-6, atol=1e-9, equal_nan=True):
+                print(f"[WARN] {job['pair']}: '{col}' differs in the overlap, {lookback} warm-up candles are "
+                      f"not enough (raise --lookback). Falling back to a full recompute.")
+                return None
+
+    new_part = window_out[window_out['time'] > state['last_time']]
+    print(f"[INFO] {job['pair']}: {len(new_part)} new candles, recomputed {len(df) - start} rows")
+    return pd.concat([prev, new_part], ignore_index=True), indicator_cols
+
+def init_worker(strat_file, strategy_name, config):
+    """Pool initializer: forked workers already hold the strategy, spawned ones import it once"""
+    global _STRATEGY
+    if _STRATEGY is None:
+        _STRATEGY = instantiate_strategy(dynamic_import_strategy(strat_file, strategy_name), config)
+
+def extract_pair(job):
+    """
+    Load, compute and write indicators of one pair with the process' strategy, returns a result dict
+    (including the stage records of the pair, measured in the process that ran it).
+    """
+    start = time.perf_counter()
+    result = {'pair': job['pair'], 'rows': 0, 'columns': 0, 'outputs': [], 'seconds': 0.0, 'error': None,
+              'mode': 'full'}
+    trace = stage_timer.StageTrace(job['pair'])
+    try:
+        with trace.stage(job['pair']) as pair_record:
+            ohlcv_file = find_ohlcv_file(job['data_dir'], job['exchange'], job['pair'], job['timeframe'])
+            if not ohlcv_file:
+                raise FileNotFoundError('OHLCV file not found')
+            with trace.stage('cache_lookup') as record:
+                key = cache_key(job['cache_base_key'], ohlcv_file, job) if job['cache_dir'] else None
+                df_out = cache_get(job['cache_dir'], key) if key else None
+                record['hit'] = df_out is not None
+            if df_out is not None:
+                print(f"[DEBUG] Cache hit for {job['pair']} ({key[:12]})")
+                indicator_cols = [c for c in df_out.columns if c != 'time']
+                result['mode'] = 'cached'
+            else:
+                with trace.stage('load_ohlcv') as record:
+                    df = load_ohlcv(ohlcv_file, job['timerange'], job['warmup'], job['lean'])
+                    record['rows'] = len(df)
+                    record['bytes'] = int(df.memory_usage(index=False).sum())
+                with trace.stage('populate_indicators') as record:
+                    extended = extend_indicators(job, df) if job['incremental'] else None
+                    if extended is not None:
+                        df_out, indicator_cols = extended
+                        result['mode'] = 'incremental'
+                    else:
+                        # In lean mode nothing reads the loaded candles afterwards, the strategy may have them
+                        df_out, indicator_cols = compute_indicators(_STRATEGY, df, job['pair'], job['profile_path'],
+                                                                    copy=not job['lean'])
+                        df_out = trim_warmup(df_out, job['timerange'])
+                    record['rows'] = len(df_out)
+                    record['mode'] = result['mode']
+                if job['lean']:
+                    # Only time and the indicators are written, let the candles go before writing
+                    del df
+                    df_out = df_out[['time'] + indicator_cols]
+                if key:
+                    with trace.stage('cache_put'):
+                        cache_put(job['cache_dir'], key, df_out[['time'] + indicator_cols], job['cache_max_bytes'])
+            if job['downcast_rtol'] is not None:
+                with trace.stage('downcast') as record:
+                    kept = downcast_float32(df_out, indicator_cols, job['downcast_rtol'])
+                    if kept:
+                        print(f"[WARN] {job['pair']}: kept as float64, float32 would exceed relative error "
+                              f"{job['downcast_rtol']:g}: {kept}")
+                    record['bytes'] = int(df_out.memory_usage(index=False).sum())
+            with trace.stage('write_outputs') as record:
+                result['outputs'] = write_outputs(df_out, indicator_cols, job['output'], job['format'],
+                                                  job['value_dtype'])
+                save_state(job, df_out, indicator_cols)
+                record['rows'] = len(df_out)
+                record['bytes'] = sum(os.path.getsize(path) for path in result['outputs'])
+            result['rows'], result['columns'] = len(df_out), len(indicator_cols)
+            pair_record['rows'] = result['rows']
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    result['peak_rss_mb'] = stage_timer.peak_rss_mb()
+    result['stages'] = trace.stages
+    return result
+
+def extract_pair_captured(job):
+    """extract_pair in a pool worker: its output is returned with the result and printed by the parent"""
+    log = io.StringIO()
+    with redirect_stdout(log), redirect_stderr(log):
+        result = extract_pair(job)
+    result['log'] = log.getvalue()
+    return result
+
+def run_pairs(jobs, workers, strat_file, strategy_name, config):
+    """Run extract_pair for every job, on a process pool when workers > 1"""
+    results = []
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            results.append(extract_pair(job))
+        return results
+    # fork shares the already imported strategy with the workers, no re-import per pair
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(strat_file, strategy_name, config)) as pool:
+        # Workers never write to stdout themselves: under extraction_daemon.py it is the client's socket, and
+        # lines of several processes would interleave
+        futures = [pool.submit(extract_pair_captured, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            sys.stdout.write(result.pop('log'))
+            results.append(result)
+    return results
+
+def print_pair_report(results, wall_seconds):
+    """Per pair timing table"""
+    print(f"\n[SUMMARY] {'pair':<20} {'rows':>10} {'cols':>5} {'seconds':>8}")
+    for r in sorted(results, key=lambda r: r['pair']):
+        if r['error']:
+            print(f"[SUMMARY] {r['pair']:<20} FAILED: {r['error']}")
+        else:
+            mode = f" ({r['mode']})" if r['mode'] != 'full' else ''
+            print(f"[SUMMARY] {r['pair']:<20} {r['rows']:>10} {r['columns']:>5} {r['seconds']:>8.2f}{mode}")
+    failed = sum(1 for r in results if r['error'])
+    print(f"[SUMMARY] {len(results) - failed}/{len(results)} pairs in {wall_seconds:.2f}s wall")
+
 def main():
+    global _STRATEGY
     parser = argparse.ArgumentParser()
     parser.add_argument('--strategy', '-s', required=True, help='Strategy class name')
     parser.add_argument('--timeframe', '-i', help='Timeframe (e.g. 5m)')
     parser.add_argument('--pair', '-p', help='Pair (e.g. BTC/USDT)')
+    parser.add_argument('--pairs', nargs='+', help='Several pairs, one output per pair (e.g. BTC/USDT ETH/USDT)')
+    parser.add_argument('--all-pairs', action='store_true', help='Every pair of the config pair_whitelist')
+    parser.add_argument('--workers', '-j', type=int, default=0,
+                        help='Worker processes for --pairs/--all-pairs (0 = one per CPU)')
     parser.add_argument('--timerange', help='YYYYMMDD-YYYYMMDD')
     parser.add_argument('--config', '-c', help='Config path (default: auto-find root)')
     parser.add_argument('--output', help='CSV output path', default='indicator_output.csv')  # no longer used!
     parser.add_argument('--strategy-path', help='Custom strategies path')
+    parser.add_argument('--format', choices=['csv', 'lwcb', 'both'], default='csv',
+                        help='Write indicator csv, binary .lwcb chart data, or both (default: csv)')
+    parser.add_argument('--value-dtype', choices=['float64', 'float32'], default='float64',
+                        help='Indicator precision in .lwcb files (default: float64)')
+    parser.add_argument('--no-cache', action='store_true', help='Always recompute, do not read or write the cache')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'Indicator cache size limit in MB, least recently used entries go first '
+                             f'(default: {DEFAULT_CACHE_MB})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only compute candles newer than the previous output (plus a warm-up window)')
+    parser.add_argument('--lookback', type=int,
+                        help=f'Warm-up candles for --incremental (default: strategy startup_candle_count, '
+                             f'or {DEFAULT_LOOKBACK})')
+    parser.add_argument('--verify', action='store_true',
+                        help='With --incremental, also recompute the previous lookback candles and check they '
+                             'match the previous output')
+    parser.add_argument('--lean', action='store_true',
+                        help='Lower peak memory: memory-map the feather input, no defensive copy of the candles for '
+                             'populate_indicators, candles released before writing')
+    parser.add_argument('--downcast-rtol', type=float, metavar='RTOL',
+                        help='Keep indicator columns as float32 (csv and .lwcb) when every value stays within this '
+                             'relative error, e.g. 1e-6; columns that do not stay float64')
+    parser.add_argument('--trace', help='Write a JSON stage trace (time, CPU, memory, rows, bytes) to this path')
+    parser.add_argument('--profile', action='store_true',
+                        help='Run populate_indicators under cProfile, stats saved next to each output (.prof)')
     args = parser.parse_args()
+    trace = stage_timer.StageTrace('extract_indicators')
 
     # Find freqtrade user_data root directory
     user_data_dir = find_user_data_dir()
@@ -80,31 +697,40 @@ def main():
 
     # Note: CLI > config > fallback
     timeframe = args.timeframe or config.get('timeframe', '5m')
+    pairlist = (config.get('exchange', {}) or {}).get('pair_whitelist') or []
+    multi_pair = bool(args.pairs or args.all_pairs)
+    if args.pairs:
+        pairs = args.pairs
+    elif args.all_pairs:
+        pairs = pairlist
+        if not pairs:
+            print("[ERROR] --all-pairs used but config has no pair_whitelist.")
+            sys.exit(1)
     # Pair fallback: if not provided, use first in whitelist if present. If not, give error
-    if args.pair:
-        pair = args.pair
+    elif args.pair:
+        pairs = [args.pair]
+    elif pairlist:
+        pairs = [pairlist[0]]
     else:
-        pairlist = (config.get('exchange', {}) or {}).get('pair_whitelist') or []
-        if pairlist:
-            pair = pairlist[0]
-        else:
-            print("[ERROR] No pair provided and no pair_whitelist in config. Use --pair or add pair_whitelist.")
-            sys.exit(1)
+        print("[ERROR] No pair provided and no pair_whitelist in config. Use --pair or add pair_whitelist.")
+        sys.exit(1)
     timerange = args.timerange or config.get('timerange', None)
 
     print(f"[DEBUG] timeframe: {timeframe}")
-    print(f"[DEBUG] pair: {pair}")
+    print(f"[DEBUG] pair(s): {', '.join(pairs)}")
     print(f"[DEBUG] timerange: {timerange}")
 
 
-    strat_file = find_strategy_file(args.strategy, strat_dir, recursive=True)
+    with trace.stage('find_strategy'):
+        strat_file = find_strategy_file(args.strategy, strat_dir, recursive=True)
     if not strat_file:
         print(f"Strategy {args.strategy} not found in {strat_dir}")
         sys.exit(1)
     print(f"[DEBUG] Found strategy file: {strat_file}")
 
     # Import
-    strat_cls = dynamic_import_strategy(strat_file, args.strategy)
+    with trace.stage('import_strategy'):
+        strat_cls = dynamic_import_strategy(strat_file, args.strategy, strat_dir)
     if not strat_cls:
         print(f"Could not import {args.strategy} from {strat_file}")
         sys.exit(1)
@@ -116,92 +742,83 @@ def main():
         sys.exit(1)
     print(f"[DEBUG] exchange_name: {exchange_name}")
 
-    # Preventing any OHLCV errors
-    pair_base = pair.replace('/', '').replace('_', '')      # BTC/USDT -> BTCUSDT
-    pair_uscore = pair.replace('/', '_')                    # BTC/USDT -> BTC_USDT
-
-    data_exchange_dir = os.path.join(data_dir, exchange_name)
-    feather1 = os.path.join(data_exchange_dir, f"{pair_base}-{timeframe}.feather")
-    feather2 = os.path.join(data_exchange_dir, f"{pair_uscore}-{timeframe}.feather")
-    csv1 = os.path.join(data_exchange_dir, f"{pair_base}-{timeframe}.csv")
-    csv2 = os.path.join(data_exchange_dir, f"{pair_uscore}-{timeframe}.csv")
-
-    print(f"[DEBUG] Looking for OHLCV file (prefer feather):\n  {feather1}\n  {feather2}\n  {csv1}\n  {csv2}")
-
-    ohlcv_file = None
-    if os.path.exists(feather1):
-        ohlcv_file = feather1
-        print(f"[DEBUG] Using OHLCV feather: {feather1}")
-        df = pd.read_feather(ohlcv_file)
-    elif os.path.exists(feather2):
-        ohlcv_file = feather2
-        print(f"[DEBUG] Using OHLCV feather: {feather2}")
-        df = pd.read_feather(ohlcv_file)
-    elif os.path.exists(csv1):
-        ohlcv_file = csv1
-        print(f"[DEBUG] Using OHLCV CSV: {csv1}")
-        df = pd.read_csv(ohlcv_file)
-    elif os.path.exists(csv2):
-        ohlcv_file = csv2
-        print(f"[DEBUG] Using OHLCV CSV: {csv2}")
-        df = pd.read_csv(ohlcv_file)
-    else:
-        print(f"[ERROR] OHLCV file not found in any of these locations.")
-        sys.exit(1)
-    
-
-    # Standardize
-    df.columns = [c.lower() for c in df.columns]
-    if 'time' not in df.columns:
-        if 'date' in df.columns:
-            df['time'] = pd.to_datetime(df['date']).astype(int) // 10**9
-        else:
-            print('Missing time or date column.')
-            sys.exit(1)
-
-    # Timerange stuff
-    if timerange:
-        tmin, tmax = timerange.split('-')
-        tmin = int(pd.Timestamp(tmin, tz='UTC').timestamp())
-        tmax = int(pd.Timestamp(tmax, tz='UTC').timestamp())
-        df = df[(df['time'] >= tmin) & (df['time'] <= tmax)]
-
-
-    strat = None
     try:
-        sig = inspect.signature(strat_cls)
-        if 'config' in sig.parameters:
-            strat = strat_cls(config=config)
-        else:
-            strat = strat_cls()
-    except TypeError as e:
-        print(f"[WARN] Could not instantiate with config: {e}")
-        try:
-            strat = strat_cls()
-        except Exception as e2:
-            print(f"[ERROR] Failed to instantiate strategy: {e2}")
-            sys.exit(1)
+        _STRATEGY = instantiate_strategy(strat_cls, config)
     except Exception as e:
         print(f"[ERROR] Failed to instantiate strategy: {e}")
         sys.exit(1)
 
-    if not hasattr(strat, 'populate_indicators'):
+    if not hasattr(_STRATEGY, 'populate_indicators'):
         print("Strategy does not have populate_indicators")
         sys.exit(1)
-    print("[DEBUG] Running populate_indicators()")
-    df_out = strat.populate_indicators(df.copy(), metadata={})
-    base_cols = {'time', 'date', 'open', 'high', 'low', 'close', 'volume'}
-    indicator_cols = [c for c in df_out.columns if c not in base_cols]
-    print(f"[DEBUG] Indicator columns: {indicator_cols}")
 
     # Output
     indicator_dir = os.path.join(data_dir, 'indicator_data')
     os.makedirs(indicator_dir, exist_ok=True)
-    output = os.path.join(indicator_dir, f"indicator_data_{args.strategy}.csv")
-    print(f"[DEBUG] Output path set to: {output}")
+    cache_dir = None if args.no_cache else os.path.join(indicator_dir, '.cache')
+    base_key = cache_base_key(strat_dir, args.strategy, config)
+    lookback = args.lookback or getattr(_STRATEGY, 'startup_candle_count', 0) or DEFAULT_LOOKBACK
+    if args.incremental:
+        print(f"[DEBUG] Incremental mode, warm-up window: {lookback} candles")
+    # Candles loaded before the timerange start so the first output rows have settled indicators
+    warmup = getattr(_STRATEGY, 'startup_candle_count', 0) or 0
+    if timerange:
+        print(f"[DEBUG] Loading {warmup} startup candles before the timerange")
+    jobs = []
+    for pair in pairs:
+        if multi_pair:
+            output = pair_output_path(indicator_dir, args.strategy, pair)
+        else:
+            output = os.path.join(indicator_dir, f"indicator_data_{args.strategy}.csv")
+        print(f"[DEBUG] Output path for {pair} set to: {output}")
+        jobs.append({
+            'pair': pair,
+            'data_dir': data_dir,
+            'exchange': exchange_name,
+            'timeframe': timeframe,
+            'timerange': timerange,
+            'warmup': warmup,
+            'output': output,
+            'format': args.format,
+            'value_dtype': args.value_dtype,
+            'cache_dir': cache_dir,
+            'cache_base_key': base_key,
+            'cache_max_bytes': args.cache_size * 1024**2,
+            'incremental': args.incremental,
+            'lookback': lookback,
+            'verify_rows': lookback if args.verify else 0,
+            'profile_path': os.path.splitext(output)[0] + '.prof' if args.profile else None,
+            'lean': args.lean,
+            'downcast_rtol': args.downcast_rtol,
+        })
 
-    df_out[['time'] + indicator_cols].to_csv(output, index=False)
-    print(f"Output: {output}")
+    print("[DEBUG] Running populate_indicators()")
+    workers = (args.workers or os.cpu_count() or 1) if multi_pair else 1
+    start = time.perf_counter()
+    with trace.stage('pairs', workers=workers) as record:
+        results = run_pairs(jobs, workers, strat_file, args.strategy, config)
+        for r in sorted(results, key=lambda r: r['pair']):
+            for stage in r['stages']:
+                trace.add(stage)
+        record['rows'] = sum(r['rows'] for r in results)
+        record['bytes'] = sum(os.path.getsize(path) for r in results for path in r['outputs'])
+    if args.trace:
+        trace.save(args.trace)
+    for r in results:
+        for path in r['outputs']:
+            print(f"Output: {path}")
+    if multi_pair:
+        print_pair_report(results, time.perf_counter() - start)
+    if args.lean:
+        # Worker peaks are in their results, a long-lived process (extraction daemon) reports its lifetime peak
+        peaks = [r['peak_rss_mb'] for r in results if r.get('peak_rss_mb') is not None]
+        peak = max(peaks + [stage_timer.peak_rss_mb() or 0])
+        print(f"[INFO] Peak memory: {peak:.0f} MB")
+    errors = [r for r in results if r['error']]
+    for r in errors:
+        print(f"[ERROR] {r['pair']}: {r['error']}")
+    if errors:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
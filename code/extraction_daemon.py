@@ -0,0 +1,225 @@
+"""
+Long-lived indicator extraction worker, run inside the freqtrade container next to extract_indicators.py.
+
+    python3 extraction_daemon.py serve              keep pandas/talib/freqtrade and the strategy modules imported,
+                                                    run extraction jobs sent over a unix socket one at a time
+    python3 extraction_daemon.py run -- <args>      send one job (extract_indicators.py arguments), stream its
+                                                    output and exit with its exit code
+
+Protocol: one JSON line per message. The client sends {"argv": [...]}, the daemon answers with any number of
+{"log": "..."} messages followed by {"exit_code": n}.
+
+The client only uses the standard library so it starts in a few milliseconds; it exits with DAEMON_UNAVAILABLE
+when no daemon is listening, which main.py uses to start one on first use.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import importlib
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'lwc_extraction_daemon.sock')
+# EX_TEMPFAIL, extract_indicators.py itself only exits with 0, 1 or 2
+DAEMON_UNAVAILABLE = 75
+DEFAULT_IDLE_TIMEOUT = 3600
+# Imported once at startup so the first job does not pay for them either
+WARM_MODULES = ['numpy', 'pandas', 'pyarrow', 'talib', 'freqtrade.strategy']
+# Modules reloaded when main.py copies a new version next to this script (strategy modules are re-imported by
+# extract_indicators.dynamic_import_strategy when any file of the strategies folder changed)
+RELOADABLE = ['extract_indicators', 'chart_binary', 'stage_timer', 'strategy_index']
+
+class SocketWriter:
+    """
+    File-like object sending everything written to it as {"log": ...} lines. Only the daemon process itself
+    sends: processes forked by a job (extract_indicators.py's pool) write to the daemon's stderr instead, so
+    their lines never interleave with the job's messages.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.buf = ''
+        self.closed = False
+        self.pid = os.getpid()
+
+    def write(self, text):
+        if os.getpid() != self.pid:
+            return sys.__stderr__.write(text)
+        self.buf += text
+        if '\n' in self.buf:
+            lines, _, self.buf = self.buf.rpartition('\n')
+            self.send({'log': lines + '\n'})
+        return len(text)
+
+    def flush(self):
+        if os.getpid() != self.pid:
+            sys.__stderr__.flush()
+            return
+        if self.buf:
+            self.send({'log': self.buf})
+            self.buf = ''
+
+    def send(self, message):
+        if self.closed or os.getpid() != self.pid:
+            return
+        try:
+            self.conn.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        except OSError:
+            # Client went away, finish the job anyway so the outputs are written
+            self.closed = True
+
+def module_mtimes():
+    """mtime of every reloadable module file that is loaded"""
+    mtimes = {}
+    for name in RELOADABLE:
+        module = sys.modules.get(name)
+        if module is not None and getattr(module, '__file__', None) and os.path.exists(module.__file__):
+            mtimes[name] = os.stat(module.__file__).st_mtime_ns
+    return mtimes
+
+def reload_changed(mtimes):
+    """Reload the modules whose file changed since mtimes, returns the new mtimes"""
+    current = module_mtimes()
+    for name, mtime in current.items():
+        if mtimes.get(name) not in (None, mtime):
+            print(f"[INFO] {name}.py changed, reloading", file=sys.stderr)
+            importlib.reload(sys.modules[name])
+    return module_mtimes()
+
+def run_job(argv):
+    """Run extract_indicators.main() with argv, returns its exit code"""
+    import extract_indicators
+    old_argv = sys.argv
+    sys.argv = ['extract_indicators.py'] + list(argv)
+    try:
+        extract_indicators.main()
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = old_argv
+
+def handle(conn, mtimes):
+    """Serve one connection: read the job, run it with its output sent back, send the exit code"""
+    with conn.makefile('rb') as reader:
+        line = reader.readline()
+    if not line:
+        return mtimes
+    try:
+        argv = json.loads(line.decode('utf-8'))['argv']
+    except (ValueError, KeyError, TypeError) as e:
+        SocketWriter(conn).send({'log': f"[ERROR] Bad extraction request: {e}\n", 'exit_code': 2})
+        return mtimes
+    mtimes = reload_changed(mtimes)
+    writer = SocketWriter(conn)
+    start = time.perf_counter()
+    with redirect_stdout(writer), redirect_stderr(writer):
+        code = run_job(argv)
+    writer.flush()
+    writer.send({'exit_code': code})
+    print(f"[INFO] Job {argv} finished with {code} in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return mtimes
+
+def is_running():
+    """True when a daemon already answers on SOCKET_PATH"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(SOCKET_PATH)
+        return True
+    except OSError:
+        return False
+
+def serve(idle_timeout):
+    """Accept jobs until nothing arrived for idle_timeout seconds"""
+    if is_running():
+        print(f"[INFO] Extraction daemon already running on {SOCKET_PATH}", file=sys.stderr)
+        return 0
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    import extract_indicators  # noqa: F401
+    print(f"[INFO] Imports warmed up in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(SOCKET_PATH)
+    server.listen(8)
+    server.settimeout(idle_timeout)
+    print(f"[INFO] Extraction daemon listening on {SOCKET_PATH}", file=sys.stderr)
+    mtimes = module_mtimes()
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print(f"[INFO] Idle for {idle_timeout}s, exiting", file=sys.stderr)
+                break
+            conn.settimeout(None)
+            with conn:
+                mtimes = handle(conn, mtimes)
+    finally:
+        server.close()
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+    return 0
+
+def submit(argv, wait=0.0):
+    """Send one job to the daemon and relay its output, returns its exit code (DAEMON_UNAVAILABLE if none)"""
+    deadline = time.monotonic() + wait
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(SOCKET_PATH)
+            break
+        except OSError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                return DAEMON_UNAVAILABLE
+            time.sleep(0.2)
+    with sock:
+        sock.sendall((json.dumps({'argv': argv}) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as reader:
+            for line in reader:
+                message = json.loads(line)
+                if 'log' in message:
+                    sys.stdout.write(message['log'])
+                    sys.stdout.flush()
+                if 'exit_code' in message:
+                    return message['exit_code']
+    print("[ERROR] Extraction daemon closed the connection before the job finished")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description='Persistent indicator extraction worker')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help='Run the daemon')
+    serve_parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                              help=f'Exit after this many seconds without a job (default: {DEFAULT_IDLE_TIMEOUT})')
+    run_parser = sub.add_parser('run', help='Submit one extraction job')
+    run_parser.add_argument('--wait', type=float, default=0.0,
+                            help='Seconds to wait for the daemon to come up (default: fail right away)')
+    run_parser.add_argument('job_args', nargs=argparse.REMAINDER, help='extract_indicators.py arguments, after --')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        sys.exit(serve(args.idle_timeout))
+    job_args = args.job_args[1:] if args.job_args[:1] == ['--'] else args.job_args
+    sys.exit(submit(job_args, args.wait))
+
+if __name__ == '__main__':
+    main()
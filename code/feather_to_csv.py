@@ -1,5 +1,26 @@
 import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import chart_binary
+import stage_timer
+
+MANIFEST_NAME = '.feather_to_csv_manifest.json'
+CSV_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+# Peak memory of one conversion relative to the (compressed) feather size, used by --max-memory
+MEMORY_FACTOR = 6
+# Rows per chunk in streaming mode, peak memory scales with this instead of the file size
+DEFAULT_BATCH_ROWS = 65536
+TIMESTAMP_DIVISORS = {'s': 1, 'ms': 10**3, 'us': 10**6, 'ns': 10**9}
+# Output suffix per format, appended to the feather path without its extension
+OUTPUT_SUFFIXES = {'csv': '_tv.csv', 'lwcb': '_tv' + chart_binary.EXTENSION}
+FORMAT_CHOICES = {'csv': ('csv',), 'lwcb': ('lwcb',), 'both': ('csv', 'lwcb')}
 
 def find_root_dir():
     """Go up to root"""
@@ -16,27 +37,448 @@ def all_data_dirs(root_dir):
         if os.path.isdir(data_dir):
             yield data_dir
 
+def load_manifest(data_dir):
+    """Load the per data dir conversion manifest (empty if missing or unreadable)"""
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Ignoring unreadable manifest {path}: {e}")
+        return {}
+
+def save_manifest(data_dir, manifest):
+    """Write manifest atomically so an interrupted run never leaves it half written"""
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def read_ohlcv(feather_path):
+    """Read a feather file and return it with the tv csv columns, or None if it has no time info"""
+    df = pd.read_feather(feather_path)
+    # Convert 'date' or 'time' to seconds-since-epoch if needed, whatever resolution the dates are stored with
+    if 'date' in df.columns:
+        df['time'] = (pd.to_datetime(df['date'], utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    elif 'time' not in df.columns:
+        return None
+    return df[CSV_COLUMNS]
+
+def output_paths(feather_path, formats):
+    """Map each requested format to its output path next to the feather file"""
+    return {fmt: feather_path[:-8] + OUTPUT_SUFFIXES[fmt] for fmt in formats}
+
+def is_current(feather_path, entry, fmt, path, value_dtype='float64'):
+    """
+    True when neither the source nor this output changed since the manifest entry was written,
+    and an .lwcb output holds its values as value_dtype
+    """
+    if not entry or not os.path.exists(path):
+        return False
+    if fmt == 'lwcb' and entry.get('lwcb_value_dtype') != value_dtype:
+        return False
+    st = os.stat(feather_path)
+    return (entry.get('size') == st.st_size
+            and entry.get('mtime_ns') == st.st_mtime_ns
+            and entry.get(f'{fmt}_size') == os.path.getsize(path))
+
+def is_unchanged(feather_path, outputs, entry, value_dtype='float64'):
+    """True when every requested output is current"""
+    return all(is_current(feather_path, entry, fmt, path, value_dtype) for fmt, path in outputs.items())
+
+def can_append(total_rows, prev_end_time, csv_path, entry):
+    """
+    True when the source only grew at the end, so the existing csv is a valid prefix.
+    prev_end_time is the candle time now found at the row index where the last conversion ended.
+    """
+    if not entry or not os.path.exists(csv_path):
+        return False
+    rows = entry.get('rows', 0)
+    if rows <= 0 or total_rows < rows:
+        return False
+    if entry.get('csv_size') != os.path.getsize(csv_path):
+        return False
+    return prev_end_time == entry.get('last_time')
+
+def open_feather(feather_path):
+    """Open a feather (Arrow IPC) file memory-mapped, batches are only paged in when read"""
+    return pa.ipc.open_file(pa.memory_map(feather_path, 'r'))
+
+def batch_times(batch):
+    """Epoch seconds (int64) of a record batch computed with Arrow kernels, or None if it has no time info"""
+    names = batch.schema.names
+    if 'date' in names:
+        col = batch.column(names.index('date'))
+        if not pa.types.is_timestamp(col.type):
+            col = pc.cast(col, pa.timestamp('ns', tz='UTC'))
+        return pc.divide(pc.cast(col, pa.int64()), TIMESTAMP_DIVISORS[col.type.unit])
+    if 'time' in names:
+        return pc.cast(batch.column(names.index('time')), pa.int64())
+    return None
+
+def iter_slices(reader, batch_rows):
+    """Yield record batches of at most batch_rows rows (slices are zero-copy)"""
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
+
+def scan_times(reader, probe_index, batch_rows):
+    """Return (total rows, last time, time at probe_index) without converting any other column"""
+    total_rows, last_time, probe_time = 0, None, None
+    for batch in iter_slices(reader, batch_rows):
+        times = batch_times(batch)
+        if times is None:
+            return None
+        if probe_index is not None and total_rows <= probe_index < total_rows + len(times):
+            probe_time = times[probe_index - total_rows].as_py()
+        total_rows += len(times)
+        if len(times):
+            last_time = times[-1].as_py()
+    return total_rows, last_time, probe_time
+
+def csv_text(array):
+    """
+    Values of an Arrow column as strings the way DataFrame.to_csv writes them in the pandas path: shortest
+    round-trip repr (107549.0, not Arrow's 107549; 1e-05, not 0.00001), NaN as an empty field
+    """
+    if pa.types.is_integer(array.type):
+        return pc.cast(array, pa.string())
+    values = array.to_numpy(zero_copy_only=False)
+    if values.dtype == np.float64:
+        # Python's repr is numpy's float64 str, and much faster than astype(str)
+        text = list(map(float.__repr__, values.tolist()))
+        for i in np.flatnonzero(np.isnan(values)):
+            text[i] = ''
+        return pa.array(text, pa.string())
+    text = values.astype(str)
+    if values.dtype.kind == 'f':
+        text[np.isnan(values)] = ''
+    return pa.array(text, pa.string())
+
+def stream_export(reader, csv_path, after_time=None, batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Write the tv csv batch by batch with the Arrow csv writer, values formatted by csv_text so the file is
+    byte for byte what the pandas path writes.
+    With after_time set only rows newer than it are appended to the existing csv.
+    Returns the number of rows written.
+    """
+    schema = pa.schema([(c, pa.string()) for c in CSV_COLUMNS])
+    rows_written = 0
+    with open(csv_path, 'ab' if after_time is not None else 'wb') as sink:
+        if after_time is None:
+            sink.write((','.join(CSV_COLUMNS) + os.linesep).encode())
+        # DataFrame.to_csv ends lines with os.linesep
+        writer = pacsv.CSVWriter(sink, schema, write_options=pacsv.WriteOptions(
+            include_header=False, quoting_style='none', eol=os.linesep))
+        for batch in iter_slices(reader, batch_rows):
+            names = batch.schema.names
+            times = batch_times(batch)
+            # The time column as read_ohlcv has it: computed from 'date', else the stored one
+            columns = [times if 'date' in names else batch.column(names.index('time'))]
+            columns += [batch.column(names.index(c)) for c in CSV_COLUMNS[1:]]
+            if after_time is not None:
+                keep = pc.greater(times, after_time)
+                columns = [pc.filter(column, keep) for column in columns]
+            if len(columns[0]):
+                writer.write_batch(pa.RecordBatch.from_arrays([csv_text(c) for c in columns], schema=schema))
+                rows_written += len(columns[0])
+        writer.close()
+    return rows_written
+
+def stream_export_binary(reader, path, total_rows, batch_rows=DEFAULT_BATCH_ROWS, value_dtype='float64'):
+    """Write the .lwcb file in one pass, each batch is scattered to its column's region of the file"""
+    dtypes = [('time', 'uint32')] + [(c, value_dtype) for c in CSV_COLUMNS[1:]]
+    header, data_start, descriptors = chart_binary.build_header(total_rows, dtypes)
+    written = 0
+    with open(path, 'wb') as f:
+        chart_binary.write_prelude(f, header, data_start)
+        for batch in iter_slices(reader, batch_rows):
+            names = batch.schema.names
+            arrays = [batch_times(batch)] + [batch.column(names.index(c)) for c in CSV_COLUMNS[1:]]
+            for (name, dtype), desc, array in zip(dtypes, descriptors, arrays):
+                np_dtype = chart_binary.DTYPES[dtype]
+                f.seek(data_start + desc['offset'] + written * np_dtype.itemsize)
+                f.write(array.to_numpy(zero_copy_only=False).astype(np_dtype, copy=False).tobytes())
+            written += batch.num_rows
+        f.truncate(chart_binary.align8(data_start + descriptors[-1]['offset'] + descriptors[-1]['length']))
+    return written
+
+def convert_file_streaming(feather_path, outputs, entry=None, full=False, batch_rows=DEFAULT_BATCH_ROWS,
+                           value_dtype='float64'):
+    """Streaming counterpart of the pandas path in convert_file, never holds more than one batch"""
+    reader = open_feather(feather_path)
+    if not {'open', 'high', 'low', 'close', 'volume'} <= set(reader.schema.names):
+        return 'invalid', None, 0, 0
+    probe_index = entry['rows'] - 1 if entry and entry.get('rows') else None
+    stats = scan_times(reader, probe_index, batch_rows)
+    if stats is None:
+        return 'invalid', None, 0, 0
+    total_rows, last_time, probe_time = stats
+
+    status, rows_written, bytes_written = 'skipped', 0, 0
+    csv_path = outputs.get('csv')
+    if csv_path and (full or not is_current(feather_path, entry, 'csv', csv_path)):
+        if not full and can_append(total_rows, probe_time, csv_path, entry):
+            rows_written = stream_export(reader, csv_path, after_time=entry['last_time'], batch_rows=batch_rows)
+            bytes_written += os.path.getsize(csv_path) - entry['csv_size']
+            status = 'appended'
+        else:
+            rows_written = stream_export(reader, csv_path, batch_rows=batch_rows)
+            bytes_written += os.path.getsize(csv_path)
+            status = 'written'
+    lwcb_path = outputs.get('lwcb')
+    if lwcb_path and (full or not is_current(feather_path, entry, 'lwcb', lwcb_path, value_dtype)):
+        rows_written = max(rows_written, stream_export_binary(reader, lwcb_path, total_rows, batch_rows,
+                                                                value_dtype))
+        bytes_written += os.path.getsize(lwcb_path)
+        status = 'written' if status == 'skipped' else status
+    return (status, make_entry(feather_path, outputs, total_rows, last_time, value_dtype), rows_written,
+            bytes_written)
+
+def make_entry(feather_path, outputs, rows, last_time, value_dtype='float64'):
+    """Manifest entry describing the source and its outputs right after a conversion"""
+    st = os.stat(feather_path)
+    entry = {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'rows': rows,
+        'last_time': last_time,
+    }
+    for fmt, path in outputs.items():
+        entry[f'{fmt}_size'] = os.path.getsize(path)
+    if 'lwcb' in outputs:
+        entry['lwcb_value_dtype'] = value_dtype
+    return entry
+
+def convert_file(feather_path, outputs, entry=None, full=False, streaming=False,
+                 batch_rows=DEFAULT_BATCH_ROWS, value_dtype='float64'):
+    """
+    Convert one feather file to the requested outputs ({format: path}).
+    Returns (status, new manifest entry, rows written, bytes written);
+    status is 'skipped', 'appended', 'written' or 'invalid'.
+    """
+    if not full and is_unchanged(feather_path, outputs, entry, value_dtype):
+        return 'skipped', entry, 0, 0
+    if streaming:
+        return convert_file_streaming(feather_path, outputs, entry, full=full, batch_rows=batch_rows,
+                                      value_dtype=value_dtype)
+
+    df = read_ohlcv(feather_path)
+    if df is None:
+        return 'invalid', None, 0, 0
+
+    status, rows_written, bytes_written = 'skipped', 0, 0
+    csv_path = outputs.get('csv')
+    if csv_path and (full or not is_current(feather_path, entry, 'csv', csv_path)):
+        rows = entry.get('rows', 0) if entry else 0
+        prev_end_time = int(df['time'].iloc[rows - 1]) if 0 < rows <= len(df) else None
+        if not full and can_append(len(df), prev_end_time, csv_path, entry):
+            tail = df[df['time'] > entry['last_time']]
+            tail.to_csv(csv_path, mode='a', header=False, index=False)
+            bytes_written += os.path.getsize(csv_path) - entry['csv_size']
+            status, rows_written = 'appended', len(tail)
+        else:
+            df.to_csv(csv_path, index=False)
+            bytes_written += os.path.getsize(csv_path)
+            status, rows_written = 'written', len(df)
+    lwcb_path = outputs.get('lwcb')
+    if lwcb_path and (full or not is_current(feather_path, entry, 'lwcb', lwcb_path, value_dtype)):
+        chart_binary.write_frame(lwcb_path, df, value_dtype=value_dtype)
+        bytes_written += os.path.getsize(lwcb_path)
+        rows_written = max(rows_written, len(df))
+        status = 'written' if status == 'skipped' else status
+
+    last_time = int(df['time'].iloc[-1]) if len(df) else None
+    return status, make_entry(feather_path, outputs, len(df), last_time, value_dtype), rows_written, bytes_written
+
+def collect_jobs(data_dirs, manifests, full=False, streaming=False, batch_rows=DEFAULT_BATCH_ROWS,
+                 formats=('csv',), value_dtype='float64'):
+    """Build one job dict per feather file found below the data dirs"""
+    jobs = []
+    for data_dir in data_dirs:
+        manifest = manifests[data_dir]
+        for root_, dirs, files in os.walk(data_dir):
+            # Hidden folders hold caches (e.g. indicator_data/.cache of extract_indicators.py), not OHLCV
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for file in files:
+                if not file.endswith('.feather'):
+                    continue
+                feather_path = os.path.join(root_, file)
+                key = os.path.relpath(feather_path, data_dir).replace(os.sep, '/')
+                jobs.append({
+                    'data_dir': data_dir,
+                    'key': key,
+                    'feather_path': feather_path,
+                    'outputs': output_paths(feather_path, formats),
+                    'entry': manifest.get(key),
+                    'full': full,
+                    'streaming': streaming,
+                    'batch_rows': batch_rows,
+                    'value_dtype': value_dtype,
+                    'size': os.path.getsize(feather_path),
+                })
+    return jobs
+
+def run_job(job):
+    """Worker entry point: convert one file and return a structured result"""
+    start = time.perf_counter()
+    status, entry, rows, bytes_written = convert_file(job['feather_path'], job['outputs'], job['entry'],
+                                                      full=job['full'], streaming=job['streaming'],
+                                                      batch_rows=job['batch_rows'],
+                                                      value_dtype=job['value_dtype'])
+    return {
+        'data_dir': job['data_dir'],
+        'key': job['key'],
+        'feather_path': job['feather_path'],
+        'outputs': job['outputs'],
+        'status': status,
+        'entry': entry,
+        'rows': rows,
+        'bytes': bytes_written,
+        'seconds': time.perf_counter() - start,
+    }
+
+def estimate_memory(job):
+    """Rough peak memory of converting one file: decompressed frame plus csv text buffers"""
+    if job['streaming']:
+        # Only one batch of six 8 byte columns is alive at a time
+        return min(job['size'], job['batch_rows'] * 48) * MEMORY_FACTOR
+    return job['size'] * MEMORY_FACTOR
+
+def run_jobs_parallel(jobs, workers, max_memory=None):
+    """
+    Run jobs on a process pool, largest files first.
+    With max_memory (bytes) set, only start a job while the estimated memory of in-flight jobs stays
+    under the cap (a single oversized job still runs, alone).
+    """
+    pending = sorted(jobs, key=lambda j: j['size'], reverse=True)
+    results = []
+    in_flight = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or in_flight:
+            while pending and len(in_flight) < workers:
+                used = sum(in_flight.values())
+                # Largest job that still fits, so small files keep the pool busy next to a big one
+                job = next((j for j in pending if not in_flight or max_memory is None
+                            or used + estimate_memory(j) <= max_memory), None)
+                if job is None:
+                    break
+                pending.remove(job)
+                in_flight[pool.submit(run_job, job)] = estimate_memory(job)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                del in_flight[future]
+                result = future.result()
+                report_result(result)
+                results.append(result)
+    return results
+
+def run_jobs_sequential(jobs):
+    """Run jobs one after another in this process"""
+    results = []
+    for job in jobs:
+        result = run_job(job)
+        report_result(result)
+        results.append(result)
+    return results
+
+def report_result(result):
+    """Print a single line for files that needed work"""
+    if result['status'] == 'invalid':
+        print(f"[WARN] No 'date' or 'time' column in {result['feather_path']}, skipping.")
+    elif result['status'] == 'appended':
+        targets = ', '.join(result['outputs'].values())
+        print(f"[INFO] {result['feather_path']} -> {targets} (+{result['rows']} rows)")
+    elif result['status'] == 'written':
+        targets = ', '.join(result['outputs'].values())
+        print(f"[INFO] {result['feather_path']} -> {targets}")
+
+def print_run_summary(results, wall_seconds, workers):
+    """Print one summary line for the whole run"""
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    status_text = ', '.join(f"{k}={v}" for k, v in sorted(counts.items())) or 'no feather files'
+    rows = sum(r['rows'] for r in results)
+    mb = sum(r['bytes'] for r in results) / 1024**2
+    cpu_seconds = sum(r['seconds'] for r in results)
+    print(f"[SUMMARY] {len(results)} files ({status_text}), {rows} rows, {mb:.1f} MB written, "
+          f"{cpu_seconds:.2f}s work in {wall_seconds:.2f}s wall on {workers} worker(s)")
+
 def main():
+    parser = argparse.ArgumentParser(description='Convert freqtrade feather OHLCV files to tv csv')
+    parser.add_argument('--full', action='store_true', help='Ignore the manifest and rewrite every output')
+    parser.add_argument('--format', choices=sorted(FORMAT_CHOICES), default='csv',
+                        help='Write tv csv, binary .lwcb chart data, or both (default: csv)')
+    parser.add_argument('--value-dtype', choices=['float64', 'float32'], default='float64',
+                        help='Price/volume precision in .lwcb files (float32 halves the size, ~7 significant digits)')
+    parser.add_argument('--workers', '-j', type=int, default=1,
+                        help='Worker processes (0 = one per CPU, default: 1 = no pool)')
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help='Approximate memory cap in MB for concurrently converted files')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Stream memory-mapped Arrow batches to csv instead of loading whole files with pandas')
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS,
+                        help=f'Rows per batch in streaming mode (default: {DEFAULT_BATCH_ROWS})')
+    parser.add_argument('--files', nargs='+',
+                        help='Only convert these feather files (e.g. the ones main.py --watch saw change)')
+    parser.add_argument('--trace', help='Write a JSON stage trace (time, CPU, memory, rows, bytes) to this path')
+    args = parser.parse_args()
+    trace = stage_timer.StageTrace('feather_to_csv')
+
+    workers = args.workers or os.cpu_count() or 1
+    max_memory = args.max_memory * 1024**2 if args.max_memory else None
+
     root = find_root_dir()
     print(f"[DEBUG] Using root: {root}")
-    for data_dir in all_data_dirs(root):
+    data_dirs = list(all_data_dirs(root))
+    for data_dir in data_dirs:
         print(f"[DEBUG] Processing data dir: {data_dir}")
-        for root_, dirs, files in os.walk(data_dir):
-            for file in files:
-                if file.endswith('.feather'):
-                    feather_path = os.path.join(root_, file)
-                    csv_path = feather_path[:-8] + '_tv.csv'
-                    print(f"[INFO] {feather_path} -> {csv_path}")
-                    df = pd.read_feather(feather_path)
-                    # Convert 'date' or 'time' to seconds-since-epoch if needed
-                    if 'date' in df.columns:
-                        df['time'] = pd.to_datetime(df['date']).astype(int) // 10**9
-                    elif 'time' not in df.columns:
-                        print(f"[WARN] No 'date' or 'time' column in {feather_path}, skipping.")
-                        continue
-                    cols = {c: c for c in ['open', 'high', 'low', 'close', 'volume']}
-                    df = df.rename(columns=cols)
-                    df[['time','open','high','low','close','volume']].to_csv(csv_path, index=False)
+    with trace.stage('collect_jobs') as record:
+        manifests = {d: {} if args.full else load_manifest(d) for d in data_dirs}
+        jobs = collect_jobs(data_dirs, manifests, full=args.full, streaming=args.streaming,
+                            batch_rows=args.batch_rows, formats=FORMAT_CHOICES[args.format],
+                            value_dtype=args.value_dtype)
+        if args.files:
+            selected = {os.path.realpath(f) for f in args.files}
+            jobs = [j for j in jobs if os.path.realpath(j['feather_path']) in selected]
+            if len(jobs) < len(selected):
+                print(f"[WARN] {len(selected) - len(jobs)} of the --files are not feather files of a bot data dir")
+        record['files'] = len(jobs)
+
+    start = time.perf_counter()
+    with trace.stage('convert', workers=workers) as record:
+        # Unchanged files are resolved with a stat here, no need to ship them to a worker
+        todo = [j for j in jobs if j['full'] or not is_unchanged(j['feather_path'], j['outputs'], j['entry'],
+                                                                 j['value_dtype'])]
+        results = run_jobs_sequential([j for j in jobs if j not in todo])
+        if workers > 1 and len(todo) > 1:
+            results += run_jobs_parallel(todo, workers, max_memory)
+        else:
+            results += run_jobs_sequential(todo)
+        record['rows'] = sum(r['rows'] for r in results)
+        record['bytes'] = sum(r['bytes'] for r in results)
+        for r in results:
+            if r['status'] != 'skipped':
+                trace.add({'name': os.path.basename(r['feather_path']), 'status': r['status'], 'rows': r['rows'],
+                           'bytes': r['bytes'], 'wall_s': round(r['seconds'], 4)})
+
+    # Manifests are only written by this process, workers just hand back their entries
+    with trace.stage('save_manifests'):
+        # Entries of the files not converted this time stay as they are
+        new_manifests = {d: load_manifest(d) if args.files else {} for d in data_dirs}
+        for r in results:
+            if r['entry']:
+                new_manifests[r['data_dir']][r['key']] = r['entry']
+        for data_dir, manifest in new_manifests.items():
+            save_manifest(data_dir, manifest)
+    print_run_summary(results, time.perf_counter() - start, workers)
+    if args.trace:
+        trace.save(args.trace)
 
 if __name__ == "__main__":
     main()
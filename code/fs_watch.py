@@ -0,0 +1,215 @@
+"""
+File change notifications for main.py --watch: inotify (Linux, through ctypes) with a polling fallback.
+
+    watcher = open_watcher({'/path/data': True, '/path/backtest_results': False})
+    for changed in batches(watcher, accept=lambda p: p.endswith('.feather')):
+        ...
+
+Watchers report the paths of created, written, moved and deleted files below their roots (recursive roots
+follow new sub folders). batches() debounces them: a burst of events (a download writing many files, a backtest
+writing its zip and then .last_result.json) becomes one set of paths, yielded once nothing accepted changed for
+DEBOUNCE_SECONDS. When the kernel queue overflows the set holds OVERFLOW, events were lost and everything should
+be considered changed. Standard library only.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+DEBOUNCE_SECONDS = 1.0
+# A steady stream of events still gets handled every MAX_BATCH_SECONDS
+MAX_BATCH_SECONDS = 10.0
+POLL_INTERVAL = 2.0
+OVERFLOW = '<overflow>'
+
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+def skip_dir(name, skip_dirs=()):
+    """Folders never watched: hidden ones, __pycache__ and skip_dirs"""
+    return name.startswith('.') or name == '__pycache__' or name in skip_dirs
+
+class InotifyWatcher:
+    """inotify watches on the roots (and, for recursive roots, every sub folder)"""
+
+    def __init__(self, roots, skip_dirs=()):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.skip_dirs = set(skip_dirs)
+        self.dirs = {}
+        self.recursive = {}
+        for root, recursive in roots.items():
+            self.add_tree(os.path.abspath(root), recursive)
+
+    def add_watch(self, path, recursive):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, f"inotify watch limit reached at {path} (fs.inotify.max_user_watches)")
+            # Gone again before it could be watched
+            return False
+        self.dirs[wd] = path
+        self.recursive[wd] = recursive
+        return True
+
+    def add_tree(self, path, recursive):
+        """Watch path (and its sub folders when recursive), returns the files already in it"""
+        found = []
+        if not self.add_watch(path, recursive):
+            return found
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return found
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive and not skip_dir(entry.name, self.skip_dirs):
+                    found += self.add_tree(entry.path, recursive)
+            else:
+                found.append(entry.path)
+        return found
+
+    def poll(self, timeout=None):
+        """Paths changed since the last call, waiting up to timeout seconds (None: until something happens)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buf, pos)
+                name = buf[pos + EVENT_HEADER.size:pos + EVENT_HEADER.size + length].rstrip(b'\0')
+                pos += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    print("[WARN] inotify queue overflowed, some changes were missed")
+                    changed.add(OVERFLOW)
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    self.recursive.pop(wd, None)
+                    continue
+                if wd not in self.dirs or not name:
+                    continue
+                path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    # A new (or moved in) folder: watch it and report what was written before the watch
+                    if mask & (IN_CREATE | IN_MOVED_TO) and self.recursive[wd] and \
+                            not skip_dir(os.fsdecode(name), self.skip_dirs):
+                        changed.update(self.add_tree(path, True))
+                    continue
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Compares (mtime, size) snapshots of the files below the roots every interval seconds"""
+
+    def __init__(self, roots, skip_dirs=(), interval=POLL_INTERVAL):
+        self.roots = {os.path.abspath(root): recursive for root, recursive in roots.items()}
+        self.skip_dirs = set(skip_dirs)
+        self.interval = interval
+        self.snapshot = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self):
+        files = {}
+        todo = [(root, recursive) for root, recursive in self.roots.items()]
+        while todo:
+            path, recursive = todo.pop()
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not skip_dir(entry.name, self.skip_dirs):
+                            todo.append((entry.path, recursive))
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files[entry.path] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def poll(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.next_scan - time.monotonic()
+            if deadline is not None and time.monotonic() + max(wait, 0) > deadline:
+                time.sleep(max(0, deadline - time.monotonic()))
+                return set()
+            if wait > 0:
+                time.sleep(wait)
+            self.next_scan = time.monotonic() + self.interval
+            current = self.scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+def open_watcher(roots, skip_dirs=(), polling=False, interval=POLL_INTERVAL):
+    """InotifyWatcher when the platform has inotify (and polling is False), else PollingWatcher"""
+    roots = {root: recursive for root, recursive in roots.items() if os.path.isdir(root)}
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            watcher = InotifyWatcher(roots, skip_dirs)
+            print(f"[DEBUG] Watching {len(watcher.dirs)} folders with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            print(f"[WARN] inotify unavailable ({e}), polling every {interval}s instead")
+    watcher = PollingWatcher(roots, skip_dirs, interval)
+    print(f"[DEBUG] Polling {len(watcher.snapshot)} files every {interval}s")
+    return watcher
+
+def batches(watcher, accept=None, quiet=DEBOUNCE_SECONDS, max_wait=MAX_BATCH_SECONDS):
+    """Yield sets of accepted changed paths, each once no accepted path changed for quiet seconds"""
+    def accepted(paths):
+        return {p for p in paths if p == OVERFLOW or accept is None or accept(p)}
+
+    while True:
+        changed = accepted(watcher.poll())
+        if not changed:
+            continue
+        last = time.monotonic()
+        deadline = last + max_wait
+        while True:
+            now = time.monotonic()
+            remaining = min(last + quiet, deadline) - now
+            if remaining <= 0:
+                break
+            more = accepted(watcher.poll(remaining))
+            if more:
+                changed |= more
+                last = time.monotonic()
+        yield changed
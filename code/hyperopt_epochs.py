@@ -0,0 +1,367 @@
+"""
+Incremental reader of freqtrade hyperopt result files (.fthypt) and a harness re-scoring their epochs with other
+IHyperOptLoss classes, without running hyperopt again.
+
+    python hyperopt_epochs.py ingest user_data/hyperopt_results/strategy_X_<date>.fthypt [--follow]
+    python hyperopt_epochs.py rescore user_data/hyperopt_results/strategy_X_<date>.fthypt \\
+                                      --loss SampleHyperOptLoss SharpeHyperOptLoss
+
+Hyperopt appends one JSON line per epoch to the .fthypt file. ingest keeps the byte offset of the last complete
+line in <run>.epochs/state.json and only parses what was appended since (--follow keeps polling while hyperopt
+runs). A file that shrank or whose first line changed is another run and is read from the start. It writes
+
+    <run>.epochs/epochs.lwcb                one row per epoch: epoch, loss, is_best, the numeric results metrics
+                                            and the numeric parameters (param_<name>), for charting over epochs
+    <run>.epochs/trades.<epoch>.feather     the trades of up to EPOCH_CHUNK epochs from <epoch> on, with an
+                                            'epoch' column: what the loss functions get as results
+
+rescore calls hyperopt_loss_function of every loss class on every stored epoch. Epochs are scored in batches
+of consecutive epochs on a process pool; each batch reads only its trade files, converts them once and hands
+the loss functions zero-copy row slices. Losses come from the hyperopts folder (found with strategy_index.py)
+or freqtrade's built-in ones, so rescore needs freqtrade: run it in the container (main.py copies this script
+to user_data/code). ingest only needs pandas and pyarrow.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import chart_binary
+import strategy_index
+
+STATE_VERSION = 1
+EPOCH_CHUNK = 1000
+# Epochs per rescore task
+EPOCH_BATCH = 250
+DEFAULT_POLL_SECONDS = 5.0
+# freqtrade's loss for epochs with fewer than hyperopt_min_trades trades
+MAX_LOSS = 100000
+LOSS_ROOT = 'IHyperOptLoss'
+FLAGS = ['is_best', 'is_initial_point', 'is_random']
+# results_metrics keys kept per epoch (the ones missing in older freqtrade versions are NaN)
+METRICS = ['total_trades', 'wins', 'draws', 'losses', 'winrate', 'profit_mean', 'profit_median', 'profit_total',
+           'profit_total_abs', 'profit_factor', 'expectancy', 'expectancy_ratio', 'holding_avg_s',
+           'max_drawdown_account', 'max_drawdown_abs', 'sharpe', 'sortino', 'calmar', 'cagr', 'starting_balance',
+           'final_balance', 'backtest_start_ts', 'backtest_end_ts']
+# Trade fields that are not one value per trade
+NESTED_FIELDS = {'orders'}
+
+def epochs_dir(fthypt):
+    return os.path.splitext(fthypt)[0] + '.epochs'
+
+def load_state(out_dir):
+    try:
+        with open(os.path.join(out_dir, 'state.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, 'state.json')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
+
+def first_line_hash(fthypt):
+    """Hash of the first complete line, tells a rewritten file from a grown one (None while it is incomplete)"""
+    with open(fthypt, 'rb') as f:
+        line = f.readline()
+    return hashlib.sha1(line).hexdigest() if line.endswith(b'\n') else None
+
+def epoch_row(epoch, number):
+    """Numeric columns of one epoch"""
+    metrics = epoch.get('results_metrics') or {}
+    row = {'epoch': epoch.get('current_epoch', number), 'loss': epoch.get('loss', np.nan)}
+    row.update({flag: int(bool(epoch.get(flag))) for flag in FLAGS})
+    row.update({name: metrics.get(name, np.nan) for name in METRICS})
+    for name, value in (epoch.get('params_dict') or {}).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            row[f"param_{name}"] = value
+    return row
+
+def trades_frame(trades):
+    """Trade dicts (with their 'epoch') as a frame: nested fields dropped, dates parsed once"""
+    df = pd.DataFrame(trades)
+    df = df.drop(columns=[c for c in df.columns if c in NESTED_FIELDS])
+    for col in ('open_date', 'close_date'):
+        if col in df:
+            df[col] = pd.to_datetime(df[col], utc=True)
+    return df
+
+def write_trades(out_dir, first_epoch, trades):
+    name = f"trades.{first_epoch}.feather"
+    trades_frame(trades).to_feather(os.path.join(out_dir, name))
+    return name
+
+def write_epochs(out_dir, rows):
+    """Append epoch rows to epochs.lwcb (rewritten, it is one small row per epoch)"""
+    path = os.path.join(out_dir, 'epochs.lwcb')
+    new = pd.DataFrame(rows)
+    if os.path.exists(path):
+        old = pd.DataFrame({name: np.asarray(values) for name, values in chart_binary.read_columns(path).items()})
+        new = pd.concat([old, new], ignore_index=True)
+    columns = []
+    for name in new.columns:
+        values = pd.to_numeric(new[name], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        if name == 'epoch' or name in FLAGS:
+            columns.append((name, values, 'uint32'))
+        elif name in ('backtest_start_ts', 'backtest_end_ts'):
+            columns.append((name, np.nan_to_num(values), 'int64'))
+        else:
+            columns.append((name, values, 'float64'))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    chart_binary.write_columns(tmp_path, columns, {'source': 'fthypt'})
+    os.replace(tmp_path, path)
+    return len(new)
+
+def ingest(fthypt, out_dir=None):
+    """Parse the epochs appended to fthypt since the last call, returns the number of new epochs"""
+    out_dir = out_dir or epochs_dir(fthypt)
+    state = load_state(out_dir)
+    head = first_line_hash(fthypt)
+    size = os.path.getsize(fthypt)
+    if state and (size < state['offset'] or (state['head'] and state['head'] != head)):
+        print(f"[INFO] {os.path.basename(fthypt)} was rewritten, reading it from the start")
+        state = None
+    if state is None:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+        os.makedirs(out_dir)
+        state = {'version': STATE_VERSION, 'source': os.path.abspath(fthypt), 'offset': 0, 'head': head,
+                 'epochs': 0, 'parts': []}
+    if size == state['offset']:
+        return 0
+
+    rows, trades = [], []
+    chunk_first = None
+    new_epochs = 0
+    with open(fthypt, 'rb') as f:
+        f.seek(state['offset'])
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Hyperopt is still writing this epoch, it is read next time
+                break
+            state['offset'] += len(line)
+            if not line.strip():
+                continue
+            epoch = json.loads(line)
+            row = epoch_row(epoch, state['epochs'] + new_epochs + 1)
+            rows.append(row)
+            new_epochs += 1
+            chunk_first = row['epoch'] if chunk_first is None else chunk_first
+            for trade in (epoch.get('results_metrics') or {}).get('trades') or []:
+                trade['epoch'] = row['epoch']
+                trades.append(trade)
+            if new_epochs % EPOCH_CHUNK == 0:
+                if trades:
+                    state['parts'].append(write_trades(out_dir, chunk_first, trades))
+                trades, chunk_first = [], None
+    if trades:
+        state['parts'].append(write_trades(out_dir, chunk_first, trades))
+    if rows:
+        state['epochs'] = write_epochs(out_dir, rows)
+    state['head'] = state['head'] or head
+    save_state(out_dir, state)
+    return new_epochs
+
+def follow(fthypt, out_dir=None, poll_seconds=DEFAULT_POLL_SECONDS):
+    """ingest every poll_seconds until Ctrl+C"""
+    print(f"[INFO] Following {fthypt}, Ctrl+C to stop")
+    try:
+        while True:
+            if os.path.exists(fthypt):
+                new = ingest(fthypt, out_dir)
+                if new:
+                    print(f"[INFO] +{new} epochs")
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopped following")
+
+def read_epochs(out_dir):
+    return pd.DataFrame({name: np.asarray(values)
+                         for name, values in chart_binary.read_columns(os.path.join(out_dir, 'epochs.lwcb')).items()})
+
+# Loss instances of this process, set once in the parent and inherited by forked workers
+_LOSSES = None
+
+def import_class(path, name):
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, name)
+
+def load_losses(names, hyperopt_dir, config):
+    """{name: loss} from the hyperopts folder, else freqtrade's built-in losses"""
+    files = strategy_index.find_strategies(hyperopt_dir, root=LOSS_ROOT)
+    losses = {}
+    for name in names:
+        if name in files:
+            losses[name] = import_class(files[name], name)()
+        else:
+            from freqtrade.resolvers.hyperopt_resolver import HyperOptLossResolver
+            losses[name] = HyperOptLossResolver.load_hyperoptloss(dict(config, hyperopt_loss=name))
+    return losses
+
+def init_worker(names, hyperopt_dir, config):
+    """Pool initializer: forked workers already hold the losses, spawned ones import them once"""
+    global _LOSSES
+    if _LOSSES is None:
+        _LOSSES = load_losses(names, hyperopt_dir, config)
+
+def read_trades(out_dir, parts, first, last):
+    """Trades of epochs first..last from the part files that can hold them, sorted by epoch"""
+    starts = [int(name.split('.')[1]) for name in parts]
+    frames = []
+    for i, name in enumerate(parts):
+        end = starts[i + 1] if i + 1 < len(parts) else None
+        if starts[i] > last or (end is not None and end <= first):
+            continue
+        df = pd.read_feather(os.path.join(out_dir, name))
+        frames.append(df[(df['epoch'] >= first) & (df['epoch'] <= last)])
+    if not frames:
+        return pd.DataFrame({'epoch': np.empty(0, dtype='int64')})
+    return pd.concat(frames, ignore_index=True).sort_values('epoch', kind='stable', ignore_index=True)
+
+def score_batch(task):
+    """(epoch rows of the batch, {loss name: losses}) for one batch of consecutive epochs"""
+    out_dir, parts, epochs, config = task
+    trades = read_trades(out_dir, parts, int(epochs['epoch'].min()), int(epochs['epoch'].max()))
+    bounds = np.searchsorted(trades['epoch'].to_numpy(), epochs['epoch'].to_numpy())
+    ends = np.searchsorted(trades['epoch'].to_numpy(), epochs['epoch'].to_numpy(), side='right')
+    min_trades = config.get('hyperopt_min_trades', 1)
+    scores = {name: np.full(len(epochs), np.nan) for name in _LOSSES}
+    for i, (lo, hi) in enumerate(zip(bounds, ends)):
+        stats = epochs.iloc[i].to_dict()
+        results = trades.iloc[lo:hi]
+        trade_count = int(hi - lo)
+        kwargs = {
+            'results': results, 'trade_count': trade_count,
+            'min_date': pd.to_datetime(stats['backtest_start_ts'], unit='ms', utc=True),
+            'max_date': pd.to_datetime(stats['backtest_end_ts'], unit='ms', utc=True),
+            'config': config, 'processed': {}, 'backtest_stats': stats,
+            'starting_balance': stats.get('starting_balance', config.get('dry_run_wallet')),
+        }
+        for name, loss in _LOSSES.items():
+            if trade_count < min_trades:
+                scores[name][i] = MAX_LOSS
+                continue
+            try:
+                scores[name][i] = loss.hyperopt_loss_function(**kwargs)
+            except Exception as e:
+                print(f"[WARN] {name} failed on epoch {int(stats['epoch'])}: {type(e).__name__}: {e}")
+    return epochs.index.to_numpy(), scores
+
+def rank(values):
+    return np.argsort(np.argsort(values, kind='stable'), kind='stable').astype(np.float64)
+
+def rescore(fthypt, names, hyperopt_dir, config, workers=0, out_dir=None, top=5):
+    """Score every ingested epoch with each loss, write rescore.lwcb and print the best epochs of each"""
+    global _LOSSES
+    out_dir = out_dir or epochs_dir(fthypt)
+    ingest(fthypt, out_dir)
+    state = load_state(out_dir)
+    epochs = read_epochs(out_dir)
+    if not len(epochs):
+        print("[WARN] No epochs to rescore")
+        return None
+    if not state['parts']:
+        print("[WARN] The epochs have no stored trades (results_metrics.trades), every loss gets empty results")
+    _LOSSES = load_losses(names, hyperopt_dir, config)
+    tasks = [(out_dir, state['parts'], epochs.iloc[i:i + EPOCH_BATCH], config)
+             for i in range(0, len(epochs), EPOCH_BATCH)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    start = time.perf_counter()
+    scores = {name: np.full(len(epochs), np.nan) for name in names}
+    if workers <= 1:
+        batches = map(score_batch, tasks)
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                                   initargs=(names, hyperopt_dir, config))
+        batches = pool.map(score_batch, tasks)
+    try:
+        for rows, batch_scores in batches:
+            for name, values in batch_scores.items():
+                scores[name][rows] = values
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    print(f"[INFO] Scored {len(epochs)} epochs x {len(names)} losses in {time.perf_counter() - start:.2f}s "
+          f"({workers} workers)")
+
+    columns = [('epoch', epochs['epoch'].to_numpy(), 'uint32'), ('loss', epochs['loss'].to_numpy(), 'float64')]
+    columns += [(f"loss_{name}", scores[name], 'float64') for name in names]
+    dest = os.path.join(out_dir, 'rescore.lwcb')
+    chart_binary.write_columns(dest, columns, {'losses': names})
+    print(f"[INFO] Scores written -> {dest}")
+
+    original = epochs['loss'].to_numpy()
+    for name in names:
+        values = scores[name]
+        valid = ~np.isnan(values) & ~np.isnan(original)
+        corr = np.corrcoef(rank(values[valid]), rank(original[valid]))[0, 1] if valid.sum() > 1 else np.nan
+        print(f"\n[SUMMARY] {name} (rank correlation with the run's loss: {corr:.3f})")
+        print(f"[SUMMARY] {'epoch':>7} {'loss':>12} {'run loss':>12} {'trades':>7} {'profit %':>9}")
+        for i in np.argsort(np.where(np.isnan(values), np.inf, values), kind='stable')[:top]:
+            row = epochs.iloc[i]
+            print(f"[SUMMARY] {int(row['epoch']):>7} {values[i]:>12.5f} {row['loss']:>12.5f} "
+                  f"{row['total_trades']:>7.0f} {row['profit_total'] * 100:>9.2f}")
+    return dest
+
+def main():
+    parser = argparse.ArgumentParser(description='Read hyperopt .fthypt epochs incrementally and re-score them')
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = sub.add_parser('ingest', help='Parse the epochs appended since the last run')
+    ingest_parser.add_argument('--follow', action='store_true', help='Keep polling the file while hyperopt runs')
+    ingest_parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS,
+                               help=f'Seconds between polls with --follow (default: {DEFAULT_POLL_SECONDS})')
+    rescore_parser = sub.add_parser('rescore', help='Score every epoch with other IHyperOptLoss classes')
+    rescore_parser.add_argument('--loss', nargs='+', required=True, help='Loss class name(s)')
+    rescore_parser.add_argument('--hyperopt-path', help='Folder of the loss files (default: user_data/hyperopts '
+                                                        'next to the results folder)')
+    rescore_parser.add_argument('--config', '-c', help='Bot config (hyperopt_min_trades, dry_run_wallet, ...)')
+    rescore_parser.add_argument('--workers', '-j', type=int, default=0, help='Worker processes (0 = one per CPU)')
+    rescore_parser.add_argument('--top', type=int, default=5, help='Best epochs listed per loss (default: 5)')
+    for p in (ingest_parser, rescore_parser):
+        p.add_argument('fthypt', help='.fthypt file (user_data/hyperopt_results)')
+        p.add_argument('--output-dir', '-o', help='Epochs folder (default: <fthypt without extension>.epochs)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fthypt) and not (args.command == 'ingest' and args.follow):
+        print(f"[ERROR] File not found: {args.fthypt}")
+        sys.exit(1)
+    if args.command == 'ingest':
+        if args.follow:
+            follow(args.fthypt, args.output_dir, args.poll)
+            return
+        new = ingest(args.fthypt, args.output_dir)
+        state = load_state(args.output_dir or epochs_dir(args.fthypt))
+        print(f"[INFO] {new} new epochs, {state['epochs']} in {args.output_dir or epochs_dir(args.fthypt)}")
+        return
+
+    user_data = os.path.dirname(os.path.dirname(os.path.abspath(args.fthypt)))
+    hyperopt_dir = args.hyperopt_path or os.path.join(user_data, 'hyperopts')
+    config_path = args.config or os.path.join(user_data, 'config.json')
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    config.setdefault('user_data_dir', user_data)
+    if not rescore(args.fthypt, args.loss, hyperopt_dir, config, args.workers, args.output_dir, args.top):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,432 @@
+"""
+Live chart of a dry-run (or live) freqtrade bot: polls the bot's REST API and pushes what changed to
+live-chart.html over a WebSocket, where it is applied with series.update() instead of redrawing everything.
+
+    python live_bridge.py --bot test_bot --pair BTC/USDT          then open http://127.0.0.1:8766/
+    python live_stub.py --bot test_bot                            replaying stand-in for the bot's API
+
+Every --poll seconds the bridge asks
+
+    /api/v1/pair_candles?limit=TAIL_CANDLES     the last analyzed candles (the whole ring on start or after a gap)
+    /api/v1/status                              open trades
+    /api/v1/trades?offset=<final closed trades> closed trades from the lowest open trade id on
+
+and keeps the last --candles candles in a ring buffer. Requests revalidate with If-None-Match when the API sent
+an ETag (freqtrade does not, the small tail limit and the trade offset keep those requests small). Only new or
+changed candles (the forming candle, indicator values settling) and changed trades are pushed, as JSON text
+frames:
+
+    {"type": "snapshot", "pair", "timeframe", "ring_size", "indicators": [...], "candles": [...], "trades": [...]}
+    {"type": "candles", "candles": [{"time", "open", "high", "low", "close", "volume", <indicator>: ...}, ...]}
+    {"type": "trades", "trades": [...]}     every trade of the pair (open and closed), they become the markers
+    {"type": "status", "connected": true|false, "error": "..."}
+
+Standard library only, like chart_server.py.
+"""
+import os
+import sys
+import json
+import base64
+import bisect
+import asyncio
+import hashlib
+import argparse
+import webbrowser
+import http.client
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+DEFAULT_API = 'http://127.0.0.1:8080'
+DEFAULT_RING = 1000
+DEFAULT_POLL_SECONDS = 5.0
+# Candles asked for on every poll once the ring is filled: the forming one plus a few settled ones
+TAIL_CANDLES = 3
+TRADES_PAGE = 500
+LIVE_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'live-chart.html')
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# pair_candles columns that are not indicator lines
+SIGNAL_COLUMNS = {'date', 'enter_long', 'exit_long', 'enter_short', 'exit_short', 'enter_tag', 'exit_tag',
+                  'buy', 'sell', 'buy_tag', 'exit_reason'}
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+class ApiError(Exception):
+    """The REST API answered with an error status"""
+
+class RestClient:
+    """Keep-alive client of the freqtrade REST API with HTTP basic auth and ETag revalidation"""
+
+    def __init__(self, base_url, username, password, timeout=10):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.auth = 'Basic ' + base64.b64encode(f"{username}:{password}".encode('utf-8')).decode('ascii')
+        self.conn = None
+        self.etags = {}
+        self.cached = {}
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def get(self, path, params=None):
+        """(decoded JSON, changed) of a GET; changed is False when the API answered 304 Not Modified"""
+        target = self.prefix + path + ('?' + urlencode(params) if params else '')
+        headers = {'Authorization': self.auth, 'Accept': 'application/json'}
+        if target in self.etags:
+            headers['If-None-Match'] = self.etags[target]
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self.conn.request('GET', target, headers=headers)
+                response = self.conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Keep-alive connection dropped by the API, retry once on a new one
+                self.close()
+                if attempt:
+                    raise
+        if response.status == 304 and target in self.cached:
+            return self.cached[target], False
+        if response.status != 200:
+            raise ApiError(f"GET {target}: HTTP {response.status} {body[:200].decode('utf-8', 'replace')}")
+        data = json.loads(body)
+        etag = response.getheader('ETag')
+        if etag:
+            self.etags[target] = etag
+            self.cached[target] = data
+        return data, True
+
+class CandleRing:
+    """The last size candles by open time, merge returns the ones that are new or changed"""
+
+    def __init__(self, size):
+        self.size = size
+        self.times = []
+        self.rows = {}
+
+    def merge(self, rows):
+        changed = []
+        for row in rows:
+            time = row['time']
+            if self.rows.get(time) == row:
+                continue
+            if time not in self.rows:
+                if len(self.times) >= self.size and time < self.times[0]:
+                    continue
+                bisect.insort(self.times, time)
+            self.rows[time] = row
+            changed.append(row)
+        for time in self.times[:max(0, len(self.times) - self.size)]:
+            del self.rows[time]
+        del self.times[:max(0, len(self.times) - self.size)]
+        return [row for row in changed if row['time'] in self.rows]
+
+    def last_time(self):
+        return self.times[-1] if self.times else None
+
+    def candles(self):
+        return [self.rows[time] for time in self.times]
+
+def candle_rows(payload, known=()):
+    """
+    (rows, indicator names) of a pair_candles answer, times in epoch seconds. Columns of known that are all
+    null in this answer (a short tail during the warm-up) stay indicators.
+    """
+    columns = payload.get('columns') or []
+    data = payload.get('data') or []
+    if '__date_ts' not in columns:
+        raise ApiError("pair_candles answer without __date_ts column")
+    ts = columns.index('__date_ts')
+    # Indicator lines are the numeric columns that are not candles or signals
+    sample = {}
+    for values in data:
+        for name, value in zip(columns, values):
+            if value is not None:
+                sample.setdefault(name, value)
+    indicators = [name for name in columns if name not in SIGNAL_COLUMNS and name not in CANDLE_COLUMNS
+                  and not name.startswith('_')
+                  and ((isinstance(sample.get(name), (int, float)) and not isinstance(sample.get(name), bool))
+                       or (name in known and name not in sample))]
+    keep = [(columns.index(name), name) for name in CANDLE_COLUMNS + indicators if name in columns]
+    rows = []
+    for values in data:
+        row = {'time': int(values[ts]) // 1000}
+        # NaN (warm-up) as null, so unchanged rows compare equal
+        row.update({name: values[i] if values[i] == values[i] else None for i, name in keep})
+        rows.append(row)
+    return rows, indicators
+
+def trade_marker(trade):
+    """The fields of an API trade the page draws"""
+    return {
+        'id': trade.get('trade_id'),
+        'open_time': (trade.get('open_timestamp') or 0) // 1000,
+        'open_rate': trade.get('open_rate'),
+        'close_time': (trade.get('close_timestamp') or 0) // 1000 if not trade.get('is_open') else 0,
+        'close_rate': trade.get('close_rate') if not trade.get('is_open') else None,
+        'is_short': bool(trade.get('is_short')),
+        'is_open': bool(trade.get('is_open')),
+        'profit_ratio': trade.get('profit_ratio'),
+    }
+
+class LiveBridge:
+    """Polls the API into the ring and the trade list, and broadcasts the deltas to the connected pages"""
+
+    def __init__(self, client, pair, timeframe, ring_size=DEFAULT_RING, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.client = client
+        self.pair = pair
+        self.timeframe = timeframe
+        self.ring = CandleRing(ring_size)
+        self.poll_seconds = poll_seconds
+        self.indicators = []
+        self.bar_seconds = None
+        self.closed = {}
+        # Trade ids (all pairs) of the closed trades read and of the trades open at the last status
+        self.closed_ids = set()
+        self.open_ids = set()
+        self.open = {}
+        self.clients = set()
+        self.connected = None
+        # http.client is blocking, one thread keeps the requests (and the keep-alive connection) in order
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def api(self, path, params=None):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.client.get, path, params)
+
+    def trades(self):
+        return sorted(list(self.closed.values()) + list(self.open.values()), key=lambda t: t['open_time'])
+
+    def snapshot(self):
+        return {'type': 'snapshot', 'pair': self.pair, 'timeframe': self.timeframe, 'ring_size': self.ring.size,
+                'indicators': self.indicators, 'candles': self.ring.candles(), 'trades': self.trades()}
+
+    async def poll_candles(self):
+        last = self.ring.last_time()
+        limit = TAIL_CANDLES if last is not None else self.ring.size
+        while True:
+            payload, changed = await self.api('/api/v1/pair_candles',
+                                              {'pair': self.pair, 'timeframe': self.timeframe, 'limit': limit})
+            if not changed:
+                return []
+            rows, indicators = candle_rows(payload, self.indicators)
+            self.bar_seconds = (payload.get('timeframe_ms') or 0) // 1000 or self.bar_seconds
+            # Missed more than the tail since the last poll (bridge paused, bot restarted): ask for the whole ring
+            if limit < self.ring.size and rows and rows[0]['time'] > last + (self.bar_seconds or 0):
+                limit = self.ring.size
+                continue
+            break
+        if indicators != self.indicators:
+            # First answer or the strategy changed its columns: the pages redraw from a snapshot
+            self.indicators = indicators
+            self.ring.merge(rows)
+            await self.broadcast(self.snapshot())
+            return []
+        return self.ring.merge(rows)
+
+    async def poll_trades(self):
+        changed = False
+        status, fresh = await self.api('/api/v1/status')
+        if fresh:
+            self.open_ids = {t.get('trade_id') for t in status}
+            current = {t.get('trade_id'): trade_marker(t) for t in status if t.get('pair') == self.pair}
+            changed = current != self.open
+            self.open = current
+        # Closed trades are listed by id but close out of id order (a later trade of another pair closes first),
+        # so a closed trade can turn up before ones already read. The list is re-read from the lowest id that may
+        # still close: open at the status, or missing between the closed ids read (opened after the status)
+        unsettled = set(self.open_ids)
+        if self.closed_ids:
+            unsettled |= set(range(min(self.closed_ids), max(self.closed_ids))) - self.closed_ids
+        lowest = min(unsettled, default=None)
+        offset = sum(1 for trade_id in self.closed_ids if lowest is None or trade_id < lowest)
+        while True:
+            page, _ = await self.api('/api/v1/trades', {'limit': TRADES_PAGE, 'offset': offset})
+            trades = page.get('trades') or []
+            offset += len(trades)
+            for trade in trades:
+                self.closed_ids.add(trade.get('trade_id'))
+                if trade.get('pair') == self.pair and not trade.get('is_open'):
+                    marker = trade_marker(trade)
+                    if self.closed.get(trade.get('trade_id')) != marker:
+                        self.closed[trade.get('trade_id')] = marker
+                        changed = True
+                    if self.open.pop(trade.get('trade_id'), None) is not None:
+                        changed = True
+            if len(trades) < TRADES_PAGE:
+                break
+        return changed
+
+    async def poll_forever(self):
+        while True:
+            try:
+                candles = await self.poll_candles()
+                trades_changed = await self.poll_trades()
+                if self.connected is not True:
+                    self.connected = True
+                    print(f"[INFO] Connected to the bot API, {len(self.ring.times)} candles of {self.pair} "
+                          f"{self.timeframe}, indicators: {self.indicators}")
+                    await self.broadcast({'type': 'status', 'connected': True})
+                if candles:
+                    await self.broadcast({'type': 'candles', 'candles': candles})
+                if trades_changed:
+                    await self.broadcast({'type': 'trades', 'trades': self.trades()})
+            except (ApiError, OSError, http.client.HTTPException, ValueError) as e:
+                if self.connected is not False:
+                    print(f"[WARN] Bot API unavailable: {e}")
+                    self.connected = False
+                    await self.broadcast({'type': 'status', 'connected': False, 'error': str(e)})
+            await asyncio.sleep(self.poll_seconds)
+
+    async def broadcast(self, message):
+        if not self.clients:
+            return
+        frame = ws_frame(json.dumps(message, separators=(',', ':')).encode('utf-8'))
+        for writer in list(self.clients):
+            try:
+                writer.write(frame)
+                await asyncio.wait_for(writer.drain(), self.poll_seconds * 4 + 5)
+            except (ConnectionError, asyncio.TimeoutError):
+                # Gone or too slow to keep up, it gets a fresh snapshot when it reconnects
+                self.clients.discard(writer)
+                writer.close()
+
+def ws_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+
+def ws_frame(payload, opcode=0x1):
+    """One unmasked (server to client) WebSocket frame"""
+    length = len(payload)
+    if length < 126:
+        head = bytes([0x80 | opcode, length])
+    elif length < 1 << 16:
+        head = bytes([0x80 | opcode, 126]) + length.to_bytes(2, 'big')
+    else:
+        head = bytes([0x80 | opcode, 127]) + length.to_bytes(8, 'big')
+    return head + payload
+
+async def ws_read(reader):
+    """(opcode, payload) of the next client frame"""
+    b0, b1 = await reader.readexactly(2)
+    length = b1 & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), 'big')
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), 'big')
+    mask = await reader.readexactly(4) if b1 & 0x80 else b'\0\0\0\0'
+    payload = bytearray(await reader.readexactly(length))
+    for i in range(length):
+        payload[i] ^= mask[i % 4]
+    return b0 & 0x0F, bytes(payload)
+
+async def handle_connection(bridge, reader, writer):
+    """Serve live-chart.html, or upgrade /ws to a WebSocket fed by the bridge"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ')
+    headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(':') for l in lines[1:] if l)}
+    path = urlsplit(parts[1]).path if len(parts) == 3 else ''
+    if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket' and 'sec-websocket-key' in headers:
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {ws_accept(headers['sec-websocket-key'])}\r\n\r\n").encode('latin-1'))
+        writer.write(ws_frame(json.dumps(bridge.snapshot(), separators=(',', ':')).encode('utf-8')))
+        if bridge.connected is not None:
+            writer.write(ws_frame(json.dumps({'type': 'status', 'connected': bridge.connected}).encode('utf-8')))
+        bridge.clients.add(writer)
+        try:
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(ws_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(ws_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            bridge.clients.discard(writer)
+            writer.close()
+        return
+    if path in ('/', '/live-chart.html'):
+        with open(LIVE_PAGE, 'rb') as f:
+            status, content_type, body = '200 OK', 'text/html; charset=utf-8', f.read()
+    else:
+        status, content_type, body = '404 Not Found', 'text/plain', f"Unknown path {path}".encode('utf-8')
+    writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                  "Cache-Control: no-store\r\nConnection: close\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    writer.close()
+
+async def serve(bridge, host=DEFAULT_HOST, port=DEFAULT_PORT, open_browser=False):
+    server = await asyncio.start_server(lambda r, w: handle_connection(bridge, r, w), host, port)
+    url = f"http://{host}:{port}/"
+    print(f"[INFO] Live chart of {bridge.pair} {bridge.timeframe} on {url} (polling every {bridge.poll_seconds}s), "
+          f"Ctrl+C to stop")
+    if open_browser:
+        webbrowser.open(url)
+    async with server:
+        await asyncio.gather(server.serve_forever(), bridge.poll_forever())
+
+def bot_config(bot):
+    """user_data/config.json of a bot folder in bots/"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, 'bots', bot, 'user_data', 'config.json')
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a running freqtrade bot to live-chart.html')
+    parser.add_argument('--bot', help='Bot folder in bots/, its config gives the API port, login, pair and timeframe')
+    parser.add_argument('--config', '-c', help='Bot config.json (instead of --bot)')
+    parser.add_argument('--api', help=f'REST API url (default: port of the config api_server, else {DEFAULT_API})')
+    parser.add_argument('--username', help='API username (default: from the config)')
+    parser.add_argument('--password', help='API password (default: from the config)')
+    parser.add_argument('--pair', help='Pair (default: first of the config pair_whitelist)')
+    parser.add_argument('--timeframe', help='Timeframe (default: from the config, else asked from the bot)')
+    parser.add_argument('--candles', type=int, default=DEFAULT_RING,
+                        help=f'Candles kept and shown (default: {DEFAULT_RING})')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f'Seconds between API polls (default: {DEFAULT_POLL_SECONDS})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Interface to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--open', action='store_true', help='Open the chart in the default browser')
+    args = parser.parse_args()
+
+    config = {}
+    config_path = args.config or (bot_config(args.bot) if args.bot else None)
+    if config_path:
+        if not os.path.exists(config_path):
+            print(f"[ERROR] Config not found: {config_path}")
+            sys.exit(1)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    api_server = config.get('api_server') or {}
+    api = args.api or (f"http://127.0.0.1:{api_server['listen_port']}" if 'listen_port' in api_server else DEFAULT_API)
+    pair = args.pair or next(iter((config.get('exchange') or {}).get('pair_whitelist') or []), None)
+    client = RestClient(api, args.username or api_server.get('username', ''),
+                        args.password or api_server.get('password', ''))
+    timeframe = args.timeframe or config.get('timeframe')
+    if not timeframe:
+        # Usually set by the strategy, the running bot knows it
+        try:
+            timeframe = client.get('/api/v1/show_config')[0].get('timeframe')
+        except (ApiError, OSError, http.client.HTTPException, ValueError) as e:
+            print(f"[WARN] Could not ask the bot for its timeframe: {e}")
+    if not pair or not timeframe:
+        print("[ERROR] No pair/timeframe: pass --pair and --timeframe, or a config with pair_whitelist and timeframe")
+        sys.exit(1)
+    bridge = LiveBridge(client, pair, timeframe, args.candles, args.poll)
+    try:
+        asyncio.run(serve(bridge, args.host, args.port, args.open))
+    except KeyboardInterrupt:
+        print("\n[INFO] Live bridge stopped")
+
+if __name__ == '__main__':
+    main()
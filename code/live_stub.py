@@ -0,0 +1,256 @@
+"""
+Stand-in for the REST API of a running freqtrade bot that replays a bot's stored candles and backtest trades,
+to try live_bridge.py and live-chart.html without a dry-run bot.
+
+    python live_stub.py --bot test_bot --interval 1
+    python live_bridge.py --bot test_bot --poll 1
+
+The replay clock starts --start candles into the pair's feather file (default: a little before the first trade)
+and reveals one candle every --interval seconds, in --ticks steps so the last candle is seen forming. Like
+freqtrade's API (the parts live_bridge.py uses) it answers
+
+    /api/v1/ping, /api/v1/show_config               (timeframe only)
+    /api/v1/pair_candles?pair=&timeframe=&limit=    candles up to the clock, with the columns of the newest
+                                                    indicator csv of user_data/data/indicator_data when there is one
+    /api/v1/status                                  backtest trades open at the clock
+    /api/v1/trades?limit=&offset=                   backtest trades closed before the clock, by trade id
+
+with HTTP basic auth against the config's api_server login, and an ETag on every answer (If-None-Match gets a
+304), which freqtrade itself does not send.
+
+The trades are those of every pair in the latest backtest result, plus a hedge trade on HEDGE_PAIR opened
+right after each trade of the replayed pair and closed halfway through it, so that trades close out of id order
+as they do on a bot trading several pairs.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import argparse
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+
+import export_markers
+import unzip_backtest_results
+import live_bridge
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_TICKS = 5
+# Candles shown before the first trade when --start is not given
+LEAD_CANDLES = 200
+# Made-up pair of the hedge trades
+HEDGE_PAIR = 'HEDGE/STUB'
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found'}
+
+class Replay:
+    """Candles and trades of a bot as seen at a clock moving one candle per interval"""
+
+    def __init__(self, candles, indicators, trades, pair, timeframe, start, interval, ticks):
+        self.candles = candles
+        self.indicators = indicators
+        self.trades = trades
+        self.pair = pair
+        self.timeframe = timeframe
+        self.start = start
+        self.interval = interval
+        self.ticks = ticks
+        self.started = time.monotonic()
+        times = candles['time'].to_numpy()
+        self.bar_seconds = int(np.median(np.diff(times[:1000]))) if len(times) > 1 else 60
+
+    def position(self):
+        """(index of the forming candle, fraction of it revealed)"""
+        step = int((time.monotonic() - self.started) / self.interval * self.ticks)
+        index = min(self.start + step // self.ticks, len(self.candles) - 1)
+        return index, (step % self.ticks + 1) / self.ticks
+
+    def clock(self):
+        index, fraction = self.position()
+        return int(self.candles['time'].iat[index] + fraction * self.bar_seconds)
+
+    def pair_candles(self, query):
+        if query.get('pair', self.pair) != self.pair:
+            return 400, {'detail': f"No data for {query.get('pair')}, replaying {self.pair}"}
+        index, fraction = self.position()
+        limit = int(query.get('limit') or 0) or index + 1
+        df = self.candles.iloc[max(0, index + 1 - limit):index + 1].copy()
+        # The forming candle closes where it has got to so far
+        last = df.index[-1]
+        final = df.loc[last, 'close']
+        df.loc[last, 'close'] = df.loc[last, 'open'] + (final - df.loc[last, 'open']) * fraction
+        df.loc[last, 'high'] = min(df.loc[last, 'high'], max(df.loc[last, 'open'], df.loc[last, 'close']))
+        df.loc[last, 'low'] = max(df.loc[last, 'low'], min(df.loc[last, 'open'], df.loc[last, 'close']))
+        df.loc[last, 'volume'] = df.loc[last, 'volume'] * fraction
+        df['enter_long'] = 0
+        df['exit_long'] = 0
+        df['__date_ts'] = df['time'] * 1000
+        df.insert(0, 'date', pd.to_datetime(df['time'], unit='s', utc=True).dt.strftime('%Y-%m-%d %H:%M:%S'))
+        df = df.drop(columns=['time'])
+        columns = list(df.columns)
+        data = df.astype(object).where(df.notna(), None).values.tolist()
+        return 200, {'pair': self.pair, 'timeframe': self.timeframe, 'timeframe_ms': self.bar_seconds * 1000,
+                     'strategy': 'replay', 'columns': columns, 'data': data, 'length': len(data),
+                     'data_start_ts': int(df['__date_ts'].iat[0]), 'data_stop_ts': int(df['__date_ts'].iat[-1])}
+
+    def status(self, query):
+        now = self.clock() * 1000
+        return 200, [dict(t, is_open=True, close_timestamp=None, close_rate=None) for t in self.trades
+                     if t['open_timestamp'] <= now < t['close_timestamp']]
+
+    def closed_trades(self, query):
+        now = self.clock() * 1000
+        closed = [dict(t, is_open=False) for t in self.trades if t['close_timestamp'] <= now]
+        offset, limit = int(query.get('offset') or 0), int(query.get('limit') or 500)
+        page = closed[offset:offset + limit]
+        return 200, {'trades': page, 'trades_count': len(page), 'offset': offset, 'total_trades': len(closed)}
+
+def load_trades(bt_dir, pair):
+    """Backtest trades of the latest result and the hedge trades of pair, as API trade dicts numbered by open time"""
+    result = unzip_backtest_results.latest_result(bt_dir) if os.path.isdir(bt_dir) else None
+    if not result:
+        return []
+    with export_markers.open_text(result) as text:
+        trades = [trade for _, trade in export_markers.iter_trades(text, None, None)]
+    hedges = [dict(t, pair=HEDGE_PAIR, close_timestamp=(t['open_timestamp'] + t['close_timestamp']) // 2)
+              for t in trades if t.get('pair') == pair and t.get('close_timestamp')]
+    # A hedge opens with its trade but after it, and closes first
+    trades = sorted([(t, 0) for t in trades] + [(t, 1) for t in hedges], key=lambda x: (x[0]['open_timestamp'], x[1]))
+    return [{'trade_id': i + 1, 'pair': t['pair'], 'open_timestamp': t['open_timestamp'],
+             'close_timestamp': t.get('close_timestamp') or 2**62, 'open_rate': t['open_rate'],
+             'close_rate': t.get('close_rate'), 'is_short': bool(t.get('is_short')),
+             'profit_ratio': t.get('profit_ratio')} for i, (t, _) in enumerate(trades)]
+
+def pair_file(pair):
+    """File name prefix of a pair's data, as freqtrade writes it"""
+    return pair.replace('/', '_').replace(':', '_')
+
+def load_candles(data_dir, pair, timeframe, indicator_csv=None):
+    """(candles with epoch seconds 'time' and the indicator csv columns merged in, indicator names)"""
+    path = os.path.join(data_dir, f"{pair_file(pair)}-{timeframe}.feather")
+    df = pd.read_feather(path)
+    df['time'] = (pd.to_datetime(df['date'], utc=True) - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    df = df[['time', 'open', 'high', 'low', 'close', 'volume']]
+    indicators = []
+    if indicator_csv:
+        ind = pd.read_csv(indicator_csv)
+        indicators = [c for c in ind.columns if c != 'time' and pd.api.types.is_numeric_dtype(ind[c])]
+        df = df.merge(ind[['time'] + indicators], on='time', how='left')
+    return df.reset_index(drop=True), indicators
+
+def respond(status, body, headers):
+    """(status, body bytes, ETag) with If-None-Match handled"""
+    payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    etag = '"' + hashlib.sha1(payload).hexdigest()[:20] + '"'
+    if status == 200 and headers.get('if-none-match') == etag:
+        return 304, b'', etag
+    return status, payload, etag
+
+async def handle_connection(replay, auth, reader, writer):
+    routes = {'/api/v1/pair_candles': replay.pair_candles, '/api/v1/status': replay.status,
+              '/api/v1/trades': replay.closed_trades, '/api/v1/ping': lambda q: (200, {'status': 'pong'}),
+              '/api/v1/show_config': lambda q: (200, {'timeframe': replay.timeframe, 'dry_run': True,
+                                                      'state': 'running', 'bot_name': 'replay'})}
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode('latin-1').split('\r\n')
+            parts = lines[0].split(' ')
+            if len(parts) != 3:
+                break
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(':') for l in lines[1:] if l)}
+            url = urlsplit(parts[1])
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if auth and headers.get('authorization') != auth:
+                status, body, etag = 401, b'{"detail":"Unauthorized"}', None
+            elif url.path not in routes:
+                status, body, etag = 404, b'{"detail":"Not Found"}', None
+            else:
+                status, body, etag = respond(*routes[url.path](query), headers)
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n" + (f"ETag: {etag}\r\n" if etag else '') +
+                          "Connection: keep-alive\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+    finally:
+        writer.close()
+
+async def serve(replay, auth, host, port):
+    server = await asyncio.start_server(lambda r, w: handle_connection(replay, auth, r, w), host, port)
+    start_time = pd.to_datetime(int(replay.candles['time'].iat[replay.start]), unit='s', utc=True)
+    trades = sum(1 for t in replay.trades if t['pair'] == replay.pair)
+    print(f"[INFO] Replaying {replay.pair} {replay.timeframe} from {start_time} ({trades} trades, "
+          f"indicators: {replay.indicators}) on http://{host}:{port}/api/v1, one candle every "
+          f"{replay.interval}s, Ctrl+C to stop")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay stored candles and backtest trades as a freqtrade REST API')
+    parser.add_argument('--bot', required=True, help='Bot folder in bots/ (its data, backtest results and config)')
+    parser.add_argument('--pair', help='Pair (default: first of the config pair_whitelist)')
+    parser.add_argument('--timeframe', help='Timeframe (default: from the config)')
+    parser.add_argument('--indicators', help='Indicator csv (default: newest one in user_data/data/indicator_data)')
+    parser.add_argument('--start', type=int, help=f'Candle index the replay starts at (default: {LEAD_CANDLES} '
+                                                  f'candles before the first trade)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'Seconds per candle (default: {DEFAULT_INTERVAL})')
+    parser.add_argument('--ticks', type=int, default=DEFAULT_TICKS,
+                        help=f'Updates of the forming candle per interval (default: {DEFAULT_TICKS})')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Port (default: the config api_server listen_port, else 8080)')
+    args = parser.parse_args()
+
+    config_path = live_bridge.bot_config(args.bot)
+    if not os.path.exists(config_path):
+        print(f"[ERROR] Config not found: {config_path}")
+        sys.exit(1)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    user_data = os.path.dirname(config_path)
+    pair = args.pair or next(iter((config.get('exchange') or {}).get('pair_whitelist') or []), None)
+    data_dir = os.path.join(user_data, 'data', (config.get('exchange') or {}).get('name', ''))
+    timeframe = args.timeframe or config.get('timeframe')
+    if pair and not timeframe:
+        # Set by the strategy rather than the config: the timeframe of the pair's only feather file
+        found = glob.glob(os.path.join(data_dir, f"{pair_file(pair)}-*.feather"))
+        if len(found) == 1:
+            timeframe = os.path.basename(found[0])[len(pair_file(pair)) + 1:-len('.feather')]
+    if not pair or not timeframe:
+        print("[ERROR] No pair/timeframe: pass --pair and --timeframe")
+        sys.exit(1)
+    indicator_csv = args.indicators
+    if not indicator_csv:
+        found = glob.glob(os.path.join(user_data, 'data', 'indicator_data', 'indicator_data_*.csv'))
+        indicator_csv = max(found, key=os.path.getmtime) if found else None
+    try:
+        candles, indicators = load_candles(data_dir, pair, timeframe, indicator_csv)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    trades = load_trades(os.path.join(user_data, 'backtest_results'), pair)
+    start = args.start
+    if start is None:
+        first = next((t['open_timestamp'] // 1000 for t in trades if t['pair'] == pair), None)
+        start = int(np.searchsorted(candles['time'].to_numpy(), first)) - LEAD_CANDLES if first else LEAD_CANDLES
+    start = max(0, min(start, len(candles) - 1))
+
+    api_server = config.get('api_server') or {}
+    auth = None
+    if api_server.get('username'):
+        auth = 'Basic ' + base64.b64encode(
+            f"{api_server['username']}:{api_server.get('password', '')}".encode('utf-8')).decode('ascii')
+    replay = Replay(candles, indicators, trades, pair, timeframe, start, args.interval, args.ticks)
+    try:
+        asyncio.run(serve(replay, auth, args.host, args.port or api_server.get('listen_port', 8080)))
+    except KeyboardInterrupt:
+        print("\n[INFO] Replay stopped")
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,50 @@ import os
 import sys
 import json
 import subprocess
-import glob
 import re
+import time
+import argparse
+import tempfile
+import sqlite3
+import threading
+import zipfile
 from pathlib import Path
+from contextlib import nullcontext, closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import unzip_backtest_results
+import export_markers
+import chart_pyramid
+import chart_bundle
+import chart_server
+import stage_timer
+import strategy_index
+import fs_watch
+import backtest_catalog
+import output_store
+
+# Chart data written by the pipeline: 'csv', 'lwcb' (binary columns) or 'both'
+CHART_FORMAT = 'both'
+# extract_indicators.py --lean (lower peak memory for small containers) and --downcast-rtol (None keeps float64)
+EXTRACTION_LEAN = False
+EXTRACTION_DOWNCAST_RTOL = None
+# Scripts that have to live in user_data/code to be run inside the container
+CONTAINER_SCRIPTS = ['extract_indicators.py', 'chart_binary.py', 'extraction_daemon.py', 'stage_timer.py',
+                     'strategy_index.py', 'hyperopt_epochs.py']
+# Run extractions through the long-lived worker in the container (warm imports) instead of a cold python3
+USE_EXTRACTION_DAEMON = True
+DAEMON_SCRIPT = 'user_data/code/extraction_daemon.py'
+# Exit code of 'extraction_daemon.py run' when no daemon is listening (see extraction_daemon.py)
+DAEMON_UNAVAILABLE = 75
+DAEMON_START_TIMEOUT = 60
+# Batch mode: concurrent jobs per freqtrade container, and in total
+DEFAULT_MAX_PER_CONTAINER = 1
+DEFAULT_MAX_JOBS = 4
+ACTIONS = ['backtest', 'visualize', 'both']
+# Batch progress lines come from several threads
+_PRINT_LOCK = threading.Lock()
+# Stage timings of this run, saved as JSON by save_trace()
+TRACE = stage_timer.StageTrace('main')
 
 
 def print_header(text):
@@ -43,18 +84,8 @@ def find_strategies(bot_name):
         print(f"[ERROR] Strategies directory not found: {strat_dir}")
         return []
     
-    strategy_files = glob.glob(str(strat_dir / '**/*.py'), recursive=True)
-    strategies = []
-    
-    # Extract class names that inherit from IStrategy
-    pattern = re.compile(r'class\s+(\w+)\s*\(.*IStrategy.*\)\s*:')
-    for file in strategy_files:
-        with open(file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            matches = pattern.findall(content)
-            strategies.extend(matches)
-    
-    return sorted(set(strategies))
+    # Classes deriving from IStrategy (also through intermediate bases), from the cached index
+    return sorted(strategy_index.find_strategies(str(strat_dir)))
 
 
 def load_config(bot_name):
@@ -131,14 +162,56 @@ def ensure_container_running(bot_name):
     return container_name
 
 
-def run_backtest(bot_name, strategy, config):
-    """Run freqtrade backtesting"""
+def host_trace_path(name):
+    """Temporary path for the --trace output of a script run on the host"""
+    return Path(tempfile.gettempdir()) / f"lwc_{name}_{os.getpid()}.json"
+
+
+def save_trace(output_dir=None):
+    """Write the stage trace of this run to output/traces/ (or output_dir) and print it"""
+    if not TRACE.stages:
+        return None
+    if output_dir:
+        path = Path(output_dir) / 'trace.json'
+    else:
+        path = Path(__file__).parent.parent / 'output' / 'traces' / f"trace_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    TRACE.save(str(path))
+    TRACE.print_report()
+    print(f"[INFO] Stage trace saved to {path}")
+    return path
+
+
+def run_extraction(container_name, extract_args):
+    """
+    Run extract_indicators.py with extract_args inside the container, returns its exit code.
+    Uses the extraction daemon, starting it on first use; falls back to a cold python3 run.
+    """
+    if USE_EXTRACTION_DAEMON:
+        submit = ['docker', 'exec', container_name, 'python3', DAEMON_SCRIPT, 'run']
+        print(f"[DEBUG] Running via extraction daemon: {' '.join(extract_args)}")
+        result = subprocess.run(submit + ['--'] + extract_args)
+        if result.returncode != DAEMON_UNAVAILABLE:
+            return result.returncode
+        print("[INFO] Starting extraction daemon in container...")
+        started = subprocess.run(['docker', 'exec', '-d', container_name, 'python3', DAEMON_SCRIPT, 'serve'])
+        if started.returncode == 0:
+            result = subprocess.run(submit + ['--wait', str(DAEMON_START_TIMEOUT), '--'] + extract_args)
+            if result.returncode != DAEMON_UNAVAILABLE:
+                return result.returncode
+        print("[WARN] Extraction daemon unavailable, running extract_indicators.py directly")
+    
+    cmd = ['docker', 'exec', container_name, 'python3', 'user_data/code/extract_indicators.py'] + extract_args
+    print(f"[DEBUG] Running: {' '.join(cmd)}")
+    return subprocess.run(cmd).returncode
+
+
+def run_backtest(bot_name, strategy, config, timerange=None, pair=None):
+    """Run freqtrade backtesting, on every whitelisted pair unless pair is given"""
     print_header(f"Running Backtest: {strategy}")
     
     container_name = ensure_container_running(bot_name)
     
     timeframe = config.get('timeframe', '1h')
-    timerange = input(f"[INPUT] Timerange (YYYYMMDD-YYYYMMDD) [default: last 90 days]: ").strip()
     
     cmd = [
         'docker', 'exec', container_name,
@@ -150,9 +223,12 @@ def run_backtest(bot_name, strategy, config):
     
     if timerange:
         cmd.extend(['--timerange', timerange])
+    if pair:
+        cmd.extend(['--pairs', pair])
     
     print(f"[DEBUG] Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd)
+    with TRACE.stage('backtest', strategy=strategy, timerange=timerange, pair=pair):
+        result = subprocess.run(cmd)
     
     if result.returncode != 0:
         print("[ERROR] Backtest failed")
@@ -161,8 +237,38 @@ def run_backtest(bot_name, strategy, config):
     print("[SUCCESS] Backtest completed")
 
 
-def prepare_visualization_files(bot_name, strategy):
-    """Run all scripts needed to prepare files for LightweightCharts"""
+def extract_indicators(bot_name, container_name, strategy, pair=None, timerange=None, profile=False):
+    """Run extract_indicators.py for strategy in the bot's container (step 4), returns its exit code"""
+    bot_dir = Path(__file__).parent.parent / 'bots' / bot_name
+    # The container writes its stage trace into the shared user_data volume
+    trace_name = f".extract_trace_{os.getpid()}.json"
+    extract_args = ['--strategy', strategy, '--format', CHART_FORMAT,
+                    '--trace', f"user_data/data/indicator_data/{trace_name}"]
+    if pair:
+        # One output file per pair, so concurrent jobs of the same strategy do not overwrite each other
+        extract_args.extend(['--pairs', pair])
+    if timerange:
+        extract_args.extend(['--timerange', timerange])
+    if profile:
+        extract_args.append('--profile')
+    if EXTRACTION_LEAN:
+        extract_args.append('--lean')
+    if EXTRACTION_DOWNCAST_RTOL is not None:
+        extract_args.extend(['--downcast-rtol', str(EXTRACTION_DOWNCAST_RTOL)])
+    with TRACE.stage('extract_indicators', strategy=strategy) as record:
+        returncode = run_extraction(container_name, extract_args)
+        TRACE.attach_file(record, str(bot_dir / 'user_data' / 'data' / 'indicator_data' / trace_name))
+    return returncode
+
+
+def prepare_visualization_files(bot_name, strategy, pair=None, timerange=None, output_dir=None, shared_steps=True,
+                                profile=False):
+    """
+    Run all scripts needed to prepare files for LightweightCharts.
+    shared_steps=False skips the feather conversion and unzip steps, which cover every bot and are run once
+    by batch mode instead of by each of its concurrent jobs. profile=True runs populate_indicators under cProfile.
+    Returns the files copied to the output folder as (file type, path) pairs.
+    """
     print_header("Preparing Visualization Files")
     
     bot_dir = Path(__file__).parent.parent / 'bots' / bot_name
@@ -172,8 +278,14 @@ def prepare_visualization_files(bot_name, strategy):
     # 1. Convert feather to CSV
     print("\n[STEP 1/4] Converting feather files to CSV...")
     feather_script = code_dir / 'feather_to_csv.py'
-    if feather_script.exists():
-        subprocess.run([sys.executable, str(feather_script)], check=True)
+    if not shared_steps:
+        print("[DEBUG] Skipped, done once for the whole batch")
+    elif feather_script.exists():
+        trace_path = host_trace_path('feather_to_csv')
+        with TRACE.stage('feather_to_csv') as record:
+            subprocess.run([sys.executable, str(feather_script), '--format', CHART_FORMAT,
+                            '--trace', str(trace_path)], check=True)
+            TRACE.attach_file(record, str(trace_path))
         print("[SUCCESS] Feather files converted")
     else:
         print(f"[WARN] feather_to_csv.py not found at {feather_script}")
@@ -181,60 +293,101 @@ def prepare_visualization_files(bot_name, strategy):
     # 2. Unzip backtest results
     print("\n[STEP 2/4] Unzipping backtest results...")
     unzip_script = code_dir / 'unzip_backtest_results.py'
-    if unzip_script.exists():
-        subprocess.run([sys.executable, str(unzip_script)], check=True)
+    if not shared_steps:
+        print("[DEBUG] Skipped, done once for the whole batch")
+    elif unzip_script.exists():
+        trace_path = host_trace_path('unzip')
+        with TRACE.stage('unzip_backtest_results') as record:
+            subprocess.run([sys.executable, str(unzip_script), '--trace', str(trace_path)], check=True)
+            TRACE.attach_file(record, str(trace_path))
         print("[SUCCESS] Backtest results unzipped")
     else:
         print(f"[WARN] unzip_backtest_results.py not found at {unzip_script}")
     
-    # 3. Copy extract_indicators.py into container if needed
+    # 3. Copy extract_indicators.py (and the modules it imports) into container if needed
     print("\n[STEP 3/4] Ensuring extract_indicators.py is in container...")
     user_data_code = bot_dir / 'user_data' / 'code'
     user_data_code.mkdir(parents=True, exist_ok=True)
     
-    extract_script = code_dir / 'extract_indicators.py'
-    if extract_script.exists():
-        dest = user_data_code / 'extract_indicators.py'
-        with open(extract_script, 'r', encoding='utf-8') as src:
-            with open(dest, 'w', encoding='utf-8') as dst:
-                dst.write(src.read())
-        print(f"[SUCCESS] Copied extract_indicators.py to {dest}")
-    else:
-        print(f"[ERROR] extract_indicators.py not found at {extract_script}")
-        sys.exit(1)
+    with TRACE.stage('copy_scripts') as record:
+        record['bytes'] = 0
+        for script_name in CONTAINER_SCRIPTS:
+            script = code_dir / script_name
+            if script.exists():
+                dest = user_data_code / script_name
+                with open(script, 'r', encoding='utf-8') as src:
+                    content = src.read()
+                # Only rewrite changed scripts, a running extraction daemon reloads modules whose mtime changed
+                if dest.exists() and dest.read_text(encoding='utf-8') == content:
+                    print(f"[DEBUG] {script_name} is up to date in {user_data_code}")
+                    continue
+                with open(dest, 'w', encoding='utf-8') as dst:
+                    dst.write(content)
+                record['bytes'] += len(content.encode('utf-8'))
+                print(f"[SUCCESS] Copied {script_name} to {dest}")
+            else:
+                print(f"[ERROR] {script_name} not found at {script}")
+                sys.exit(1)
     
     # 4. Run extract_indicators.py inside container
     print(f"\n[STEP 4/4] Extracting indicators for {strategy}...")
-    cmd = [
-        'docker', 'exec', container_name,
-        'python3', 'user_data/code/extract_indicators.py',
-        '--strategy', strategy
-    ]
-    
-    print(f"[DEBUG] Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd)
+    returncode = extract_indicators(bot_name, container_name, strategy, pair, timerange, profile)
     
-    if result.returncode != 0:
+    if returncode != 0:
         print("[ERROR] Indicator extraction failed")
         sys.exit(1)
     
     print("[SUCCESS] Indicators extracted")
-    print_summary(bot_name, strategy)
+    return print_summary(bot_name, strategy, pair, output_dir)
+
+
+def binary_outputs(copied_files):
+    """{file type: path} of the .lwcb files among copied_files (overview levels excluded)"""
+    return {file_type: str(path) for file_type, path in copied_files
+            if path.suffix == '.lwcb' and not chart_pyramid.is_level_file(str(path))}
+
+
+def build_levels(label, dest, store, mode):
+    """
+    Write the overview levels of a staged .lwcb file next to it (kept as they are when its content did not
+    change), returns them as copied_files entries
+    """
+    existing = chart_pyramid.existing_levels(str(dest))
+    if mode == 'unchanged' and existing:
+        return [(f"{label} LOD", Path(p)) for p in existing]
+    levels = [Path(p) for p in chart_pyramid.build_pyramid(str(dest))]
+    for level in levels:
+        store.adopt(str(level), str(level))
+    if levels:
+        print(f"[SUCCESS] Built {len(levels)} {label} overview levels → {levels[0].name} .. {levels[-1].name}")
+    return [(f"{label} LOD", p) for p in levels]
+
+
+def stage_output(store, label, src, dest):
+    """Link src into the output folder as dest through the store, returns the link mode or 'unchanged'"""
+    mode = store.stage(str(src), str(dest))
+    print(f"[SUCCESS] Staged {label} → {dest.name} ({mode})")
+    return mode
 
 
-def copy_to_output(bot_name, strategy):
-    """Copy generated files to output/ folder with readable prefixes"""
+def copy_to_output(bot_name, strategy, pair=None, output_dir=None):
+    """
+    Stage generated files in output/ folder (or output_dir) with readable prefixes, as links to
+    output_store.py blobs so unchanged files are neither copied nor rewritten
+    """
     print_header("Copying Files to Output Folder")
     
     project_root = Path(__file__).parent.parent
     bot_dir = project_root / 'bots' / bot_name
-    output_dir = project_root / 'output'
-    output_dir.mkdir(exist_ok=True)
+    output_dir = Path(output_dir) if output_dir else project_root / 'output'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    store = output_store.OutputStore(str(output_dir))
     
     config = load_config(bot_name)
     exchange = config.get('exchange', {}).get('name', 'unknown')
-    pair_whitelist = config.get('exchange', {}).get('pair_whitelist', [])
-    pair = pair_whitelist[0] if pair_whitelist else 'UNKNOWN'
+    if not pair:
+        pair_whitelist = config.get('exchange', {}).get('pair_whitelist', [])
+        pair = pair_whitelist[0] if pair_whitelist else 'UNKNOWN'
     timeframe = config.get('timeframe', '1h')
     
     pair_base = pair.replace('/', '').replace('_', '')
@@ -250,62 +403,267 @@ def copy_to_output(bot_name, strategy):
     for ohlcv_file in ohlcv_candidates:
         if ohlcv_file.exists():
             dest = output_dir / f"OHLCV_{pair_base}-{timeframe}.csv"
-            import shutil
-            shutil.copy2(ohlcv_file, dest)
+            stage_output(store, 'OHLCV', ohlcv_file, dest)
             copied_files.append(('OHLCV', dest))
-            print(f"[SUCCESS] Copied OHLCV → {dest.name}")
             break
     else:
         print(f"[WARN] OHLCV CSV not found")
+    for ohlcv_file in ohlcv_candidates:
+        binary_file = ohlcv_file.with_suffix('.lwcb')
+        if binary_file.exists():
+            dest = output_dir / f"OHLCV_{pair_base}-{timeframe}.lwcb"
+            mode = stage_output(store, 'OHLCV', binary_file, dest)
+            copied_files.append(('OHLCV', dest))
+            copied_files += build_levels('OHLCV', dest, store, mode)
+            break
     
-    # 2. Copy Indicator CSV
-    indicator_file = bot_dir / 'user_data' / 'data' / 'indicator_data' / f"indicator_data_{strategy}.csv"
+    # 2. Copy Indicator CSV (and its binary twin if present)
+    # Multi-pair extraction (--pairs/--all-pairs) writes one file per pair, prefer the one of this pair
+    indicator_dir = bot_dir / 'user_data' / 'data' / 'indicator_data'
+    indicator_file = indicator_dir / f"indicator_data_{strategy}_{pair_uscore}.csv"
+    if not indicator_file.exists() and not indicator_file.with_suffix('.lwcb').exists():
+        indicator_file = indicator_dir / f"indicator_data_{strategy}.csv"
     if indicator_file.exists():
         dest = output_dir / f"Indicator_{strategy}.csv"
-        import shutil
-        shutil.copy2(indicator_file, dest)
+        stage_output(store, 'Indicator', indicator_file, dest)
         copied_files.append(('Indicator', dest))
-        print(f"[SUCCESS] Copied Indicator → {dest.name}")
     else:
         print(f"[WARN] Indicator CSV not found: {indicator_file}")
+    binary_file = indicator_file.with_suffix('.lwcb')
+    if binary_file.exists():
+        dest = output_dir / f"Indicator_{strategy}.lwcb"
+        mode = stage_output(store, 'Indicator', binary_file, dest)
+        copied_files.append(('Indicator', dest))
+        copied_files += build_levels('Indicator', dest, store, mode)
     
-    # 3. Copy Trades JSON (most recent backtest result)
+    # 3. Export trade markers of this strategy/pair, picked and read from the backtest catalog (freqtrade's
+    #    last result when it has this strategy, else its newest backtest). A text-only pipeline still gets the
+    #    full Trades JSON of that run. Generated files are written next to their name and adopted by the store
     backtest_dir = bot_dir / 'user_data' / 'backtest_results'
     if backtest_dir.exists():
-        results = sorted(backtest_dir.glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
-        if results:
-            latest = results[0]
-            dest = output_dir / f"Trades_{strategy}_{latest.stem}.json"
-            import shutil
-            shutil.copy2(latest, dest)
-            copied_files.append(('Trades', dest))
-            print(f"[SUCCESS] Copied Trades → {dest.name}")
-        else:
-            print(f"[WARN] No backtest results found")
+        run = conn = None
+        try:
+            with TRACE.stage('catalog_ingest', bot=bot_name):
+                conn = backtest_catalog.connect()
+                backtest_catalog.ingest_bot(conn, bot_name, str(backtest_dir))
+            run = backtest_catalog.latest_run(conn, bot_name, strategy, pair, str(backtest_dir))
+        except sqlite3.Error as e:
+            print(f"[WARN] Backtest catalog unavailable ({e}), using the latest result file")
+        with closing(conn) if conn else nullcontext():
+            latest = backtest_dir / run['file'] if run else unzip_backtest_results.latest_result(str(backtest_dir))
+            if latest and CHART_FORMAT == 'csv':
+                latest = Path(latest)
+                dest = output_dir / f"Trades_{strategy}_{latest.stem}.json"
+                if store.current(str(dest), [str(latest)]):
+                    mode = 'unchanged'
+                else:
+                    tmp = store.temp_path(str(dest))
+                    unzip_backtest_results.copy_result(str(latest), tmp)
+                    mode = store.adopt(tmp, str(dest), [str(latest)])
+                copied_files.append(('Trades', dest))
+                print(f"[SUCCESS] Staged Trades → {dest.name} ({mode})")
+            elif run:
+                dest = output_dir / f"Markers_{strategy}_{pair_base}-{timeframe}.lwcb"
+                tmp = store.temp_path(str(dest))
+                count = backtest_catalog.export_run_markers(conn, run['id'], tmp, pair=pair)
+                store.adopt(tmp, str(dest))
+                copied_files.append(('Markers', dest))
+                print(f"[SUCCESS] Exported {count} trades of run {run['id']} ({run['file']}) → {dest.name}")
+            elif latest:
+                latest = Path(latest)
+                dest = output_dir / f"Markers_{strategy}_{pair_base}-{timeframe}.lwcb"
+                tmp = store.temp_path(str(dest))
+                count = export_markers.export_markers(str(latest), tmp, strategy=strategy, pair=pair)
+                store.adopt(tmp, str(dest))
+                copied_files.append(('Markers', dest))
+                print(f"[SUCCESS] Exported {count} trades from {latest.name} → {dest.name}")
+            else:
+                print(f"[WARN] No backtest results found")
     else:
         print(f"[WARN] Backtest results directory not found")
     
+    # 4. One bundle with the candles, the indicators aligned to them and the trades snapped onto them
+    binaries = binary_outputs(copied_files)
+    if 'OHLCV' in binaries:
+        dest = output_dir / f"Chart_{strategy}_{pair_base}-{timeframe}.lwcb"
+        tmp = store.temp_path(str(dest))
+        chart_bundle.build_bundle(binaries['OHLCV'], binaries.get('Indicator'), binaries.get('Markers'), tmp,
+                                  meta={'strategy': strategy, 'pair': pair, 'timeframe': timeframe})
+        mode = store.adopt(tmp, str(dest))
+        copied_files.append(('Chart', dest))
+        print(f"[SUCCESS] Built chart bundle → {dest.name} ({mode})")
+        copied_files += build_levels('Chart', dest, store, mode)
+    
+    store.save()
     return copied_files
 
 
-def print_summary(bot_name, strategy):
+def print_summary(bot_name, strategy, pair=None, output_dir=None):
     """Print summary of where to find output files"""
     print_header("Files Ready for Visualization")
     
     project_root = Path(__file__).parent.parent
     
     # Copy files to output folder
-    copied_files = copy_to_output(bot_name, strategy)
+    with TRACE.stage('copy_to_output') as record:
+        copied_files = copy_to_output(bot_name, strategy, pair, output_dir)
+        record['bytes'] = sum(os.path.getsize(path) for _, path in copied_files)
     
     print("\n" + "="*60)
     print("  Quick Access - Files copied to output/ folder:")
     print("="*60)
     for file_type, filepath in copied_files:
-        print(f"  {file_type:12} → output/{filepath.name}")
+        print(f"  {file_type:13} → {os.path.relpath(filepath, project_root)}")
     
     print(f"\n\nOpen code/lightweight-charts-multi.html in your browser")
     print(f"Load the 3 files from the output/ folder using the file pickers")
+    print(f"(pick the .lwcb OHLCV/Indicator files instead of the .csv ones for faster loading,")
+    print(f" together with their .lod<N>.lwcb overview levels for long histories,")
+    print(f" or just the Chart_*.lwcb bundle (and its levels) in the OHLCV picker, which holds all three)")
     print("\n")
+    return copied_files
+
+
+def serve_chart_data(copied_files):
+    """Serve the copied .lwcb files to lightweight-charts.html until Ctrl+C"""
+    files = binary_outputs(copied_files)
+    if 'OHLCV' not in files:
+        print("[WARN] The chart data server needs the OHLCV .lwcb file (CHART_FORMAT 'lwcb' or 'both')")
+        return
+    chart_server.run(files['OHLCV'], files.get('Indicator'), files.get('Markers'), open_browser=True)
+
+
+def run_feather_to_csv(files=None):
+    """Convert the feather files of every bot on the host, or only files"""
+    cmd = [sys.executable, str(Path(__file__).parent / 'feather_to_csv.py'), '--format', CHART_FORMAT]
+    if files:
+        cmd += ['--files'] + [str(f) for f in files]
+    trace_path = host_trace_path('feather_to_csv')
+    with TRACE.stage('feather_to_csv', files=len(files or [])) as record:
+        subprocess.run(cmd + ['--trace', str(trace_path)], check=True)
+        TRACE.attach_file(record, str(trace_path))
+
+
+def watch_stage(path, user_data):
+    """Stage a changed path under user_data calls for: 'feather', 'backtest', 'strategy', 'all' or None"""
+    if path == fs_watch.OVERFLOW:
+        return 'all'
+    parts = Path(os.path.relpath(path, user_data)).parts
+    name = parts[-1]
+    if parts[0] == 'data' and name.endswith('.feather'):
+        return 'feather'
+    # Extract folders of earlier results are next to the zips, only the top level counts
+    if parts[0] == 'backtest_results' and len(parts) == 2 and \
+            (name.endswith('.zip') or name == unzip_backtest_results.LAST_RESULT_NAME):
+        return 'backtest'
+    if parts[0] == 'strategies' and name.endswith('.py') and not name.startswith('.'):
+        return 'strategy'
+    return None
+
+
+def affects_strategy(paths, strategy_dir, strategy):
+    """
+    True when one of the changed python files may change strategy: it defines the strategy or one of its base
+    classes, it was deleted, or it defines no strategy at all (a helper module the strategy may import)
+    """
+    files = strategy_index.update_index(str(strategy_dir))
+    dependencies = set(strategy_index.dependency_files(files, strategy))
+    for path in paths:
+        rel_path = os.path.relpath(path, strategy_dir).replace(os.sep, '/')
+        if rel_path not in files or rel_path in dependencies:
+            return True
+    return False
+
+
+def extract_backtest_result(zip_path):
+    """Extract one backtest zip next to it, unless it already is"""
+    extract_folder = os.path.splitext(zip_path)[0]
+    if unzip_backtest_results.is_extracted(zip_path, extract_folder):
+        return
+    with TRACE.stage('unzip_backtest_results', zip=os.path.basename(zip_path)):
+        unzip_backtest_results.extract_zip(zip_path, extract_folder)
+    print(f"[SUCCESS] Extracted {os.path.basename(zip_path)}")
+
+
+def watch(bot_name, strategy, pair=None, timerange=None, serve=False, polling=False, profile=False):
+    """
+    Prepare the visualization files once, then follow the bot's data, backtest_results and strategies folders
+    until Ctrl+C and re-run only what a batch of changes calls for: a changed feather file is converted (and
+    the indicators extracted again when it holds the job's pair), a new backtest zip is extracted, a strategy
+    edit extracts the indicators again. output/ is refreshed afterwards and a chart page on --serve reloads.
+    """
+    copied_files = prepare_visualization_files(bot_name, strategy, pair, timerange, profile=profile)
+    user_data = Path(__file__).parent.parent / 'bots' / bot_name / 'user_data'
+    config = load_config(bot_name)
+    job_pair = pair or next(iter(config.get('exchange', {}).get('pair_whitelist', [])), '')
+    pair_prefix = job_pair.replace('/', '_').replace(':', '_') + '-'
+
+    data = None
+    # The server answers nothing while its files are rewritten
+    output_lock = nullcontext()
+    if serve:
+        files = binary_outputs(copied_files)
+        if 'OHLCV' in files:
+            data = chart_server.ChartData(files['OHLCV'], files.get('Indicator'), files.get('Markers'))
+            chart_server.start(data, open_browser=True)
+            output_lock = data.lock
+        else:
+            print("[WARN] The chart data server needs the OHLCV .lwcb file (CHART_FORMAT 'lwcb' or 'both')")
+
+    roots = {str(user_data / 'data'): True, str(user_data / 'backtest_results'): False,
+             str(user_data / 'strategies'): True}
+    # indicator_data is written by the extraction itself
+    watcher = fs_watch.open_watcher(roots, skip_dirs={'indicator_data'}, polling=polling)
+    print_header(f"Watching {bot_name} / {strategy} for changes (Ctrl+C to stop)")
+    try:
+        for changed in fs_watch.batches(watcher, accept=lambda p: watch_stage(p, user_data) is not None):
+            stages = {}
+            for path in sorted(changed):
+                stages.setdefault(watch_stage(path, user_data), []).append(path)
+            print(f"\n[INFO] {time.strftime('%H:%M:%S')} changed: " +
+                  ', '.join(f"{len(paths)} {stage}" for stage, paths in sorted(stages.items())))
+            try:
+                if 'all' in stages:
+                    # Events were lost, nothing tells what changed
+                    with output_lock:
+                        copied_files = prepare_visualization_files(bot_name, strategy, pair, timerange, profile=profile)
+                else:
+                    extract = False
+                    feathers = [p for p in stages.get('feather', []) if os.path.exists(p)]
+                    if feathers:
+                        run_feather_to_csv(feathers)
+                        extract = any(os.path.basename(p).startswith(pair_prefix) for p in feathers)
+                    for path in stages.get('backtest', []):
+                        # The zip may still be half written, its last write brings another event
+                        if path.endswith('.zip') and zipfile.is_zipfile(path):
+                            extract_backtest_result(path)
+                    if stages.get('strategy'):
+                        if affects_strategy(stages['strategy'], user_data / 'strategies', strategy):
+                            extract = True
+                        else:
+                            print(f"[DEBUG] Changed strategy files do not define {strategy} or its bases, skipped")
+                    if extract:
+                        container_name = ensure_container_running(bot_name)
+                        if extract_indicators(bot_name, container_name, strategy, pair, timerange, profile) != 0:
+                            print("[ERROR] Indicator extraction failed, keeping the previous indicator files")
+                        else:
+                            print("[SUCCESS] Indicators extracted")
+                    elif not feathers and not stages.get('backtest'):
+                        continue
+                    with output_lock:
+                        with TRACE.stage('copy_to_output') as record:
+                            copied_files = copy_to_output(bot_name, strategy, pair)
+                            record['bytes'] = sum(os.path.getsize(path) for _, path in copied_files)
+            except (subprocess.CalledProcessError, OSError, zipfile.BadZipFile) as e:
+                print(f"[ERROR] {e}, output/ not updated")
+                continue
+            files = binary_outputs(copied_files)
+            if data and 'OHLCV' in files:
+                data.reload(files['OHLCV'], files.get('Indicator'), files.get('Markers'))
+                print("[INFO] Chart page reloaded")
+            print(f"[INFO] {time.strftime('%H:%M:%S')} output/ up to date, watching...")
+    finally:
+        watcher.close()
 
 
 def interactive_menu():
@@ -358,23 +716,273 @@ def interactive_menu():
     
     action = input("\n[INPUT] Select action: ").strip()
     
+    if action in ('1', '3'):
+        timerange = input(f"[INPUT] Timerange (YYYYMMDD-YYYYMMDD) [default: last 90 days]: ").strip()
+    
+    copied_files = None
     if action == '1':
-        run_backtest(bot_name, strategy, config)
+        run_backtest(bot_name, strategy, config, timerange)
     elif action == '2':
-        prepare_visualization_files(bot_name, strategy)
+        copied_files = prepare_visualization_files(bot_name, strategy)
     elif action == '3':
-        run_backtest(bot_name, strategy, config)
-        prepare_visualization_files(bot_name, strategy)
+        run_backtest(bot_name, strategy, config, timerange)
+        copied_files = prepare_visualization_files(bot_name, strategy)
     else:
         print("[ERROR] Invalid action")
         sys.exit(1)
     
     print_header("Done!")
+    if copied_files and input("[INPUT] Open the chart through the local data server? (y/N): ").strip().lower() == 'y':
+        serve_chart_data(copied_files)
+
+
+def run_job(bot_name, strategy, action, pair=None, timerange=None, output_dir=None, shared_steps=True, profile=False):
+    """Run one backtest and/or visualization job without any prompt, returns the output files (if any)"""
+    if action in ('backtest', 'both'):
+        run_backtest(bot_name, strategy, load_config(bot_name), timerange, pair)
+    if action in ('visualize', 'both'):
+        return prepare_visualization_files(bot_name, strategy, pair, timerange, output_dir, shared_steps, profile)
+    return None
+
+
+def job_name(job):
+    """File system friendly name of a batch job"""
+    parts = [job['bot'], job['strategy'], (job['pair'] or 'default').replace('/', '_'), job['timerange'] or 'all']
+    return re.sub(r'[^\w.-]+', '_', '__'.join(parts))
+
+
+def build_jobs(bots, strategies, pairs, timeranges, action):
+    """
+    Expand the bots x strategies x pairs x timeranges matrix into job dicts.
+    strategies 'all' (or empty) means every strategy of each bot; empty pairs/timeranges mean the config default.
+    """
+    jobs = []
+    for bot_name in bots:
+        bot_strategies = strategies
+        if not strategies or strategies in ('all', ['all']):
+            bot_strategies = find_strategies(bot_name)
+        # Jobs of one container share a concurrency slot
+        container = get_container_name(bot_name) or bot_name
+        for strategy in bot_strategies:
+            for pair in pairs or [None]:
+                for timerange in timeranges or [None]:
+                    job = {'bot': bot_name, 'strategy': strategy, 'pair': pair, 'timerange': timerange,
+                           'action': action, 'container': container}
+                    job['name'] = job_name(job)
+                    jobs.append(job)
+    return jobs
+
+
+def interleave_by_container(jobs):
+    """Round-robin over containers so pool threads are not all stuck waiting on the same container"""
+    queues = {}
+    for job in jobs:
+        queues.setdefault(job['container'], []).append(job)
+    ordered = []
+    while any(queues.values()):
+        for queue in queues.values():
+            if queue:
+                ordered.append(queue.pop(0))
+    return ordered
+
+
+def run_batch_job(job, run_dir, container_slots, profile=False):
+    """Run one job as a separate main.py process with its output collected in <run_dir>/<job>.log"""
+    job_dir = run_dir / job['name']
+    log_path = run_dir / f"{job['name']}.log"
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--bot', job['bot'], '--strategy', job['strategy'],
+           '--action', job['action'], '--output-dir', str(job_dir), '--skip-shared-steps']
+    if job['pair']:
+        cmd.extend(['--pair', job['pair']])
+    if job['timerange']:
+        cmd.extend(['--timerange', job['timerange']])
+    if profile:
+        cmd.append('--profile')
+    with container_slots[job['container']]:
+        with _PRINT_LOCK:
+            print(f"[INFO] Started {job['name']}")
+        start = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            returncode = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                        env=dict(os.environ, PYTHONUNBUFFERED='1')).returncode
+    return dict(job, returncode=returncode, seconds=round(time.perf_counter() - start, 2),
+                log=str(log_path), output_dir=str(job_dir) if job_dir.exists() else None)
+
+
+def unzip_results(bots, index):
+    """Extract the backtest zips of bots that are not yet, returns (bots, seconds, trace path)"""
+    trace_path = host_trace_path(f"unzip{index}")
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as quiet:
+        returncode = subprocess.run([sys.executable, str(Path(__file__).parent / 'unzip_backtest_results.py'),
+                                     '--bot'] + bots + ['--trace', str(trace_path)], stdout=quiet).returncode
+    if returncode != 0:
+        with _PRINT_LOCK:
+            print(f"[WARN] Extracting the backtest results of {', '.join(bots)} failed ({returncode})")
+    return bots, time.perf_counter() - start, trace_path
+
+
+def run_batch(jobs, max_jobs=DEFAULT_MAX_JOBS, max_per_container=DEFAULT_MAX_PER_CONTAINER, profile=False):
+    """Run jobs concurrently, at most max_per_container at a time in each container. Returns the results."""
+    project_root = Path(__file__).parent.parent
+    run_dir = project_root / 'output' / 'batch' / time.strftime('%Y%m%d-%H%M%S')
+    run_dir.mkdir(parents=True, exist_ok=True)
+    print_header(f"Batch: {len(jobs)} jobs → {os.path.relpath(run_dir, project_root)}")
+    if max_per_container > 1:
+        print("[WARN] Jobs sharing a container may pick up each other's latest backtest result")
+    
+    code_dir = Path(__file__).parent
+    visualize = any(job['action'] in ('visualize', 'both') for job in jobs)
+    if visualize:
+        # Shared by all jobs, converting once avoids concurrent writes to the same files
+        trace_path = host_trace_path('feather_to_csv')
+        with TRACE.stage('feather_to_csv') as record:
+            subprocess.run([sys.executable, str(code_dir / 'feather_to_csv.py'), '--format', CHART_FORMAT,
+                            '--trace', str(trace_path)], check=True)
+            TRACE.attach_file(record, str(trace_path))
+    
+    container_slots = {job['container']: threading.Semaphore(max_per_container) for job in jobs}
+    results = []
+    # Backtest zips are extracted on a thread of their own while the jobs run: the existing ones right away,
+    # the one a backtest job writes as soon as that job finished
+    unzips = []
+    with ThreadPoolExecutor(max_workers=1) as unzipper, ThreadPoolExecutor(max_workers=max(1, max_jobs)) as pool:
+        if visualize:
+            unzips.append(unzipper.submit(unzip_results, sorted({job['bot'] for job in jobs}), len(unzips)))
+        futures = [pool.submit(run_batch_job, job, run_dir, container_slots, profile)
+                   for job in interleave_by_container(jobs)]
+        for future in as_completed(futures):
+            result = future.result()
+            status = 'OK' if result['returncode'] == 0 else f"FAILED ({result['returncode']})"
+            with _PRINT_LOCK:
+                print(f"[INFO] Finished {result['name']}: {status} in {result['seconds']:.1f}s")
+            results.append(result)
+            if visualize and result['action'] in ('backtest', 'both'):
+                unzips.append(unzipper.submit(unzip_results, [result['bot']], len(unzips)))
+    
+    # Each job saved its own trace in its output folder
+    for r in sorted(results, key=lambda r: r['name']):
+        record = {'name': r['name'], 'wall_s': r['seconds'], 'returncode': r['returncode']}
+        if r['output_dir']:
+            TRACE.attach_file(record, os.path.join(r['output_dir'], 'trace.json'), remove=False)
+        TRACE.add(record)
+    for future in unzips:
+        bots, seconds, trace_path = future.result()
+        record = {'name': 'unzip_backtest_results', 'bots': bots, 'wall_s': seconds}
+        TRACE.attach_file(record, str(trace_path))
+        TRACE.add(record)
+    save_trace(run_dir)
+    with open(run_dir / 'summary.json', 'w', encoding='utf-8') as f:
+        json.dump(sorted(results, key=lambda r: r['name']), f, indent=2)
+    
+    print(f"\n[SUMMARY] {'job':<60} {'status':>8} {'seconds':>8}")
+    for r in sorted(results, key=lambda r: r['name']):
+        status = 'ok' if r['returncode'] == 0 else 'FAILED'
+        print(f"[SUMMARY] {r['name']:<60} {status:>8} {r['seconds']:>8.1f}")
+    failed = sum(1 for r in results if r['returncode'] != 0)
+    print(f"[SUMMARY] {len(results) - failed}/{len(results)} jobs succeeded, logs in {run_dir}")
+    return results
+
+
+def load_batch_file(path):
+    """Batch file: JSON with bots, strategies ('all' or a list), pairs, timeranges, action, max_jobs, max_per_container"""
+    with open(path, 'r', encoding='utf-8') as f:
+        batch = json.load(f)
+    unknown = set(batch) - {'bots', 'strategies', 'pairs', 'timeranges', 'action', 'max_jobs', 'max_per_container'}
+    if unknown:
+        print(f"[WARN] Ignoring unknown batch file keys: {sorted(unknown)}")
+    return batch
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Freqtrade backtest + LightweightCharts visualization. '
+                                                 'Without arguments an interactive menu is shown.')
+    parser.add_argument('--batch', help='JSON batch file describing the job matrix (see load_batch_file)')
+    parser.add_argument('--bot', nargs='+', help='Bot name(s)')
+    parser.add_argument('--strategy', nargs='+', help="Strategy class name(s), or 'all'")
+    parser.add_argument('--pair', nargs='+', help='Pair(s), default: first pair of the config whitelist')
+    parser.add_argument('--timerange', nargs='+', help='Timerange(s) YYYYMMDD-YYYYMMDD, default: freqtrade default')
+    parser.add_argument('--action', choices=ACTIONS, help='What to run for each job (default: both)')
+    parser.add_argument('--max-jobs', type=int, help=f'Concurrent jobs in total (default: {DEFAULT_MAX_JOBS})')
+    parser.add_argument('--max-per-container', type=int,
+                        help=f'Concurrent jobs per freqtrade container (default: {DEFAULT_MAX_PER_CONTAINER})')
+    parser.add_argument('--profile', action='store_true',
+                        help='Run populate_indicators under cProfile (stats saved next to the indicator output)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Single job only: afterwards serve the chart data to lightweight-charts.html '
+                             f'on http://{chart_server.DEFAULT_HOST}:{chart_server.DEFAULT_PORT}/')
+    parser.add_argument('--watch', action='store_true',
+                        help="Single job only: afterwards keep watching the bot's data, backtest results and "
+                             "strategies and re-run the stages a change calls for (with --serve the chart reloads)")
+    parser.add_argument('--watch-poll', action='store_true',
+                        help='Poll for changes instead of using inotify (e.g. folders on a network or VM share)')
+    # Used by batch mode for its child processes
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--skip-shared-steps', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def cli_main(args):
+    """Non-interactive entry point, returns the exit code"""
+    batch = load_batch_file(args.batch) if args.batch else {}
+    bots = args.bot or batch.get('bots') or []
+    strategies = args.strategy or batch.get('strategies') or []
+    pairs = args.pair or batch.get('pairs') or []
+    timeranges = args.timerange or batch.get('timeranges') or []
+    action = args.action or batch.get('action') or 'both'
+    if action not in ACTIONS:
+        print(f"[ERROR] Invalid action '{action}', expected one of {ACTIONS}")
+        return 1
+    if not bots:
+        print("[ERROR] No bots given (--bot or 'bots' in the batch file)")
+        return 1
+    unknown_bots = set(bots) - set(find_bots())
+    if unknown_bots:
+        print(f"[ERROR] Unknown bot(s): {sorted(unknown_bots)}")
+        return 1
+    
+    jobs = build_jobs(bots, strategies, pairs, timeranges, action)
+    if not jobs:
+        print("[ERROR] No jobs to run")
+        return 1
+    if len(jobs) == 1 and not args.batch and args.watch:
+        job = jobs[0]
+        try:
+            if action in ('backtest', 'both'):
+                run_backtest(job['bot'], job['strategy'], load_config(job['bot']), job['timerange'], job['pair'])
+            watch(job['bot'], job['strategy'], job['pair'], job['timerange'], args.serve, args.watch_poll,
+                  args.profile)
+        finally:
+            save_trace()
+        return 0
+    if len(jobs) == 1 and not args.batch:
+        job = jobs[0]
+        try:
+            copied_files = run_job(job['bot'], job['strategy'], action, job['pair'], job['timerange'],
+                                   args.output_dir, shared_steps=not args.skip_shared_steps, profile=args.profile)
+        finally:
+            save_trace(args.output_dir)
+        if args.serve and copied_files:
+            serve_chart_data(copied_files)
+        return 0
+    
+    if args.serve or args.watch:
+        print("[WARN] --serve and --watch only apply to a single job, ignored")
+    max_jobs = args.max_jobs or batch.get('max_jobs') or DEFAULT_MAX_JOBS
+    max_per_container = args.max_per_container or batch.get('max_per_container') or DEFAULT_MAX_PER_CONTAINER
+    results = run_batch(jobs, max_jobs, max_per_container, args.profile)
+    return 1 if any(r['returncode'] != 0 for r in results) else 0
 
 
 if __name__ == '__main__':
     try:
-        interactive_menu()
+        args = parse_args()
+        if args.batch or args.bot:
+            sys.exit(cli_main(args))
+        try:
+            interactive_menu()
+        finally:
+            save_trace()
     except KeyboardInterrupt:
         print("\n\n[INFO] Interrupted by user")
         sys.exit(0)
@@ -0,0 +1,276 @@
+"""
+Content-addressed staging of the files main.py puts into output/: every file is stored once by sha1 in
+output/.store/blobs/ and output names are links to those blobs, so re-running a pipeline whose inputs did not
+change neither copies nor rewrites anything, and equal files of different jobs (batch runs) take disk space once.
+
+    store = OutputStore(output_dir)
+    store.stage(source, output_dir / 'OHLCV_BTCUSDT-5m.lwcb')     a file of the bots folder
+    tmp = store.temp_path(dest); write(tmp); store.adopt(tmp, dest)  a file generated for output/
+    store.save()
+
+    python output_store.py status          blobs, outputs linking them and the space saved
+    python output_store.py gc [--dry-run]  remove the blobs no output manifest refers to any more
+
+Each output folder has a .manifest.json of {name: sha1, size, link mode, inode, mtime, source stats}. An output
+whose sources and file are as recorded is left alone without being read. Otherwise the source is hashed and,
+when new, copied into the store (reflinked where the filesystem can, never hardlinked: a bot may rewrite it in
+place), and the output name is replaced by a hardlink to the blob, a reflink when hardlinks fail (e.g. across
+btrfs subvolumes) or a copy on another filesystem. The name is always replaced by rename, never written into,
+so chart_server.py's memory maps of the previous file stay valid. Output files are therefore blobs: replace
+them, do not edit them in place. Standard library only.
+"""
+import os
+import json
+import time
+import errno
+import shutil
+import hashlib
+import argparse
+try:
+    import fcntl
+except ImportError:
+    # No reflinks on Windows, hardlinks and copies still work
+    fcntl = None
+
+STORE_NAME = '.store'
+MANIFEST_NAME = '.manifest.json'
+# ioctl(dest_fd, FICLONE, src_fd): share the extents of src (btrfs, xfs, ...)
+FICLONE = 0x40049409
+# Blobs younger than this are kept by gc, a running pipeline may not have saved the manifest linking them yet
+GC_GRACE_SECONDS = 3600
+
+def find_root_dir():
+    """Go up to root"""
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def default_output_root():
+    return os.path.join(find_root_dir(), 'output')
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def reflink(src, dst):
+    """Copy-on-write clone of src to dst, OSError where the filesystem (or platform) cannot"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'reflinks need fcntl')
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+    shutil.copystat(src, dst)
+
+def clone(src, dst):
+    """Reflink src to dst, else copy it. Returns the mode used"""
+    try:
+        reflink(src, dst)
+        return 'reflink'
+    except OSError:
+        shutil.copy2(src, dst)
+        return 'copy'
+
+def link(src, dst):
+    """Hardlink src to dst, else reflink, else copy. Returns the mode used"""
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        return clone(src, dst)
+
+def file_stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+class OutputStore:
+    """The blob store and the manifest of one output folder"""
+
+    def __init__(self, output_dir, store_dir=None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.store_dir = os.path.abspath(store_dir or os.path.join(default_output_root(), STORE_NAME))
+        self.manifest = load_manifest(self.output_dir)
+        os.makedirs(os.path.join(self.store_dir, 'blobs'), exist_ok=True)
+
+    def blob_path(self, sha1):
+        return os.path.join(self.store_dir, 'blobs', sha1[:2], sha1)
+
+    def temp_path(self, dest):
+        """Where to write a file that then gets adopted as dest (next to it, so adopting is a rename)"""
+        return os.path.join(os.path.dirname(os.path.abspath(dest)), f".{os.path.basename(dest)}.{os.getpid()}.tmp")
+
+    def intact(self, dest, entry):
+        """dest is still the file the manifest entry recorded"""
+        try:
+            st = os.stat(dest)
+        except OSError:
+            return False
+        return [st.st_ino, st.st_size, st.st_mtime_ns] == [entry.get('ino'), entry.get('size'), entry.get('mtime_ns')]
+
+    def current(self, dest, sources=()):
+        """dest is intact and was made from sources as they are now, nothing to do"""
+        entry = self.manifest.get(os.path.basename(dest))
+        if not entry or not self.intact(dest, entry):
+            return False
+        try:
+            return {os.path.abspath(s): file_stat(s) for s in sources} == entry.get('sources', {})
+        except OSError:
+            return False
+
+    def stage(self, src, dest):
+        """Make dest the content of src. Returns 'unchanged' or the link mode of the new dest"""
+        if self.current(dest, [src]):
+            return 'unchanged'
+        sha1 = file_sha1(src)
+        blob = self.blob_path(sha1)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.{os.getpid()}.tmp"
+            clone(src, tmp)
+            os.replace(tmp, blob)
+        return self.place(sha1, dest, [src])
+
+    def adopt(self, path, dest, sources=()):
+        """Move the generated file path into the store and make dest the content of it (path may be dest)"""
+        sha1 = file_sha1(path)
+        blob = self.blob_path(sha1)
+        if os.path.exists(blob):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.replace(path, blob)
+            except OSError:
+                # Output folder on another filesystem than the store
+                tmp = f"{blob}.{os.getpid()}.tmp"
+                clone(path, tmp)
+                os.replace(tmp, blob)
+                os.remove(path)
+        return self.place(sha1, dest, sources)
+
+    def place(self, sha1, dest, sources):
+        name = os.path.basename(dest)
+        previous = self.manifest.get(name)
+        if previous and previous['sha1'] == sha1 and self.intact(dest, previous):
+            mode = 'unchanged'
+        else:
+            tmp = self.temp_path(dest)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            mode = link(self.blob_path(sha1), tmp)
+            os.replace(tmp, dest)
+        st = os.stat(dest)
+        self.manifest[name] = {
+            'sha1': sha1, 'size': st.st_size, 'mode': mode if mode != 'unchanged' else previous['mode'],
+            'ino': st.st_ino, 'mtime_ns': st.st_mtime_ns,
+            'sources': {os.path.abspath(s): file_stat(s) for s in sources},
+        }
+        return mode
+
+    def save(self):
+        """Write the manifest, without the outputs that were deleted meanwhile"""
+        self.manifest = {name: entry for name, entry in sorted(self.manifest.items())
+                         if os.path.exists(os.path.join(self.output_dir, name))}
+        path = os.path.join(self.output_dir, MANIFEST_NAME)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, path)
+
+def manifests(output_root, store_dir):
+    """(output folder, manifest) of every output folder below output_root"""
+    for dirpath, dirnames, filenames in os.walk(output_root):
+        dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) != store_dir]
+        if MANIFEST_NAME in filenames:
+            yield dirpath, load_manifest(dirpath)
+
+def referenced(output_root, store_dir):
+    """{sha1: [(bytes, link mode) of the outputs of it]}, outputs deleted or replaced by hand do not count"""
+    refs = {}
+    for output_dir, manifest in manifests(output_root, store_dir):
+        for name, entry in manifest.items():
+            try:
+                st = os.stat(os.path.join(output_dir, name))
+            except OSError:
+                continue
+            if st.st_ino == entry.get('ino') and st.st_size == entry.get('size'):
+                refs.setdefault(entry['sha1'], []).append((st.st_size, entry.get('mode')))
+    return refs
+
+def blobs(store_dir):
+    """(path, sha1 or None for leftover temp files, stat) of the files in the store"""
+    for dirpath, _, filenames in os.walk(os.path.join(store_dir, 'blobs')):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                yield path, None if name.endswith('.tmp') else name, os.stat(path)
+            except OSError:
+                continue
+
+def collect_garbage(output_root=None, store_dir=None, grace=GC_GRACE_SECONDS, dry_run=False):
+    """Remove the blobs (and leftover temp files) no manifest refers to. Returns (files, bytes) removed"""
+    output_root = os.path.abspath(output_root or default_output_root())
+    store_dir = os.path.abspath(store_dir or os.path.join(output_root, STORE_NAME))
+    refs = referenced(output_root, store_dir)
+    cutoff = time.time() - grace
+    removed, freed = 0, 0
+    for path, sha1, st in blobs(store_dir):
+        if (sha1 and sha1 in refs) or st.st_ctime > cutoff:
+            continue
+        if not dry_run:
+            os.remove(path)
+        removed += 1
+        freed += st.st_size
+    return removed, freed
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed store behind the files in output/')
+    parser.add_argument('--output-root', help='Folder holding the output folders and the store (default: output/)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='Blobs, outputs linking them and the space saved')
+    gc_parser = sub.add_parser('gc', help='Remove the blobs no output refers to any more')
+    gc_parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+    gc_parser.add_argument('--grace', type=float, default=GC_GRACE_SECONDS,
+                           help=f'Keep blobs younger than this many seconds (default: {GC_GRACE_SECONDS})')
+    args = parser.parse_args()
+
+    output_root = os.path.abspath(args.output_root or default_output_root())
+    store_dir = os.path.join(output_root, STORE_NAME)
+    if not os.path.isdir(store_dir):
+        print(f"[WARN] No store at {store_dir}")
+        return
+    if args.command == 'status':
+        refs = referenced(output_root, store_dir)
+        stored = unreferenced = 0
+        count = 0
+        for _, sha1, st in blobs(store_dir):
+            count += 1
+            stored += st.st_size
+            if sha1 not in refs:
+                unreferenced += st.st_size
+        outputs = [output for outputs in refs.values() for output in outputs]
+        as_copies = sum(size for size, _ in outputs)
+        # Outputs that had to be copied (another filesystem) take their space besides the blob
+        copies = sum(size for size, mode in outputs if mode == 'copy')
+        print(f"[SUMMARY] {count} blobs, {stored / 1e6:.1f} MB ({unreferenced / 1e6:.1f} MB unreferenced)")
+        print(f"[SUMMARY] {len(outputs)} outputs of {as_copies / 1e6:.1f} MB link {len(refs)} blobs, "
+              f"{(as_copies - (stored - unreferenced) - copies) / 1e6:.1f} MB saved over copies")
+        return
+    start = time.perf_counter()
+    removed, freed = collect_garbage(output_root, store_dir, args.grace, args.dry_run)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"[SUMMARY] {verb} {removed} blobs, {freed / 1e6:.1f} MB in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Per-stage instrumentation shared by the pipeline scripts: wall time, CPU time, peak RSS, rows and bytes.
+
+    trace = StageTrace('prepare_visualization_files')
+    with trace.stage('feather_to_csv') as record:
+        ...
+        record['rows'] = 1234
+    trace.save('trace.json')
+
+Stages nest, and traces written by subprocesses (--trace PATH of feather_to_csv.py, unzip_backtest_results.py
+and extract_indicators.py, the latter from inside the container) are attached to the stage that ran them
+with attach_file(). Copied into user_data/code by main.py, so standard library only.
+"""
+import os
+import sys
+import json
+import time
+import platform
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows: CPU time falls back to time.process_time() and peak RSS is not reported
+    resource = None
+
+def cpu_seconds():
+    """User + system CPU time of this process and of its finished children"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def peak_rss_mb():
+    """Peak resident memory so far of this process or its largest finished child, in MB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024**2 if sys.platform == 'darwin' else 1024), 1)
+
+def total(stages, key):
+    """Sum of key over a list of stage records (only those that have it), None if none has it"""
+    values = [s[key] for s in stages if s.get(key) is not None]
+    return sum(values) if values else None
+
+class StageTrace:
+    """Collects nested stage records of one run"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.start = time.perf_counter()
+        self.stages = []
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Time the body as a stage; the yielded record can be filled with rows, bytes or anything else"""
+        record = dict(name=name, **info)
+        (self._stack[-1].setdefault('stages', []) if self._stack else self.stages).append(record)
+        self._stack.append(record)
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._stack.pop()
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            record['cpu_s'] = round(cpu_seconds() - cpu, 4)
+            record['peak_rss_mb'] = peak_rss_mb()
+
+    def add(self, record):
+        """Add an already measured record (e.g. returned by a pool worker) under the current stage"""
+        (self._stack[-1].setdefault('stages', []) if self._stack else self.stages).append(record)
+
+    def attach_file(self, record, path, remove=True):
+        """Nest the stages of a trace file written by a subprocess under record (and remove the file)"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                child = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Unreadable trace {path}: {e}")
+            return
+        finally:
+            if remove:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        record.setdefault('stages', []).extend(child.get('stages', []))
+        for key in ('rows', 'bytes'):
+            if record.get(key) is None and child.get(key) is not None:
+                record[key] = child[key]
+        if child.get('peak_rss_mb') is not None:
+            record['remote_peak_rss_mb'] = child['peak_rss_mb']
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started,
+            'host': platform.node(),
+            'pid': os.getpid(),
+            'wall_s': round(time.perf_counter() - self.start, 4),
+            'cpu_s': round(cpu_seconds(), 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'rows': total(self.stages, 'rows'),
+            'bytes': total(self.stages, 'bytes'),
+            'stages': self.stages,
+        }
+
+    def save(self, path):
+        """Write the trace as JSON (atomically, the host may be waiting for it)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def print_report(self):
+        """One [SUMMARY] line per stage, nested stages indented"""
+        print(f"\n[SUMMARY] {'stage':<40} {'wall s':>8} {'cpu s':>8} {'peak MB':>8} {'rows':>10} {'MB':>8}")
+
+        def walk(stages, depth):
+            for s in stages:
+                label = ('  ' * depth + s['name'])[:40]
+                peak = s.get('remote_peak_rss_mb') or s.get('peak_rss_mb')
+                fields = [
+                    f"{s['wall_s']:>8.2f}" if s.get('wall_s') is not None else f"{'':>8}",
+                    f"{s['cpu_s']:>8.2f}" if s.get('cpu_s') is not None else f"{'':>8}",
+                    f"{peak:>8.1f}" if peak is not None else f"{'':>8}",
+                    f"{s['rows']:>10}" if s.get('rows') is not None else f"{'':>10}",
+                    f"{s['bytes'] / 1024**2:>8.2f}" if s.get('bytes') is not None else f"{'':>8}",
+                ]
+                print(f"[SUMMARY] {label:<40} {' '.join(fields)}{'  FAILED' if s.get('error') else ''}")
+                walk(s.get('stages', []), depth + 1)
+
+        walk(self.stages, 0)
@@ -0,0 +1,161 @@
+"""
+Persistent index of the strategy classes in a strategies folder, shared by main.py and extract_indicators.py.
+
+Every .py file is parsed with ast (never imported) and its classes and base class names are stored in
+<strategies>/.strategy_index.json, keyed by path relative to the folder (the host and the container see it at
+different absolute paths) together with the file's mtime and size. Later lookups only re-parse files whose
+mtime or size changed. A class is a strategy when its base classes lead to IStrategy, directly or through
+intermediate base classes defined in other strategy files.
+
+Copied into user_data/code by main.py, so standard library only.
+"""
+import os
+import ast
+import json
+
+INDEX_NAME = '.strategy_index.json'
+# Bump when the entry layout changes, an index of another version is rebuilt
+INDEX_VERSION = 1
+ROOT_BASE = 'IStrategy'
+
+def base_name(node):
+    """Name of a base class expression: IStrategy, strategy.IStrategy -> IStrategy, Generic[T] -> Generic"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return base_name(node.value)
+    return None
+
+def parse_classes(path):
+    """{class name: [base names]} of the top level classes of a python file, None if it does not parse"""
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (SyntaxError, ValueError, OSError) as e:
+        print(f"[WARN] Could not parse {path}: {e}")
+        return None
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            classes[node.name] = [name for name in (base_name(b) for b in node.bases) if name]
+    return classes
+
+def list_python_files(strategy_dir, recursive=True):
+    """Relative paths (with /) of the python files in strategy_dir, hidden folders and __pycache__ skipped"""
+    files = []
+    for root, dirs, names in os.walk(strategy_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+        if not recursive:
+            dirs[:] = []
+        for name in sorted(names):
+            if name.endswith('.py'):
+                files.append(os.path.relpath(os.path.join(root, name), strategy_dir).replace(os.sep, '/'))
+    return files
+
+def load_index(strategy_dir):
+    """Stored index of strategy_dir, empty when missing, unreadable or of another version"""
+    path = os.path.join(strategy_dir, INDEX_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index.get('files', {})
+
+def save_index(strategy_dir, files):
+    """Write the index atomically; a read-only strategies folder just means no caching"""
+    path = os.path.join(strategy_dir, INDEX_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'files': files}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[DEBUG] Could not save strategy index {path}: {e}")
+
+def update_index(strategy_dir, recursive=True):
+    """Index of every python file in strategy_dir, re-parsing only new or changed files"""
+    previous = load_index(strategy_dir)
+    files = {}
+    parsed = 0
+    for rel_path in list_python_files(strategy_dir, recursive):
+        st = os.stat(os.path.join(strategy_dir, rel_path))
+        entry = previous.get(rel_path)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            files[rel_path] = entry
+            continue
+        parsed += 1
+        files[rel_path] = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'classes': parse_classes(os.path.join(strategy_dir, rel_path)) or {},
+        }
+    if parsed or (recursive and files.keys() != previous.keys()):
+        print(f"[DEBUG] Strategy index: parsed {parsed} of {len(files)} files in {strategy_dir}")
+        if recursive:
+            # A non-recursive listing would drop the entries of sub folders
+            save_index(strategy_dir, files)
+    return files
+
+def resolve_strategies(files, root=ROOT_BASE):
+    """{class name: relative path} of the classes whose base chain reaches root (IStrategy)"""
+    bases = {}
+    locations = {}
+    for rel_path, entry in files.items():
+        for name, class_bases in entry['classes'].items():
+            # First definition wins when several files define the same class name
+            bases.setdefault(name, class_bases)
+            locations.setdefault(name, rel_path)
+    memo = {}
+
+    def is_strategy(name, seen):
+        if name in memo:
+            return memo[name]
+        if name not in bases or name in seen:
+            return False
+        seen.add(name)
+        result = any(b == root or is_strategy(b, seen) for b in bases[name])
+        memo[name] = result
+        return result
+
+    return {name: locations[name] for name in bases if name != root and is_strategy(name, set())}
+
+def base_chain(files, name):
+    """Names of class name and of every class it derives from, as far as the index knows them"""
+    bases = {}
+    for entry in files.values():
+        for class_name, class_bases in entry['classes'].items():
+            bases.setdefault(class_name, class_bases)
+    chain = set()
+    todo = [name]
+    while todo:
+        current = todo.pop()
+        if current not in chain:
+            chain.add(current)
+            todo.extend(bases.get(current, []))
+    return chain
+
+def dependency_files(files, name, root=ROOT_BASE):
+    """
+    Relative paths of the files class name may depend on: those defining it or one of its base classes, and
+    the helper modules (files defining no strategy) it may import
+    """
+    strategies = set(resolve_strategies(files, root))
+    chain = base_chain(files, name)
+    return sorted(rel_path for rel_path, entry in files.items()
+                  if set(entry['classes']) & chain or not set(entry['classes']) & strategies)
+
+def find_strategies(strategy_dir, recursive=True, root=ROOT_BASE):
+    """{strategy class name: absolute file path} of strategy_dir (root='IHyperOptLoss' for a hyperopts folder)"""
+    if not os.path.isdir(strategy_dir):
+        return {}
+    strategies = resolve_strategies(update_index(strategy_dir, recursive), root)
+    return {name: os.path.join(strategy_dir, rel_path) for name, rel_path in strategies.items()}
+
+def find_strategy_file(strategy_name, strategy_dir, recursive=True):
+    """File defining strategy class strategy_name, or None"""
+    return find_strategies(strategy_dir, recursive).get(strategy_name)
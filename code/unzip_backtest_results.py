@@ -1,5 +1,16 @@
 import zipfile
 import os
+import json
+import time
+import shutil
+import argparse
+from contextlib import contextmanager
+
+import stage_timer
+
+# Written into every extract folder so later runs can tell it is complete and up to date
+MARKER_NAME = '.extracted.json'
+LAST_RESULT_NAME = '.last_result.json'
 
 def find_root_dir():
     """Go to root"""
@@ -16,23 +27,142 @@ def all_backtest_dirs(root_dir):
         if os.path.isdir(bt_dir):
             yield bt_dir
 
-def unzip_all_in_folder(folder_path):
-    """Unzips all .zip files"""
+def zip_signature(zip_path):
+    """Size and mtime of a zip, enough to notice it was replaced"""
+    st = os.stat(zip_path)
+    return {'zip_size': st.st_size, 'zip_mtime_ns': st.st_mtime_ns}
+
+def is_extracted(zip_path, extract_folder):
+    """True when extract_folder holds every member of zip_path, extracted from this exact zip"""
+    marker_path = os.path.join(extract_folder, MARKER_NAME)
+    if not os.path.exists(marker_path):
+        return False
+    try:
+        with open(marker_path, 'r', encoding='utf-8') as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if {k: marker.get(k) for k in ('zip_size', 'zip_mtime_ns')} != zip_signature(zip_path):
+        return False
+    for name, size in marker.get('members', {}).items():
+        member_path = os.path.join(extract_folder, name)
+        if not os.path.isfile(member_path) or os.path.getsize(member_path) != size:
+            return False
+    return True
+
+def extract_zip(zip_path, extract_folder):
+    """Extract a zip and write the completeness marker last"""
+    os.makedirs(extract_folder, exist_ok=True)
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_folder)
+        members = {info.filename: info.file_size for info in zip_ref.infolist() if not info.is_dir()}
+    marker = dict(zip_signature(zip_path), members=members)
+    with open(os.path.join(extract_folder, MARKER_NAME), 'w', encoding='utf-8') as f:
+        json.dump(marker, f, indent=2)
+
+def unzip_all_in_folder(folder_path, force=False, trace=None):
+    """Unzips all .zip files, skipping the ones that are already extracted"""
     for item in os.listdir(folder_path):
         item_path = os.path.join(folder_path, item)
         if zipfile.is_zipfile(item_path):
             extract_folder = os.path.join(folder_path, os.path.splitext(item)[0])
-            os.makedirs(extract_folder, exist_ok=True)
-            with zipfile.ZipFile(item_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_folder)
+            if not force and is_extracted(item_path, extract_folder):
+                print(f"[DEBUG] Already extracted: {item}")
+                continue
+            start = time.perf_counter()
+            extract_zip(item_path, extract_folder)
+            if trace is not None:
+                with open(os.path.join(extract_folder, MARKER_NAME), 'r', encoding='utf-8') as f:
+                    extracted_bytes = sum(json.load(f)['members'].values())
+                trace.add({'name': item, 'bytes': extracted_bytes, 'wall_s': round(time.perf_counter() - start, 4)})
             print(f"Extracted: {item} to {extract_folder}")
 
+def result_member_name(zip_ref, zip_path):
+    """Name of the strategy result json inside a backtest zip (not the _config.json)"""
+    names = zip_ref.namelist()
+    expected = os.path.splitext(os.path.basename(zip_path))[0] + '.json'
+    if expected in names:
+        return expected
+    for name in names:
+        if name.endswith('.json') and not name.endswith('_config.json'):
+            return name
+    return None
+
+@contextmanager
+def open_result(zip_path):
+    """Open the result json of a backtest zip as a binary stream, decompressed on the fly (nothing hits the disk)"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        name = result_member_name(zip_ref, zip_path)
+        if name is None:
+            raise FileNotFoundError(f"No result json in {zip_path}")
+        with zip_ref.open(name) as stream:
+            yield stream
+
+def load_result(path):
+    """Load a backtest result from a .json file or straight from its .zip"""
+    if zipfile.is_zipfile(path):
+        with open_result(path) as stream:
+            return json.load(stream)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def copy_result(path, dest):
+    """Copy a backtest result json to dest, streaming it out of the zip when needed"""
+    if not zipfile.is_zipfile(path):
+        shutil.copy2(path, dest)
+        return dest
+    with open_result(path) as stream, open(dest, 'wb') as out:
+        shutil.copyfileobj(stream, out)
+    return dest
+
+def latest_result(bt_dir):
+    """
+    Path of the most recent backtest result (zip or json) in a backtest_results folder.
+    Uses freqtrade's .last_result.json when present, otherwise the newest file by mtime.
+    """
+    last_result_path = os.path.join(bt_dir, LAST_RESULT_NAME)
+    if os.path.exists(last_result_path):
+        try:
+            with open(last_result_path, 'r', encoding='utf-8') as f:
+                latest = json.load(f).get('latest_backtest')
+        except (OSError, ValueError):
+            latest = None
+        if latest and os.path.exists(os.path.join(bt_dir, latest)):
+            return os.path.join(bt_dir, latest)
+    candidates = [
+        os.path.join(bt_dir, item) for item in os.listdir(bt_dir)
+        if not item.startswith('.') and not item.endswith('.meta.json')
+        and (item.endswith('.zip') or item.endswith('.json'))
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
 def main():
+    parser = argparse.ArgumentParser(description='Extract freqtrade backtest result zips')
+    parser.add_argument('--force', action='store_true', help='Extract again even if already extracted')
+    parser.add_argument('--no-extract', action='store_true',
+                        help='Do not extract anything, only report the latest result of each bot '
+                             '(read straight from the zip by the other scripts)')
+    parser.add_argument('--bot', nargs='+', help='Only the results of these bots (default: all)')
+    parser.add_argument('--trace', help='Write a JSON stage trace (time, CPU, memory, bytes) to this path')
+    args = parser.parse_args()
+    trace = stage_timer.StageTrace('unzip_backtest_results')
+
     root = find_root_dir()
     print(f"[DEBUG] Using root: {root}")
     for bt_dir in all_backtest_dirs(root):
+        if args.bot and os.path.basename(os.path.dirname(os.path.dirname(bt_dir))) not in args.bot:
+            continue
+        if args.no_extract:
+            print(f"[DEBUG] Latest result in {bt_dir}: {latest_result(bt_dir)}")
+            continue
         print(f"[DEBUG] Checking for zipfiles in: {bt_dir}")
-        unzip_all_in_folder(bt_dir)
+        with trace.stage(os.path.basename(os.path.dirname(os.path.dirname(bt_dir)))) as record:
+            unzip_all_in_folder(bt_dir, force=args.force, trace=trace)
+            record['bytes'] = stage_timer.total(record.get('stages', []), 'bytes') or 0
+    if args.trace:
+        trace.save(args.trace)
 
 if __name__ == "__main__":
     main()